@@ -1,39 +1,153 @@
-import trio
+import os
+import json
+import time
 from http.server import BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
-from helper.entry import main  # Import the main function from temp.py
+from helper.job_queue import JobQueue
+from helper.telemetry import METRICS
+
+
+# One OpenAI rate limiter for all jobs the queue runs in parallel, so together
+# they stay within the account's per-minute budgets; created with the first job
+_rate_limiter = None
+
+
+async def run_pipeline(submission_id, assignment_id, user_id, progress=None):
+    """Import the pipeline (openai, boto3, PIL) on first use so cold starts only pay for the handler"""
+    global _rate_limiter
+    from helper.entry import main, build_rate_limiter
+
+    # Jobs all run in the queue's trio loop, so no lock is needed here
+    if _rate_limiter is None:
+        _rate_limiter = build_rate_limiter()
+    await main(submission_id, assignment_id, user_id, progress=progress, rate_limiter=_rate_limiter)
+
+
+# Shared by every request served by this (warm) process. Jobs are held in
+# memory only and are not durable on serverless hosts; see JobQueue.
+job_queue = JobQueue(
+    run_pipeline,
+    max_parallel=int(os.getenv("MAX_PARALLEL_SUBMISSIONS", "2")),
+    finished_ttl=float(os.getenv("JOB_TTL_SECONDS", "3600"))
+)
+
+# Live report stream: coalesce updates into at most one event per interval,
+# and send a comment line when idle so proxies keep the connection open
+EVENTS_MIN_INTERVAL_SECONDS = 1.0
+EVENTS_KEEPALIVE_SECONDS = 15.0
+
+
+def job_queue_metrics() -> str:
+    """Jobs held by this process, by status, as a Prometheus gauge"""
+    counts = {}
+    with job_queue.lock:
+        jobs = list(job_queue.jobs.values())
+    for job in jobs:
+        counts[job.status] = counts.get(job.status, 0) + 1
+    lines = ["# TYPE pipeline_jobs gauge"]
+    for status in ("queued", "running", "succeeded", "failed"):
+        lines.append(f'pipeline_jobs{{status="{status}"}} {counts.get(status, 0)}')
+    return "\n".join(lines) + "\n"
 
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
         # Parse query parameters
-        query = urlparse(self.path).query
-        params = parse_qs(query)
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+
+        # Prometheus scrape: /api/metrics
+        if url.path.rstrip('/').endswith('/metrics'):
+            self.send_text(200, METRICS.render() + job_queue_metrics())
+            return
+
+        job_id = params.get('job_id', [None])[0]
+
+        # Live partial report as server-sent events: /api/events?job_id=...
+        if url.path.rstrip('/').endswith('/events'):
+            job = job_queue.get(job_id) if job_id else None
+            if job is None:
+                self.send_json(404, {"error": f"Unknown job_id: {job_id}"})
+            else:
+                self.stream_events(job)
+            return
+
+        # Status lookups: /api/status?job_id=... (or /api?job_id=...)
+        if url.path.rstrip('/').endswith('/status') or job_id:
+            job = job_queue.get(job_id) if job_id else None
+            if job is None:
+                self.send_json(404, {"error": f"Unknown job_id: {job_id}"})
+            else:
+                self.send_json(200, job.to_dict())
+            return
 
         # Extract parameters
         submission_id = params.get('submission_id', [None])[0]
         assignment_id = params.get('assignment_id', [None])[0]
         user_id = params.get('user_id', [None])[0]
 
-        # Run the Trio event loop
-        response_message = trio.run(
-            self.execute_main, submission_id, assignment_id, user_id
-        )
+        if not submission_id:
+            self.send_json(400, {"error": "submission_id is required"})
+            return
 
-        # Send response
-        self.send_response(200)
-        self.send_header("Content-type", "text/plain")
-        self.end_headers()
-        self.wfile.write(response_message.encode("utf-8"))
+        # Queue the pipeline and answer right away; duplicate submissions share a job
+        job, created = job_queue.enqueue(submission_id, assignment_id, user_id)
+        self.send_json(202, {
+            "job_id": job.id,
+            "status": job.status,
+            "created": created,
+            "status_url": f"/api/status?job_id={job.id}",
+            "events_url": f"/api/events?job_id={job.id}",
+        })
         return
 
-    async def execute_main(self, submission_id, assignment_id, user_id):
+    def stream_events(self, job):
         """
-        Executes the `main` function from temp.py and returns a response message.
+        Send the job's live report until the job ends.
+
+        Every event carries a full snapshot (activity durations, prompts and app
+        actions so far, plus the job status), so a client can render whichever
+        event it sees last. The stream ends with a "done" event.
         """
+        self.send_response(200)
+        self.send_header("Content-type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("X-Accel-Buffering", "no")
+        self.end_headers()
+
+        version = -1
         try:
-            # Call the main function with the necessary parameters
-            await main(submission_id, assignment_id, user_id)
-            return "Successfully executed the main function from temp.py"
-        except Exception as e:
-            return f"Error occurred while executing main: {str(e)}"
+            while True:
+                current = job.report.wait(version, EVENTS_KEEPALIVE_SECONDS)
+                if current == version:
+                    self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+                    continue
+
+                version = current
+                snapshot = job.report.snapshot()
+                snapshot["job"] = job.to_dict()
+                done = snapshot["finished"] or not job.active
+                event = "done" if done else "report"
+                self.wfile.write(f"id: {version}\nevent: {event}\ndata: {json.dumps(snapshot)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                if done:
+                    return
+                time.sleep(EVENTS_MIN_INTERVAL_SECONDS)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away; the job keeps running
+            return
+
+    def send_text(self, status: int, body: str):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_json(self, status: int, body: dict):
+        self.send_response(status)
+        self.send_header("Content-type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode("utf-8"))
@@ -0,0 +1,101 @@
+"""
+Compare the frame timeline artifact formats on size, write time and load time.
+
+Builds a synthetic analysis document of --frames frames (the shape
+save_analysis_results writes), stores it in every format from
+helper.artifact_format and times reading it back the way timeline_analysis
+does: read_timeline followed by build_frame_table. The gzip size of the
+original JSON is listed too, as what a compressed transfer of today's file
+would cost.
+
+Usage:
+    python -m benchmarks.artifact_format_benchmark --frames 2200 --repeat 5
+"""
+import os
+import gzip
+import json
+import time
+import random
+import argparse
+import tempfile
+
+from helper.artifact_format import ARTIFACT_FORMATS, artifact_path, read_timeline, write_timeline
+from helper.timeline_table import build_frame_table
+from benchmarks.fake_openai import fake_frame_analysis
+
+
+def synthetic_document(frames: int) -> dict:
+    random.seed(frames)
+    timeline = []
+    for index in range(frames):
+        seconds = 9 * 3600 + index * 5
+        timeline.append({
+            "time_from_start": f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}",
+            "analysis": json.dumps(fake_frame_analysis()),
+        })
+    return {
+        "timeline": timeline,
+        "total_screenshots": frames,
+        "processing_time": "0.00 seconds",
+        "last_updated": "2025-01-06T09:00:00",
+    }
+
+
+def best_time(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start_time)
+    return min(timings)
+
+
+def load(path: str):
+    build_frame_table(read_timeline(path).get("timeline", []))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=2200, help="Frames in the synthetic timeline")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the fastest is reported")
+    parser.add_argument("--output", help="Optional path to write the results as JSON")
+    args = parser.parse_args()
+
+    document = synthetic_document(args.frames)
+    rows = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for artifact_format in ARTIFACT_FORMATS:
+            path = artifact_path(os.path.join(temp_dir, "analysis"), artifact_format)
+            try:
+                write_seconds = best_time(lambda: write_timeline(path, document), args.repeat)
+            except ImportError as e:
+                print(f"Skipping {artifact_format}: {e}")
+                continue
+            rows.append({
+                "format": artifact_format,
+                "bytes": os.path.getsize(path),
+                "write_ms": round(write_seconds * 1000, 1),
+                "load_ms": round(best_time(lambda: load(path), args.repeat) * 1000, 1),
+            })
+
+        with open(artifact_path(os.path.join(temp_dir, "analysis"), "json"), "rb") as f:
+            gzipped_json = len(gzip.compress(f.read(), compresslevel=6))
+
+    baseline = rows[0]
+    print(f"{args.frames} frames")
+    print("format      bytes      vs json  write ms  load ms  load vs json")
+    for row in rows:
+        print(
+            f"{row['format']:<10}  {row['bytes']:>9}  {row['bytes'] / baseline['bytes']:>7.1%}  "
+            f"{row['write_ms']:>8}  {row['load_ms']:>7}  {row['load_ms'] / baseline['load_ms']:>11.1%}"
+        )
+    print(f"json, gzipped for transfer: {gzipped_json} bytes ({gzipped_json / baseline['bytes']:.1%})")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"frames": args.frames, "runs": rows, "gzipped_json_bytes": gzipped_json}, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Measure the TCP/TLS handshake overhead saved by the shared OpenAI connection pool.
+
+Replays the pipeline's request pattern (several stages per submission, several
+submissions per warm process) in two modes:
+    per_stage: a new HTTP client per stage, as when each stage built its own AsyncOpenAI
+    shared:    one pooled client for everything, as helper.openai_client provides
+Connection setup time is taken from httpx's connection trace events.
+
+Usage:
+    OPENAI_API_KEY=... python -m benchmarks.connection_pool_benchmark --submissions 3 --stages 3 --requests-per-stage 10
+"""
+import os
+import json
+import time
+import argparse
+import trio
+
+from helper.openai_client import build_http_client, http2_available
+
+
+class HandshakeCounter:
+    """httpx trace hook summing connect and TLS setup time"""
+
+    def __init__(self):
+        self.connections = 0
+        self.seconds = 0.0
+        self.started = {}
+
+    async def __call__(self, event_name: str, info: dict):
+        for phase in ("connect_tcp", "start_tls"):
+            if event_name == f"connection.{phase}.started":
+                self.started[(phase, id(info))] = time.perf_counter()
+            elif event_name == f"connection.{phase}.complete":
+                started = self.started.pop((phase, id(info)), None)
+                if started is not None:
+                    self.seconds += time.perf_counter() - started
+                if phase == "connect_tcp":
+                    self.connections += 1
+
+
+async def run_stage(client, url: str, headers: dict, requests: int, concurrency: int, counter: HandshakeCounter):
+    limiter = trio.CapacityLimiter(concurrency)
+
+    async def one():
+        async with limiter:
+            response = await client.get(url, headers=headers, extensions={"trace": counter})
+            await response.aread()
+
+    async with trio.open_nursery() as nursery:
+        for _ in range(requests):
+            nursery.start_soon(one)
+
+
+async def run_mode(mode: str, args, headers: dict) -> dict:
+    counter = HandshakeCounter()
+    start_time = time.perf_counter()
+    shared = build_http_client(args.concurrency) if mode == "shared" else None
+
+    for _ in range(args.submissions):
+        for _ in range(args.stages):
+            client = shared or build_http_client(args.concurrency)
+            await run_stage(client, args.url, headers, args.requests_per_stage, args.concurrency, counter)
+            if shared is None:
+                await client.aclose()
+
+    if shared is not None:
+        await shared.aclose()
+    return {
+        "mode": mode,
+        "connections": counter.connections,
+        "handshake_seconds": round(counter.seconds, 3),
+        "wall_clock_seconds": round(time.perf_counter() - start_time, 3),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="https://api.openai.com/v1/models", help="Cheap endpoint to request")
+    parser.add_argument("--submissions", type=int, default=3, help="Submissions per warm process")
+    parser.add_argument("--stages", type=int, default=3, help="Stages per submission that used to build a client")
+    parser.add_argument("--requests-per-stage", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--output", help="Optional path to write the results as JSON")
+    args = parser.parse_args()
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+
+    rows = [await run_mode("per_stage", args, headers), await run_mode("shared", args, headers)]
+    per_stage, shared = rows
+    saved = {
+        "connections_per_submission": round((per_stage["connections"] - shared["connections"]) / args.submissions, 2),
+        "handshake_seconds_per_submission": round(
+            (per_stage["handshake_seconds"] - shared["handshake_seconds"]) / args.submissions, 3
+        ),
+    }
+
+    print(f"HTTP/2: {http2_available()}")
+    print("mode        connections  handshake s  wall s")
+    for row in rows:
+        print(f"{row['mode']:<10}  {row['connections']:>11}  {row['handshake_seconds']:>11}  {row['wall_clock_seconds']:>6}")
+    print(f"Saved per submission: {saved['connections_per_submission']} connections, "
+          f"{saved['handshake_seconds_per_submission']}s of handshakes")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"runs": rows, "saved": saved, "http2": http2_available()}, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    trio.run(main)
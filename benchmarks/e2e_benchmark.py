@@ -0,0 +1,283 @@
+"""
+End-to-end pipeline benchmark against local fake OpenAI and S3 servers.
+
+Runs helper.entry.main (frame analysis, then timeline_analysis.main and
+upload_to_S3.main) on synthetic screenshot sets without touching real
+services. Each size runs in a fresh child process and working directory, so
+peak RSS and caches are per run. Results are written to benchmarks/results/ and
+compared with the previous results file to make regressions visible.
+
+Usage:
+    python -m benchmarks.e2e_benchmark --sizes 100 1000 5000 --latency 1.0 --error-rate 0.01 --rate-limit-rate 0.02
+"""
+import os
+import sys
+import glob
+import json
+import time
+import random
+import resource
+import argparse
+import tempfile
+import subprocess
+from io import BytesIO
+from datetime import datetime, timezone, timedelta
+
+from benchmarks.fake_openai import FakeOpenAIState, start_fake_openai
+from benchmarks.fake_s3 import FakeS3State, start_fake_s3
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+BUCKET_NAME = "bench-screenshots"
+FRAME_INTERVAL_SECONDS = 5
+# Capture time of the first synthetic frame (UTC), encoded in the filenames
+SESSION_START = datetime(2025, 1, 6, 9, 0, 0, tzinfo=timezone.utc)
+
+
+def synthetic_frame(scene: int, step: int, width: int = 1280, height: int = 800) -> bytes:
+    """A JPEG screenshot: a scene of coloured panels plus a per-frame cursor"""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(scene)
+    image = Image.new("RGB", (width, height), (30, 30, 30))
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        x, y = rng.randrange(width), rng.randrange(height)
+        w, h = rng.randrange(80, 500), rng.randrange(20, 300)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.rectangle([x, y, x + w, y + h], fill=color)
+    for line in range(30):
+        draw.text((20, 20 + line * 24), f"scene {scene} line {line} " * 4, fill=(220, 220, 220))
+    # Frames within a scene differ only by the cursor, so dedup has work to do
+    draw.rectangle([40 + step * 12, 700, 48 + step * 12, 716], fill=(255, 255, 255))
+
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=80)
+    return buffer.getvalue()
+
+
+def seed_screenshots(s3_state: FakeS3State, submission_id: str, frames: int):
+    """Write `frames` synthetic screenshots under screenshots/<submission_id>/ unless already there"""
+    prefix = f"screenshots/{submission_id}/"
+    if len(s3_state.list(BUCKET_NAME, prefix)) >= frames:
+        return
+
+    print(f"Seeding {frames} synthetic frames for {submission_id}")
+    rng = random.Random(frames)
+    scene, step, scene_length = 0, 0, 1
+    for index in range(frames):
+        if step >= scene_length:
+            scene, step, scene_length = scene + 1, 0, rng.randint(1, 4)
+        # Same YYYYMMDDHHMMSSmmm naming as the recorder, so frame times parse
+        captured_at = SESSION_START + timedelta(seconds=index * FRAME_INTERVAL_SECONDS)
+        name = f"{captured_at.strftime('%Y%m%d%H%M%S')}000.jpg"
+        s3_state.put(BUCKET_NAME, prefix + name, synthetic_frame(scene, step))
+        step += 1
+
+
+def percentile(values, fraction: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_child(submission_id: str, frames: int, result_path: str):
+    """Body of the child process: run the full pipeline once and write measurements"""
+    import trio
+    from helper import entry
+
+    latencies = []
+    single = entry.analyze_single_image
+    group = entry.analyze_frame_group
+
+    async def timed_single(*args, **kwargs):
+        start_time = time.time()
+        result = await single(*args, **kwargs)
+        latencies.append(time.time() - start_time)
+        return result
+
+    async def timed_group(client, frames_batch, *args, **kwargs):
+        start_time = time.time()
+        results = await group(client, frames_batch, *args, **kwargs)
+        latencies.extend([time.time() - start_time] * len(frames_batch))
+        return results
+
+    entry.analyze_single_image = timed_single
+    entry.analyze_frame_group = timed_group
+
+    start_time = time.time()
+    trio.run(entry.main, submission_id, "bench", "bench")
+    wall_clock = time.time() - start_time
+
+    with open(result_path, "w") as f:
+        json.dump({
+            "frames": frames,
+            "wall_clock_seconds": round(wall_clock, 2),
+            "frames_per_second": round(frames / wall_clock, 2) if wall_clock else None,
+            "api_calls_timed": len(latencies),
+            "p50_frame_latency_seconds": round(percentile(latencies, 0.5), 3) if latencies else None,
+            "p99_frame_latency_seconds": round(percentile(latencies, 0.99), 3) if latencies else None,
+            "peak_rss_mb": round(peak_rss_bytes() / 1024 / 1024, 1),
+        }, f)
+
+
+def run_size(frames: int, openai_url: str, s3_url: str, openai_state, s3_state, extra_env: dict) -> dict:
+    submission_id = f"bench-{frames}"
+    seed_screenshots(s3_state, submission_id, frames)
+    openai_state.reset()
+    s3_state.reset()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        result_path = os.path.join(work_dir, "result.json")
+        env = dict(os.environ)
+        env.update({
+            "PYTHONPATH": REPO_ROOT + os.pathsep + env.get("PYTHONPATH", ""),
+            "OPENAI_API_KEY": "sk-fake",
+            "OPENAI_BASE_URL": openai_url,
+            "S3_ENDPOINT_URL": s3_url,
+            "S3_BUCKET_NAME": BUCKET_NAME,
+            "AWS_ACCESS_KEY_ID": "fake",
+            "AWS_SECRET_ACCESS_KEY": "fake",
+            "AWS_REGION": "us-east-1",
+            "ANALYSIS_CACHE_PATH": os.path.join(work_dir, "cache.db"),
+            "RESUME_ANALYSIS": "0",
+            "MAX_FRAME_INDEX": str(frames),
+        })
+        env.update(extra_env)
+
+        print(f"Running {submission_id}...")
+        with open(os.path.join(work_dir, "pipeline.log"), "w") as log:
+            completed = subprocess.run(
+                [sys.executable, "-m", "benchmarks.e2e_benchmark", "--child", submission_id,
+                 "--frames-in-set", str(frames), "--result", result_path],
+                cwd=work_dir, env=env, stdout=log, stderr=subprocess.STDOUT
+            )
+        if completed.returncode != 0 or not os.path.exists(result_path):
+            with open(os.path.join(work_dir, "pipeline.log")) as log:
+                tail = log.read()[-2000:]
+            return {"frames": frames, "error": f"exit code {completed.returncode}", "log_tail": tail}
+
+        with open(result_path) as f:
+            result = json.load(f)
+
+    result["openai"] = openai_state.stats()
+    result["s3"] = s3_state.stats()
+    return result
+
+
+def git_version() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "describe", "--always", "--dirty"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare_with_previous(report: dict, previous_path: str):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    before = {row["frames"]: row for row in previous.get("runs", []) if "error" not in row}
+
+    print(f"\nCompared with {os.path.basename(previous_path)} ({previous.get('version')}):")
+    for row in report["runs"]:
+        old = before.get(row["frames"])
+        if old is None or "error" in row:
+            continue
+        changes = []
+        for metric in ("frames_per_second", "p99_frame_latency_seconds", "peak_rss_mb", "wall_clock_seconds"):
+            if old.get(metric) and row.get(metric) is not None:
+                changes.append(f"{metric} {old[metric]} -> {row[metric]} ({(row[metric] - old[metric]) / old[metric]:+.1%})")
+        print(f"  {row['frames']} frames: " + "; ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000], help="Screenshot set sizes to run")
+    parser.add_argument("--latency", type=float, default=1.0, help="Mean fake OpenAI response time in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.01, help="Fraction of OpenAI calls answered with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.02, help="Fraction of OpenAI calls answered with a 429")
+    parser.add_argument("--frames-per-request", type=int, default=1, help="Passed to the pipeline as FRAMES_PER_REQUEST")
+    parser.add_argument("--data-dir", help="Directory for the fake S3 store; reused between runs (default: temporary)")
+    parser.add_argument("--label", default="", help="Optional label stored with the results")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--frames-in-set", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.frames_in_set, args.result)
+        return
+
+    temp_dir = None
+    data_dir = args.data_dir
+    if data_dir is None:
+        temp_dir = tempfile.TemporaryDirectory()
+        data_dir = temp_dir.name
+
+    openai_state = FakeOpenAIState(args.latency, args.error_rate, args.rate_limit_rate)
+    s3_state = FakeS3State(data_dir)
+    openai_server = start_fake_openai(openai_state)
+    s3_server = start_fake_s3(s3_state)
+    openai_url = f"http://127.0.0.1:{openai_server.server_port}/v1"
+    s3_url = f"http://127.0.0.1:{s3_server.server_port}"
+
+    runs = []
+    try:
+        for frames in args.sizes:
+            runs.append(run_size(
+                frames, openai_url, s3_url, openai_state, s3_state,
+                {"FRAMES_PER_REQUEST": str(args.frames_per_request)}
+            ))
+    finally:
+        openai_server.shutdown()
+        s3_server.shutdown()
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+    report = {
+        "version": git_version(),
+        "label": args.label,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+            "rate_limit_rate": args.rate_limit_rate,
+            "frames_per_request": args.frames_per_request,
+        },
+        "runs": runs,
+    }
+
+    print("\nframes  wall s  frames/s  p50 s   p99 s   peak RSS MB  429s  5xx")
+    for row in runs:
+        if "error" in row:
+            print(f"{row['frames']:>6}  failed: {row['error']}\n{row['log_tail']}")
+            continue
+        print(
+            f"{row['frames']:>6}  {row['wall_clock_seconds']:>6}  {row['frames_per_second']:>8}  "
+            f"{row['p50_frame_latency_seconds']}  {row['p99_frame_latency_seconds']}  {row['peak_rss_mb']:>11}  "
+            f"{row['openai']['rate_limited']:>4}  {row['openai']['errors']:>3}"
+        )
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    previous = sorted(glob.glob(os.path.join(RESULTS_DIR, "e2e-*.json")))
+    result_path = os.path.join(
+        RESULTS_DIR, f"e2e-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}-{report['version']}.json"
+    )
+    with open(result_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {result_path}")
+
+    if previous:
+        compare_with_previous(report, previous[-1])
+
+
+if __name__ == "__main__":
+    main()
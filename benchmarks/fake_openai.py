@@ -0,0 +1,369 @@
+"""
+Local stand-in for the OpenAI chat completions API, for benchmarks.
+
+Answers POST /v1/chat/completions with canned but well-formed responses for the
+frame analysis, prompt merge and app actions calls. Latency, 5xx errors and
+429s are injected at configurable rates, and the usual x-ratelimit-* headers
+are returned so the client-side rate limiter behaves as it would in production.
+Prompt caching is imitated too: a request whose text before its first image
+was seen before, and is at least MIN_CACHED_PREFIX_TOKENS long, reports that
+prefix in usage.prompt_tokens_details.cached_tokens.
+
+The Batch API endpoints used by helper.batch_mode are served as well: file
+upload and download (/v1/files) and batch create/retrieve (/v1/batches). A batch
+moves one status further each time it is retrieved and answers every request
+line like the chat completions endpoint, injecting errors at the same rate.
+"""
+import json
+import time
+import email.policy
+import random
+import threading
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Tokens billed per high-detail image and the smallest prefix that is cached
+IMAGE_TOKENS = 765
+MIN_CACHED_PREFIX_TOKENS = 1024
+
+ACTIVITIES = ["Coding", "Testing", "Google Search", "Interacting with AI Chatbot", "Reading Documentation"]
+APPS = ["VS Code", "Chrome", "Terminal"]
+
+
+def fake_frame_analysis() -> dict:
+    app = random.choice(APPS)
+    return {
+        "activity": random.choice(ACTIVITIES),
+        "open_windows": [
+            {
+                "app": app,
+                "action": f"Working in {app}",
+                "prompt": random.choice(["", "", "how do I fix this error?", "write a unit test for this"]),
+                "active": True,
+            }
+        ],
+    }
+
+
+def first_json_object(text: str):
+    """The JSON object embedded at the end of a prompt, or None"""
+    start = text.find("{")
+    while start != -1:
+        try:
+            return json.loads(text[start:])
+        except ValueError:
+            start = text.find("{", start + 1)
+    return None
+
+
+class FakeOpenAIState:
+    """
+    Configuration and counters shared by all request handler threads.
+
+    Args:
+        latency (float): Mean response time in seconds (uniform +/- 50%)
+        error_rate (float): Fraction of requests answered with a 500
+        rate_limit_rate (float): Fraction of requests answered with a 429
+        retry_after_ms (int): retry-after-ms sent with injected 429s
+    """
+
+    def __init__(self, latency: float = 1.0, error_rate: float = 0.0, rate_limit_rate: float = 0.0, retry_after_ms: int = 500):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after_ms = retry_after_ms
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.errors = 0
+            self.rate_limited = 0
+            self.images = 0
+            self.cached_tokens = 0
+            self.prefixes = set()
+            self.files = {}
+            self.batches = {}
+
+    def cache_prefix(self, prefix: str, tokens: int) -> int:
+        """Cached tokens for a request starting with `prefix`, remembering it for later requests"""
+        if tokens < MIN_CACHED_PREFIX_TOKENS:
+            return 0
+        with self.lock:
+            if prefix not in self.prefixes:
+                self.prefixes.add(prefix)
+                return 0
+            # Cache hits come in 128 token steps
+            cached = tokens - (tokens - MIN_CACHED_PREFIX_TOKENS) % 128
+            self.cached_tokens += cached
+            return cached
+
+    def count(self, name: str, amount: int = 1):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "rate_limited": self.rate_limited,
+                "images": self.images,
+                "cached_tokens": self.cached_tokens,
+                "batches": len(self.batches),
+            }
+
+    def add_file(self, filename: str, data: bytes, purpose: str) -> dict:
+        with self.lock:
+            file_id = f"file-fake-{len(self.files) + 1}"
+            self.files[file_id] = {
+                "id": file_id,
+                "object": "file",
+                "bytes": len(data),
+                "created_at": int(time.time()),
+                "filename": filename,
+                "purpose": purpose,
+                "status": "processed",
+                "data": data,
+            }
+            return {key: value for key, value in self.files[file_id].items() if key != "data"}
+
+    def create_batch(self, body: dict) -> dict:
+        with self.lock:
+            batch_id = f"batch_fake_{len(self.batches) + 1}"
+            self.batches[batch_id] = {
+                "id": batch_id,
+                "object": "batch",
+                "endpoint": body["endpoint"],
+                "input_file_id": body["input_file_id"],
+                "completion_window": body["completion_window"],
+                "metadata": body.get("metadata"),
+                "status": "validating",
+                "created_at": int(time.time()),
+                "output_file_id": None,
+                "error_file_id": None,
+                "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            }
+            return dict(self.batches[batch_id])
+
+    def poll_batch(self, batch_id: str):
+        """Current state of a batch, advanced by one status; runs it on reaching completed"""
+        with self.lock:
+            batch = self.batches.get(batch_id)
+            if batch is None:
+                return None
+            if batch["status"] == "validating":
+                batch["status"] = "in_progress"
+                return dict(batch)
+            if batch["status"] != "in_progress":
+                return dict(batch)
+            lines = self.files[batch["input_file_id"]]["data"].decode("utf-8").splitlines()
+
+        outputs, errors = [], []
+        for line in lines:
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            record = {"id": f"batch_req_{len(outputs) + len(errors)}", "custom_id": request["custom_id"], "error": None}
+            if random.random() < self.error_rate:
+                record["response"] = {"status_code": 500, "body": {"error": {"message": "Injected server error"}}}
+                errors.append(record)
+            else:
+                record["response"] = {"status_code": 200, "body": chat_completion(self, request["body"])}
+                outputs.append(record)
+
+        output_file = self.add_file("output.jsonl", "".join(json.dumps(r) + "\n" for r in outputs).encode("utf-8"), "batch_output")
+        error_file = self.add_file("errors.jsonl", "".join(json.dumps(r) + "\n" for r in errors).encode("utf-8"), "batch_output")
+        with self.lock:
+            batch.update({
+                "status": "completed",
+                "output_file_id": output_file["id"],
+                "error_file_id": error_file["id"] if errors else None,
+                "request_counts": {"total": len(outputs) + len(errors), "completed": len(outputs), "failed": len(errors)},
+            })
+            return dict(batch)
+
+
+def image_request_prefix(body: dict) -> str:
+    """Text of the messages before the first image, in order"""
+    texts = []
+    for message in body["messages"]:
+        content = message["content"]
+        for part in content if isinstance(content, list) else [{"type": "text", "text": content}]:
+            if part.get("type") == "image_url":
+                return "\n".join(texts)
+            texts.append(part.get("text", ""))
+    return "\n".join(texts)
+
+
+def completion_content(body: dict):
+    """Pick a response for the request; returns (content, image count)"""
+    message = body["messages"][-1]["content"]
+    if isinstance(message, list):
+        images = sum(1 for part in message if part.get("type") == "image_url")
+        if images == 1:
+            analysis = fake_frame_analysis()
+            if any("contains_ai_prompt" in part.get("text", "") for part in message):
+                # Model cascade tier-1 request
+                analysis["confidence"] = round(random.uniform(0.5, 1.0), 2)
+                analysis["contains_ai_prompt"] = bool(analysis["open_windows"][0]["prompt"])
+            return json.dumps(analysis), 1
+        frames = [dict(fake_frame_analysis(), frame=number) for number in range(1, images + 1)]
+        return json.dumps({"frames": frames}), images
+
+    if body.get("model", "").startswith("o1"):
+        data = first_json_object(message) or {}
+        timeline = data.get("app_actions_timeline", [])
+        summary = [
+            {"activity": "Working", "time": timeline[0]["time"] if timeline else "0:00:00", "details": ["Synthetic summary"]}
+        ]
+        return "```json\n" + json.dumps(summary) + "\n```", 0
+
+    if "consecutive" in message:
+        return json.dumps({"merged": False}), 0
+
+    # Prompt merge: hand the input back unchanged
+    return json.dumps(first_json_object(message) or {}), 0
+
+
+def chat_completion(state: FakeOpenAIState, body: dict) -> dict:
+    """A chat.completion response body for a request body"""
+    content, images = completion_content(body)
+    state.count("images", images)
+    cached_tokens = 0
+    if images:
+        prefix = image_request_prefix(body)
+        prompt_tokens = len(prefix) // 4 + IMAGE_TOKENS * images
+        cached_tokens = state.cache_prefix(prefix, len(prefix) // 4)
+    else:
+        prompt_tokens = len(json.dumps(body)) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": f"chatcmpl-fake-{state.requests}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        },
+    }
+
+
+def make_handler(state: FakeOpenAIState):
+    class FakeOpenAIHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_body(self, status: int, payload: dict, headers: dict = None):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            raw_body = self.rfile.read(length)
+            state.count("requests")
+
+            path = self.path.split("?")[0].rstrip("/")
+            if path.endswith("/files"):
+                self.upload_file(raw_body)
+                return
+            if path.endswith("/batches"):
+                self.send_body(200, state.create_batch(json.loads(raw_body)))
+                return
+            if not path.endswith("/chat/completions"):
+                self.send_body(404, {"error": {"message": f"Not implemented: {self.path}"}})
+                return
+
+            time.sleep(state.latency * random.uniform(0.5, 1.5))
+
+            roll = random.random()
+            if roll < state.rate_limit_rate:
+                state.count("rate_limited")
+                self.send_body(
+                    429,
+                    {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                    {"retry-after-ms": str(state.retry_after_ms)}
+                )
+                return
+            if roll < state.rate_limit_rate + state.error_rate:
+                state.count("errors")
+                self.send_body(500, {"error": {"message": "Injected server error", "type": "server_error"}})
+                return
+
+            body = json.loads(raw_body)
+            self.send_body(
+                200,
+                chat_completion(state, body),
+                {
+                    "x-ratelimit-remaining-requests": "4999",
+                    "x-ratelimit-remaining-tokens": "799000",
+                    "x-ratelimit-reset-requests": "12ms",
+                    "x-ratelimit-reset-tokens": "75ms",
+                }
+            )
+
+        def upload_file(self, raw_body: bytes):
+            """POST /v1/files: multipart form with `purpose` and `file`"""
+            message = BytesParser(policy=email.policy.HTTP).parsebytes(
+                b"Content-Type: " + self.headers["Content-Type"].encode("latin-1") + b"\r\n\r\n" + raw_body
+            )
+            fields = {part.get_param("name", header="content-disposition"): part for part in message.iter_parts()}
+            file_part = fields["file"]
+            self.send_body(200, state.add_file(
+                file_part.get_filename() or "upload.jsonl",
+                file_part.get_payload(decode=True),
+                fields["purpose"].get_payload(decode=True).decode("utf-8")
+            ))
+
+        def do_GET(self):
+            state.count("requests")
+            path = self.path.split("?")[0].rstrip("/")
+            parts = path.split("/")
+            if "/batches/" in path:
+                batch = state.poll_batch(parts[-1])
+                if batch is None:
+                    self.send_body(404, {"error": {"message": f"No such batch: {parts[-1]}"}})
+                    return
+                self.send_body(200, batch)
+                return
+            if path.endswith("/content") and "/files/" in path:
+                content = state.files.get(parts[-2])
+                if content is None:
+                    self.send_body(404, {"error": {"message": f"No such file: {parts[-2]}"}})
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(content["data"])))
+                self.end_headers()
+                self.wfile.write(content["data"])
+                return
+            self.send_body(404, {"error": {"message": f"Not implemented: {self.path}"}})
+
+    return FakeOpenAIHandler
+
+
+def start_fake_openai(state: FakeOpenAIState, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Serve in a daemon thread; the base URL is http://host:server.server_port/v1"""
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
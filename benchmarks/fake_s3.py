@@ -0,0 +1,258 @@
+"""
+Minimal local S3 stand-in for benchmarks, backed by a directory.
+
+Supports the calls the pipeline makes with path-style addressing: ListObjectsV2,
+GetObject, HeadObject, PutObject and multipart uploads. Buckets are created on
+first write. Request signatures are not checked.
+"""
+import os
+import time
+import uuid
+import hashlib
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+from xml.sax.saxutils import escape
+
+
+class FakeS3State:
+    """
+    Object store rooted at `root`, plus transfer counters.
+
+    Args:
+        root (str): Directory holding one sub-directory per bucket
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.lock = threading.Lock()
+        self.uploads = {}
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.gets = 0
+            self.puts = 0
+            self.bytes_out = 0
+            self.bytes_in = 0
+
+    def count(self, name: str, amount: int = 1):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"gets": self.gets, "puts": self.puts, "bytes_out": self.bytes_out, "bytes_in": self.bytes_in}
+
+    def object_path(self, bucket: str, key: str) -> str:
+        return os.path.join(self.root, bucket, *key.split("/"))
+
+    def put(self, bucket: str, key: str, data: bytes):
+        path = self.object_path(bucket, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def list(self, bucket: str, prefix: str):
+        bucket_root = os.path.join(self.root, bucket)
+        keys = []
+        for root, dirs, files in os.walk(bucket_root):
+            for file in files:
+                key = os.path.relpath(os.path.join(root, file), bucket_root).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    keys.append(key)
+        return sorted(keys)
+
+
+def decode_aws_chunked(data: bytes) -> bytes:
+    """Strip aws-chunked framing (size;chunk-signature\\r\\n data \\r\\n ... trailers)"""
+    decoded = bytearray()
+    position = 0
+    while position < len(data):
+        line_end = data.index(b"\r\n", position)
+        size = int(data[position:line_end].split(b";")[0], 16)
+        if size == 0:
+            break
+        start = line_end + 2
+        decoded += data[start:start + size]
+        position = start + size + 2
+    return bytes(decoded)
+
+
+def make_handler(state: FakeS3State):
+    class FakeS3Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def parse(self):
+            url = urlparse(self.path)
+            parts = unquote(url.path).lstrip("/").split("/", 1)
+            bucket = parts[0]
+            key = parts[1] if len(parts) > 1 else ""
+            return bucket, key, parse_qs(url.query, keep_blank_values=True)
+
+        def read_body(self) -> bytes:
+            if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                data = bytearray()
+                while True:
+                    size = int(self.rfile.readline().split(b";")[0], 16)
+                    if size == 0:
+                        self.rfile.readline()
+                        break
+                    data += self.rfile.read(size)
+                    self.rfile.readline()
+                data = bytes(data)
+            else:
+                data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if "aws-chunked" in self.headers.get("Content-Encoding", ""):
+                data = decode_aws_chunked(data)
+            return data
+
+        def reply(self, status: int, body: bytes = b"", headers: dict = None, content_type: str = "application/xml"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def not_found(self, key: str):
+            body = f"<Error><Code>NoSuchKey</Code><Message>{escape(key)}</Message></Error>".encode()
+            self.reply(404, body)
+
+        def do_GET(self):
+            bucket, key, query = self.parse()
+            if not key:
+                self.list_objects(bucket, query)
+                return
+
+            path = state.object_path(bucket, key)
+            if not os.path.isfile(path):
+                self.not_found(key)
+                return
+            with open(path, "rb") as f:
+                data = f.read()
+            state.count("gets")
+            state.count("bytes_out", len(data))
+            self.reply(200, data, self.object_headers(path, data), "application/octet-stream")
+
+        def do_HEAD(self):
+            bucket, key, _ = self.parse()
+            path = state.object_path(bucket, key)
+            if not os.path.isfile(path):
+                self.not_found(key)
+                return
+            with open(path, "rb") as f:
+                data = f.read()
+            self.send_response(200)
+            for name, value in self.object_headers(path, data).items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+
+        def object_headers(self, path: str, data: bytes) -> dict:
+            return {
+                "ETag": f"\"{hashlib.md5(data).hexdigest()}\"",
+                "Last-Modified": formatdate(os.path.getmtime(path), usegmt=True),
+                "Accept-Ranges": "bytes",
+            }
+
+        def list_objects(self, bucket: str, query: dict):
+            prefix = query.get("prefix", [""])[0]
+            max_keys = int(query.get("max-keys", ["1000"])[0])
+            start = int(query.get("continuation-token", ["0"])[0] or 0)
+            keys = state.list(bucket, prefix)
+            page = keys[start:start + max_keys]
+            truncated = start + max_keys < len(keys)
+
+            contents = "".join(
+                f"<Contents><Key>{escape(key)}</Key>"
+                f"<LastModified>{time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())}</LastModified>"
+                f"<ETag>\"0\"</ETag><Size>{os.path.getsize(state.object_path(bucket, key))}</Size>"
+                f"<StorageClass>STANDARD</StorageClass></Contents>"
+                for key in page
+            )
+            next_token = f"<NextContinuationToken>{start + max_keys}</NextContinuationToken>" if truncated else ""
+            body = (
+                "<?xml version=\"1.0\" encoding=\"UTF-8\"?>"
+                "<ListBucketResult xmlns=\"http://s3.amazonaws.com/doc/2006-03-01/\">"
+                f"<Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix>"
+                f"<KeyCount>{len(page)}</KeyCount><MaxKeys>{max_keys}</MaxKeys>"
+                f"<IsTruncated>{'true' if truncated else 'false'}</IsTruncated>"
+                f"{contents}{next_token}</ListBucketResult>"
+            ).encode()
+            self.reply(200, body)
+
+        def do_PUT(self):
+            bucket, key, query = self.parse()
+            data = self.read_body()
+            state.count("puts")
+            state.count("bytes_in", len(data))
+            etag = f"\"{hashlib.md5(data).hexdigest()}\""
+
+            if "uploadId" in query:
+                upload_id = query["uploadId"][0]
+                part_number = int(query["partNumber"][0])
+                with state.lock:
+                    state.uploads[upload_id]["parts"][part_number] = data
+            elif key:
+                state.put(bucket, key, data)
+            self.reply(200, headers={"ETag": etag})
+
+        def do_POST(self):
+            bucket, key, query = self.parse()
+            self.read_body()
+
+            if "uploads" in query:
+                upload_id = uuid.uuid4().hex
+                with state.lock:
+                    state.uploads[upload_id] = {"bucket": bucket, "key": key, "parts": {}}
+                body = (
+                    "<?xml version=\"1.0\" encoding=\"UTF-8\"?><InitiateMultipartUploadResult>"
+                    f"<Bucket>{escape(bucket)}</Bucket><Key>{escape(key)}</Key><UploadId>{upload_id}</UploadId>"
+                    "</InitiateMultipartUploadResult>"
+                ).encode()
+                self.reply(200, body)
+                return
+
+            if "uploadId" in query:
+                with state.lock:
+                    upload = state.uploads.pop(query["uploadId"][0])
+                data = b"".join(upload["parts"][number] for number in sorted(upload["parts"]))
+                state.put(bucket, key, data)
+                body = (
+                    "<?xml version=\"1.0\" encoding=\"UTF-8\"?><CompleteMultipartUploadResult>"
+                    f"<Bucket>{escape(bucket)}</Bucket><Key>{escape(key)}</Key>"
+                    f"<ETag>\"{hashlib.md5(data).hexdigest()}-{len(upload['parts'])}\"</ETag>"
+                    "</CompleteMultipartUploadResult>"
+                ).encode()
+                self.reply(200, body)
+                return
+
+            self.reply(400, b"<Error><Code>InvalidRequest</Code></Error>")
+
+        def do_DELETE(self):
+            bucket, key, query = self.parse()
+            if "uploadId" in query:
+                with state.lock:
+                    state.uploads.pop(query["uploadId"][0], None)
+            else:
+                path = state.object_path(bucket, key)
+                if os.path.isfile(path):
+                    os.remove(path)
+            self.reply(204)
+
+    return FakeS3Handler
+
+
+def start_fake_s3(state: FakeS3State, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Serve in a daemon thread; point S3_ENDPOINT_URL at http://host:server.server_port"""
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
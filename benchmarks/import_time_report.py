@@ -0,0 +1,98 @@
+"""
+Import-time profile of the serverless handler's cold start.
+
+Imports a module in a fresh interpreter under `python -X importtime` and
+reports the total, the slowest individual imports and the cost per top-level
+package. With --budget-ms the script exits non-zero when the cold import goes
+over budget, so it can guard cold-start latency in CI. Reports are stored in
+benchmarks/results/ next to the end-to-end benchmark results.
+
+Usage:
+    python -m benchmarks.import_time_report --module api.index --top 20 --budget-ms 300
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+
+def profile_import(module: str):
+    """Rows of (self_us, cumulative_us, depth, name) for `import module`"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return rows
+
+
+def summarize(rows, top: int):
+    # Top-level entries (depth 0 after the leading space) add up to the whole import
+    total_us = sum(cumulative for _, cumulative, depth, _ in rows if depth == 0)
+    by_package = {}
+    for self_us, _, _, name in rows:
+        package = name.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+
+    slowest = sorted(rows, key=lambda row: row[1], reverse=True)[:top]
+    return {
+        "total_ms": round(total_us / 1000, 1),
+        "modules": len(rows),
+        "slowest_cumulative_ms": [{"module": name, "ms": round(cumulative / 1000, 1)} for _, cumulative, _, name in slowest],
+        "by_package_ms": {
+            package: round(us / 1000, 1)
+            for package, us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="api.index", help="Module whose cold import is profiled")
+    parser.add_argument("--top", type=int, default=15, help="Rows to show per section")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to run; the fastest is reported")
+    parser.add_argument("--budget-ms", type=float, help="Fail when the import takes longer than this")
+    parser.add_argument("--no-save", action="store_true", help="Do not write a report to benchmarks/results/")
+    args = parser.parse_args()
+
+    reports = [summarize(profile_import(args.module), args.top) for _ in range(args.runs)]
+    report = min(reports, key=lambda item: item["total_ms"])
+
+    print(f"import {args.module}: {report['total_ms']} ms across {report['modules']} modules (best of {args.runs})")
+    print("\nSlowest imports (cumulative ms):")
+    for row in report["slowest_cumulative_ms"]:
+        print(f"  {row['ms']:>8}  {row['module']}")
+    print("\nSelf time by top-level package (ms):")
+    for package, ms in report["by_package_ms"].items():
+        print(f"  {ms:>8}  {package}")
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(
+            RESULTS_DIR, f"import-time-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}.json"
+        )
+        with open(path, "w") as f:
+            json.dump(dict(report, module=args.module, timestamp=datetime.now(timezone.utc).isoformat()), f, indent=2)
+        print(f"\nReport saved to {path}")
+
+    if args.budget_ms is not None and report["total_ms"] > args.budget_ms:
+        print(f"Cold import of {args.module} is over budget: {report['total_ms']} ms > {args.budget_ms} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Peak memory of frame analysis as the number of frames grows.
+
+Runs helper.entry.analyze_screenshots on local folders of 100 to 5000 synthetic
+high-resolution screenshots against the fake OpenAI server, each size in a
+fresh child process, and reports peak RSS per size. With a bounded in-flight
+byte budget, peak RSS should stay flat: only the small per-frame results grow
+with the frame count. --max-growth-mb turns the run into a check that exits
+non-zero when peak RSS grows more than that between the smallest and largest size.
+
+Usage:
+    python -m benchmarks.memory_benchmark --sizes 100 1000 5000 --inflight-mb 64 --max-growth-mb 40
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+from datetime import timedelta
+
+from benchmarks.e2e_benchmark import (
+    REPO_ROOT, FRAME_INTERVAL_SECONDS, SESSION_START, synthetic_frame, peak_rss_bytes
+)
+from benchmarks.fake_openai import FakeOpenAIState, start_fake_openai
+
+
+def seed_folder(folder: str, frames: int, distinct: int, width: int, height: int):
+    """Write `frames` screenshots named like recorder output, cycling through `distinct` images"""
+    os.makedirs(folder, exist_ok=True)
+    images = [synthetic_frame(scene, 0, width, height) for scene in range(min(distinct, frames))]
+    for index in range(frames):
+        captured_at = SESSION_START + timedelta(seconds=index * FRAME_INTERVAL_SECONDS)
+        with open(os.path.join(folder, f"{captured_at.strftime('%Y%m%d%H%M%S')}000.jpg"), "wb") as f:
+            f.write(images[index % len(images)])
+    return sum(len(image) for image in images) // len(images)
+
+
+def run_child(folder: str, concurrency: int, inflight_mb: float, result_path: str):
+    """Body of the child process: analyze the folder once and write measurements"""
+    import trio
+    from helper import entry
+    from helper.memory_budget import ByteBudget
+
+    baseline = peak_rss_bytes()
+    budget = ByteBudget(int(inflight_mb * 1024 * 1024))
+    timeline = trio.run(
+        lambda: entry.analyze_screenshots(
+            folder, "sk-fake", os.path.join(folder, "analysis.json"), None, concurrency, memory_budget=budget
+        )
+    )
+
+    with open(result_path, "w") as f:
+        json.dump({
+            "frames": len(timeline),
+            "errors": sum(1 for row in timeline if "error" in row),
+            "baseline_rss_mb": round(baseline / 1024 / 1024, 1),
+            "peak_rss_mb": round(peak_rss_bytes() / 1024 / 1024, 1),
+            "budget_peak_mb": round(budget.stats()["peak_bytes"] / 1024 / 1024, 1),
+            "budget_waits": budget.stats()["waits"],
+        }, f)
+
+
+def run_size(frames: int, args, openai_url: str) -> dict:
+    work_dir = tempfile.mkdtemp()
+    try:
+        folder = os.path.join(work_dir, "screenshots")
+        average_size = seed_folder(folder, frames, args.distinct, args.width, args.height)
+        result_path = os.path.join(work_dir, "result.json")
+        env = dict(os.environ)
+        env.update({
+            "PYTHONPATH": REPO_ROOT + os.pathsep + env.get("PYTHONPATH", ""),
+            "OPENAI_API_KEY": "sk-fake",
+            "OPENAI_BASE_URL": openai_url,
+        })
+
+        print(f"Running {frames} frames...")
+        with open(os.path.join(work_dir, "child.log"), "w") as log:
+            completed = subprocess.run(
+                [sys.executable, "-m", "benchmarks.memory_benchmark", "--child", folder,
+                 "--concurrency", str(args.concurrency), "--inflight-mb", str(args.inflight_mb),
+                 "--result", result_path],
+                cwd=work_dir, env=env, stdout=log, stderr=subprocess.STDOUT
+            )
+        if completed.returncode != 0 or not os.path.exists(result_path):
+            with open(os.path.join(work_dir, "child.log")) as log:
+                return {"frames": frames, "error": f"exit code {completed.returncode}", "log_tail": log.read()[-2000:]}
+
+        with open(result_path) as f:
+            result = json.load(f)
+        result["average_frame_kb"] = round(average_size / 1024, 1)
+        return result
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000], help="Frame counts to run")
+    parser.add_argument("--concurrency", type=int, default=60, help="Concurrent API calls (max_concurrent)")
+    parser.add_argument("--inflight-mb", type=float, default=64, help="In-flight byte budget in MB")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mean fake OpenAI response time in seconds")
+    parser.add_argument("--width", type=int, default=2560, help="Synthetic screenshot width")
+    parser.add_argument("--height", type=int, default=1600, help="Synthetic screenshot height")
+    parser.add_argument("--distinct", type=int, default=50, help="Distinct images cycled through per folder")
+    parser.add_argument("--max-growth-mb", type=float, help="Fail when peak RSS grows more than this across sizes")
+    parser.add_argument("--output", help="Optional path to write the results as JSON")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.concurrency, args.inflight_mb, args.result)
+        return
+
+    openai_server = start_fake_openai(FakeOpenAIState(args.latency))
+    openai_url = f"http://127.0.0.1:{openai_server.server_port}/v1"
+    try:
+        runs = [run_size(frames, args, openai_url) for frames in sorted(args.sizes)]
+    finally:
+        openai_server.shutdown()
+
+    print("\nframes  frame KB  baseline MB  peak RSS MB  budget peak MB  waits  errors")
+    for row in runs:
+        if "error" in row:
+            print(f"{row['frames']:>6}  failed: {row['error']}\n{row['log_tail']}")
+            continue
+        print(
+            f"{row['frames']:>6}  {row['average_frame_kb']:>8}  {row['baseline_rss_mb']:>11}  {row['peak_rss_mb']:>11}  "
+            f"{row['budget_peak_mb']:>14}  {row['budget_waits']:>5}  {row['errors']:>6}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": vars(args), "runs": runs}, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+    completed = [row for row in runs if "error" not in row]
+    if len(completed) != len(runs):
+        sys.exit(1)
+    if args.max_growth_mb is not None and len(completed) > 1:
+        growth = completed[-1]["peak_rss_mb"] - completed[0]["peak_rss_mb"]
+        print(f"Peak RSS growth from {completed[0]['frames']} to {completed[-1]['frames']} frames: {growth:.1f} MB")
+        if growth > args.max_growth_mb:
+            print(f"Peak RSS grew more than {args.max_growth_mb} MB")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Compare single-frame and multi-frame Vision requests on a folder of screenshots.
+
+For each frames-per-request value the same frames are analyzed from scratch
+(no cache, no dedup) and throughput, tokens and estimated cost per frame are
+reported.
+
+Usage:
+    OPENAI_API_KEY=... python -m benchmarks.multi_frame_benchmark screenshots/<id> --frames 1 2 4 8 --limit 40
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+import trio
+
+from helper.entry import analyze_screenshots
+from helper.rate_limiter import AdaptiveRateLimiter
+
+# gpt-4o list prices in USD per 1M tokens
+INPUT_PRICE = 2.50
+OUTPUT_PRICE = 10.00
+
+
+async def run_once(folder_path: str, api_key: str, limit: int, frames_per_request: int, max_concurrent: int):
+    rate_limiter = AdaptiveRateLimiter(max_concurrent)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        results_file = os.path.join(temp_dir, "results.json")
+        start_time = time.time()
+        timeline = await analyze_screenshots(
+            folder_path,
+            api_key,
+            results_file,
+            [0, limit - 1],
+            max_concurrent,
+            rate_limiter=rate_limiter,
+            frames_per_request=frames_per_request
+        )
+        elapsed = time.time() - start_time
+
+    stats = rate_limiter.stats()
+    frames = len(timeline)
+    errors = sum(1 for entry in timeline if "error" in entry)
+    cost = (stats["prompt_tokens"] * INPUT_PRICE + stats["completion_tokens"] * OUTPUT_PRICE) / 1_000_000
+    return {
+        "frames_per_request": frames_per_request,
+        "frames": frames,
+        "errors": errors,
+        "api_calls": stats["calls"],
+        "wall_clock_seconds": round(elapsed, 2),
+        "frames_per_second": round(frames / elapsed, 2) if elapsed else None,
+        "prompt_tokens_per_frame": round(stats["prompt_tokens"] / frames, 1) if frames else None,
+        "completion_tokens_per_frame": round(stats["completion_tokens"] / frames, 1) if frames else None,
+        "cost_per_frame_usd": round(cost / frames, 6) if frames else None,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("folder", help="Folder of .jpg screenshots")
+    parser.add_argument("--frames", type=int, nargs="+", default=[1, 2, 4, 8], help="Frames per request to compare")
+    parser.add_argument("--limit", type=int, default=40, help="Number of frames to analyze per run")
+    parser.add_argument("--concurrency", type=int, default=10, help="Maximum concurrent API calls")
+    parser.add_argument("--output", help="Optional path to write the results as JSON")
+    args = parser.parse_args()
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    rows = []
+    for frames_per_request in args.frames:
+        row = await run_once(args.folder, api_key, args.limit, frames_per_request, args.concurrency)
+        rows.append(row)
+
+    print("\nframes/request  frames/sec  prompt tok/frame  completion tok/frame  $/frame   errors")
+    for row in rows:
+        print(
+            f"{row['frames_per_request']:>14}  {row['frames_per_second']:>10}  "
+            f"{row['prompt_tokens_per_frame']:>16}  {row['completion_tokens_per_frame']:>20}  "
+            f"{row['cost_per_frame_usd']:>8}  {row['errors']:>6}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    trio.run(main)
@@ -0,0 +1,119 @@
+"""
+Output parity of two frame prompt versions on the same screenshots.
+
+Analyzes every .jpg in --frames-dir (up to --limit) once per prompt version
+with the regular single-frame request and compares the answers frame by frame:
+the activity label, the set of apps in open_windows and the typed prompts.
+Run it on real recordings before pointing PROMPT_VERSION at a new template;
+--min-agreement makes the script exit non-zero when the activity labels agree
+on fewer frames than that.
+
+Usage:
+    OPENAI_API_KEY=... python -m benchmarks.prompt_parity --frames-dir screenshots/<submission_id> --versions 1 2
+"""
+import os
+import sys
+import json
+import argparse
+from typing import Dict, List
+
+import trio
+
+from helper.entry import build_frame_request, encode_image_bytes
+from helper.openai_client import get_openai_client
+from helper.prompt_templates import FRAME_PROMPTS
+
+
+def summarize(content: str) -> Dict:
+    """Activity, apps and typed prompts of one frame analysis (empty when it is not valid JSON)"""
+    try:
+        data = json.loads(content)
+    except (TypeError, ValueError):
+        return {"activity": None, "apps": [], "prompts": []}
+    if isinstance(data, dict) and "activity" not in data:
+        # Version 1 asks for "an array of json object"; json_object mode wraps it
+        lists = [value for value in data.values() if isinstance(value, list) and value]
+        data = lists[0][0] if lists else data
+    if not isinstance(data, dict):
+        return {"activity": None, "apps": [], "prompts": []}
+    windows = [window for window in data.get("open_windows") or [] if isinstance(window, dict)]
+    return {
+        "activity": data.get("activity"),
+        "apps": sorted({str(window.get("app", "")).lower() for window in windows}),
+        "prompts": sorted(str(window["prompt"]) for window in windows if window.get("prompt")),
+    }
+
+
+async def analyze_versions(client, paths: List[str], versions: List[str], concurrency: int) -> List[Dict]:
+    """{"frame": name, version: summary, ...} per frame"""
+    rows = [{"frame": os.path.basename(path)} for path in paths]
+    limiter = trio.CapacityLimiter(concurrency)
+
+    async def analyze(index, version):
+        async with limiter:
+            with open(paths[index], "rb") as f:
+                encoded = encode_image_bytes(f.read())
+            try:
+                response = await client.chat.completions.create(
+                    **build_frame_request(encoded, prompt_version=version)
+                )
+                rows[index][version] = summarize(response.choices[0].message.content)
+            except Exception as e:
+                print(f"Error analyzing {paths[index]} with version {version}: {str(e)}")
+                rows[index][version] = {"activity": None, "apps": [], "prompts": [], "error": str(e)}
+
+    async with trio.open_nursery() as nursery:
+        for index in range(len(paths)):
+            for version in versions:
+                nursery.start_soon(analyze, index, version)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames-dir", required=True, help="Folder of .jpg screenshots")
+    parser.add_argument("--versions", nargs=2, default=["1", "2"], choices=sorted(FRAME_PROMPTS), help="Versions to compare")
+    parser.add_argument("--limit", type=int, default=100, help="Analyze at most this many frames")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent API calls")
+    parser.add_argument("--base-url", help="Alternative API base URL, e.g. the fake OpenAI server")
+    parser.add_argument("--min-agreement", type=float, help="Fail when activity labels agree on fewer frames (0-1)")
+    parser.add_argument("--output", help="Optional path to write the per-frame results as JSON")
+    args = parser.parse_args()
+
+    names = sorted(name for name in os.listdir(args.frames_dir) if name.endswith(".jpg"))[:args.limit]
+    if not names:
+        print(f"No .jpg frames in {args.frames_dir}")
+        sys.exit(2)
+    paths = [os.path.join(args.frames_dir, name) for name in names]
+    client = get_openai_client(os.getenv("OPENAI_API_KEY"), base_url=args.base_url)
+
+    first, second = args.versions
+    rows = trio.run(analyze_versions, client, paths, args.versions, args.concurrency)
+
+    totals = {"activity": 0, "apps": 0, "prompts": 0}
+    for row in rows:
+        for field in totals:
+            if row[first][field] == row[second][field]:
+                totals[field] += 1
+
+    print(f"Prompt version {first} vs {second} on {len(rows)} frames from {args.frames_dir}")
+    print("field      agree  share")
+    for field, agree in totals.items():
+        print(f"{field:<9}  {agree:>5}  {agree / len(rows):>5.0%}")
+    for row in rows:
+        if row[first]["activity"] != row[second]["activity"]:
+            print(f"  {row['frame']}: {row[first]['activity']!r} vs {row[second]['activity']!r}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"versions": args.versions, "agreement": totals, "frames": rows}, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+    agreement = totals["activity"] / len(rows)
+    if args.min_agreement is not None and agreement < args.min_agreement:
+        print(f"Activity agreement {agreement:.0%} is below {args.min_agreement:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Token count and cost of every frame analysis prompt version.
+
+Counts the tokens of each template in helper.prompt_templates (with tiktoken
+when it is installed, otherwise estimated from the length) and what the
+instructions alone cost for one submission of --frames frames. The prompt is
+sent as the leading system message of every frame request, so once it is at
+least MIN_CACHED_PREFIX_TOKENS long, the provider can serve it from its prompt
+cache after the first call; the cached column shows the cost if every call
+after the first hits that cache. Shorter prompts are never cached, and for
+them only fewer tokens save money. With --budget-tokens the script exits
+non-zero when the current version is over budget, so it can guard prompt
+growth in CI.
+
+Usage:
+    python -m benchmarks.prompt_token_report --frames 2200 --budget-tokens 600
+"""
+import sys
+import json
+import argparse
+
+from helper.prompt_templates import MIN_CACHED_PREFIX_TOKENS, PROMPT_VERSION, token_report
+from helper.model_cascade import CACHED_INPUT_PRICE_FACTOR, MODEL_PRICES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=2200, help="Frames per submission")
+    parser.add_argument("--model", default="gpt-4o", choices=sorted(MODEL_PRICES), help="Model whose prices are used")
+    parser.add_argument("--budget-tokens", type=int, help="Fail when the current prompt is longer than this")
+    parser.add_argument("--output", help="Optional path to write the results as JSON")
+    args = parser.parse_args()
+
+    input_price = MODEL_PRICES[args.model][0]
+    rows = token_report(args.model, input_price)
+    for row in rows:
+        uncached = row["tokens"] * args.frames * input_price / 1_000_000
+        cached = uncached
+        if row["cacheable"]:
+            cached = uncached / args.frames * (1 + (args.frames - 1) * CACHED_INPUT_PRICE_FACTOR)
+        row["usd_per_submission"] = round(uncached, 4)
+        row["usd_per_submission_cached"] = round(cached, 4)
+
+    baseline = rows[0]
+    counted = "tiktoken" if baseline["exact"] else "estimated, tiktoken not installed"
+    print(f"Frame prompt tokens ({counted}); {args.frames} frames per submission, {args.model} input prices")
+    print("version  chars  tokens  vs v1   cacheable  $/submission  $/submission cached")
+    for row in rows:
+        marker = "*" if row["current"] else " "
+        print(
+            f"{row['version']:>6}{marker}  {row['chars']:>5}  {row['tokens']:>6}  {row['tokens'] / baseline['tokens']:>5.0%}  "
+            f"{'yes' if row['cacheable'] else 'no':>9}  {row['usd_per_submission']:>12}  {row['usd_per_submission_cached']:>19}"
+        )
+    print(f"* current version; prompts under {MIN_CACHED_PREFIX_TOKENS} tokens are not cached by the provider")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"frames": args.frames, "model": args.model, "versions": rows}, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+    current = next(row for row in rows if row["version"] == PROMPT_VERSION)
+    if args.budget_tokens is not None and current["tokens"] > args.budget_tokens:
+        print(f"Prompt version {PROMPT_VERSION} is over budget: {current['tokens']} tokens > {args.budget_tokens}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import json
+from typing import List, Dict, Optional, Tuple
+from helper.timeline_table import parse_clock
+
+SECONDS_PER_DAY = 24 * 3600
+
+
+def frame_seconds(times: List[str], default_interval: int = 5) -> List[int]:
+    """
+    Capture time of each frame in seconds since the first one.
+
+    Args:
+        times (List[str]): "HH:MM:SS" per frame in capture order, as returned by
+            extract_and_convert_to_local (None when the filename has no timestamp)
+        default_interval (int): Seconds assumed between frames without a timestamp
+    """
+    seconds = []
+    day_offset = 0
+    previous = None
+    for index, time_str in enumerate(times):
+        clock = parse_clock(time_str)
+        if clock < 0:
+            value = seconds[-1] + default_interval if seconds else 0
+        else:
+            # Local clock times wrap at midnight during late sessions
+            if previous is not None and clock + day_offset < previous - SECONDS_PER_DAY // 2:
+                day_offset += SECONDS_PER_DAY
+            value = clock + day_offset
+            previous = value
+        seconds.append(value)
+
+    start = seconds[0] if seconds else 0
+    return [value - start for value in seconds]
+
+
+def activity_signature(result: Dict) -> Optional[Tuple[str, str]]:
+    """(activity, active app) of a frame result, or None for errors and unparseable analyses"""
+    if not result or "error" in result:
+        return None
+    try:
+        analysis = json.loads(result["analysis"])
+        windows = analysis.get("open_windows") or []
+        active = next((window for window in windows if window.get("active")), windows[0] if windows else {})
+        return analysis.get("activity"), active.get("app")
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None
+
+
+class AdaptiveSampler:
+    """
+    Choose which frames to analyze: a sparse pass, then refinement at changes.
+
+    The first round takes one frame every `sample_seconds` (plus the last frame).
+    Each later round analyzes the midpoint between two analyzed neighbours whose
+    activity or active app differ, until neighbours are adjacent frames or at most
+    `resolution_seconds` apart. Every skipped frame is then assigned to the segment
+    of an analyzed neighbour, so segment boundaries are accurate to about the
+    resolution and durations can be computed from the expanded timeline.
+
+    Args:
+        seconds (List[int]): Capture time of each frame, see `frame_seconds`
+        sample_seconds (float): Spacing of the initial sparse pass
+        resolution_seconds (float): Stop refining gaps this short
+    """
+
+    def __init__(self, seconds: List[int], sample_seconds: float, resolution_seconds: float = 10):
+        self.seconds = seconds
+        self.sample_seconds = sample_seconds
+        self.resolution_seconds = resolution_seconds
+        self.signatures = {}
+        self.rounds = 0
+
+    def initial(self) -> List[int]:
+        """Frame indices of the sparse first round"""
+        if not self.seconds:
+            return []
+        indices = [0]
+        for index, value in enumerate(self.seconds):
+            if value - self.seconds[indices[-1]] >= self.sample_seconds:
+                indices.append(index)
+        if indices[-1] != len(self.seconds) - 1:
+            indices.append(len(self.seconds) - 1)
+        self.rounds = 1
+        return indices
+
+    def record(self, index: int, result: Dict):
+        self.signatures[index] = activity_signature(result)
+
+    def refine(self) -> List[int]:
+        """Frame indices for the next round (empty when the segmentation is final)"""
+        analyzed = sorted(self.signatures)
+        indices = []
+        for left, right in zip(analyzed, analyzed[1:]):
+            if right - left <= 1 or self.seconds[right] - self.seconds[left] <= self.resolution_seconds:
+                continue
+            left_signature, right_signature = self.signatures[left], self.signatures[right]
+            if left_signature is None or right_signature is None or left_signature != right_signature:
+                indices.append((left + right) // 2)
+        if indices:
+            self.rounds += 1
+        return indices
+
+    def groups(self) -> List[Dict]:
+        """
+        Segments in the {"representative", "members"} form used for dedup groups.
+
+        Skipped frames between two analyzed frames with the same signature belong
+        to the left one; otherwise the gap is split at its midpoint. A failed frame
+        does not claim any skipped frames when its neighbour succeeded.
+        """
+        analyzed = sorted(self.signatures)
+        members = {index: [index] for index in analyzed}
+        for left, right in zip(analyzed, analyzed[1:]):
+            left_signature, right_signature = self.signatures[left], self.signatures[right]
+            if left_signature == right_signature or right_signature is None:
+                split = right
+            elif left_signature is None:
+                split = left + 1
+            else:
+                split = (left + right) // 2 + 1
+            members[left].extend(range(left + 1, split))
+            members[right][:0] = range(split, right)
+        return [{"representative": index, "members": members[index]} for index in analyzed]
+
+    def stats(self) -> Dict:
+        frames = len(self.seconds)
+        analyzed = len(self.signatures)
+        return {
+            "frames": frames,
+            "analyzed": analyzed,
+            "calls_saved": frames - analyzed,
+            "rounds": self.rounds,
+            "segments": sum(
+                1 for left, right in zip(sorted(self.signatures), sorted(self.signatures)[1:])
+                if self.signatures[left] != self.signatures[right]
+            ) + (1 if analyzed else 0),
+            "sample_seconds": self.sample_seconds,
+            "resolution_seconds": self.resolution_seconds,
+        }
@@ -0,0 +1,110 @@
+import os
+import time
+import sqlite3
+import hashlib
+from typing import Optional, Dict
+
+
+def content_key(image_bytes: bytes, model: str, prompt_version: str) -> str:
+    """Build a cache key from the image content, model name and prompt version"""
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    return f"{model}:{prompt_version}:{digest}"
+
+
+class AnalysisCache:
+    """
+    On-disk SQLite cache of per-frame Vision analysis results.
+
+    Entries are keyed on `content_key`, so a re-triggered submission (or any frame
+    seen before under the same model and prompt version) is answered without an
+    API call. Entries older than `max_age_seconds` are dropped, and the least
+    recently used entries are evicted once the table grows past `max_entries`.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = 200000, max_age_seconds: int = 30 * 24 * 3600):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS frame_analysis (
+                key TEXT PRIMARY KEY,
+                analysis TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON frame_analysis (last_used)")
+        self.conn.commit()
+        self.evict()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached analysis string for `key`, or None on a miss"""
+        now = time.time()
+        row = self.conn.execute(
+            "SELECT analysis, created_at FROM frame_analysis WHERE key = ?", (key,)
+        ).fetchone()
+
+        if row is None or now - row[1] > self.max_age_seconds:
+            self.misses += 1
+            return None
+
+        self.conn.execute("UPDATE frame_analysis SET last_used = ? WHERE key = ?", (now, key))
+        self.conn.commit()
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: str, analysis: str):
+        """Store a successful analysis result"""
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO frame_analysis (key, analysis, created_at, last_used) VALUES (?, ?, ?, ?)",
+            (key, analysis, now, now)
+        )
+        self.conn.commit()
+        self.writes += 1
+
+        # Keep eviction cheap by only sweeping every few hundred writes
+        if self.writes % 500 == 0:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then trim the least recently used beyond max_entries"""
+        cutoff = time.time() - self.max_age_seconds
+        removed = self.conn.execute("DELETE FROM frame_analysis WHERE created_at < ?", (cutoff,)).rowcount
+
+        count = self.conn.execute("SELECT COUNT(*) FROM frame_analysis").fetchone()[0]
+        if count > self.max_entries:
+            removed += self.conn.execute(
+                """DELETE FROM frame_analysis WHERE key IN (
+                    SELECT key FROM frame_analysis ORDER BY last_used ASC LIMIT ?
+                )""",
+                (count - self.max_entries,)
+            ).rowcount
+
+        self.conn.commit()
+        self.evictions += removed
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for the lifetime of this cache object"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def close(self):
+        self.conn.close()
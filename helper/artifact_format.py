@@ -0,0 +1,142 @@
+import io
+import json
+import gzip
+from contextlib import contextmanager
+from typing import Dict
+from helper.workspace import Workspace, LOCAL_WORKSPACE
+
+# Frame timeline formats and their file suffixes. "json" is the original
+# pretty-printed document with each analysis stored as a JSON string; the JSON
+# Lines formats hold one compact frame per line with the analysis parsed.
+ARTIFACT_FORMATS = {
+    "json": ".json",
+    "jsonl.gz": ".jsonl.gz",
+    "jsonl.zst": ".jsonl.zst",
+}
+JSONL_HEADER = "frame-timeline"
+JSONL_VERSION = 1
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def artifact_path(base: str, artifact_format: str) -> str:
+    """`base` (a path without extension) with the suffix of `artifact_format`"""
+    if artifact_format not in ARTIFACT_FORMATS:
+        raise ValueError(f"Unknown artifact format {artifact_format!r}; use one of {', '.join(ARTIFACT_FORMATS)}")
+    return base + ARTIFACT_FORMATS[artifact_format]
+
+
+def format_of(path: str) -> str:
+    """Artifact format implied by a file name (the original JSON for anything unknown)"""
+    for artifact_format, suffix in ARTIFACT_FORMATS.items():
+        if artifact_format != "json" and path.endswith(suffix):
+            return artifact_format
+    return "json"
+
+
+def find_artifact(base: str, workspace: Workspace = None) -> str:
+    """
+    The existing file for `base` in any format, or the plain .json path if there is none.
+
+    When files in several formats exist, the first in ARTIFACT_FORMATS order wins
+    regardless of age, so callers that know the path they wrote should use it.
+    """
+    workspace = workspace or LOCAL_WORKSPACE
+    for suffix in ARTIFACT_FORMATS.values():
+        if workspace.exists(base + suffix):
+            return base + suffix
+    return base + ARTIFACT_FORMATS["json"]
+
+
+def open_zstd(raw, mode: str):
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("The jsonl.zst artifact format needs the zstandard package (pip install zstandard)")
+    return zstandard.open(raw, mode, encoding="utf-8")
+
+
+@contextmanager
+def open_artifact(path: str, mode: str, artifact_format: str, workspace: Workspace = None):
+    """Text-mode file object for `path` in the workspace, compressed as the format requires"""
+    workspace = workspace or LOCAL_WORKSPACE
+    with workspace.open(path, mode + "b") as raw:
+        if artifact_format == "jsonl.gz":
+            f = gzip.open(raw, mode + "t", encoding="utf-8", compresslevel=6)
+        elif artifact_format == "jsonl.zst":
+            f = open_zstd(raw, mode)
+        else:
+            f = io.TextIOWrapper(raw, encoding="utf-8")
+        with f:
+            yield f
+
+
+def parsed_analysis(entry: Dict) -> Dict:
+    """Copy of a timeline entry with its analysis JSON string parsed (left as-is if it does not parse)"""
+    analysis = entry.get("analysis")
+    if not isinstance(analysis, str):
+        return entry
+    try:
+        return dict(entry, analysis=json.loads(analysis))
+    except ValueError:
+        return entry
+
+
+def write_timeline(path: str, document: Dict, workspace: Workspace = None):
+    """
+    Write an analysis document ({"timeline": [...], ...metadata}) to the
+    workspace in the format implied by `path`.
+
+    JSON Lines files start with a header line holding the format name, version
+    and the metadata, followed by one compact line per frame.
+    """
+    artifact_format = format_of(path)
+    if artifact_format == "json":
+        with (workspace or LOCAL_WORKSPACE).open(path, "w") as f:
+            json.dump(document, f, indent=4)
+        return
+
+    metadata = {key: value for key, value in document.items() if key != "timeline"}
+    with open_artifact(path, "w", artifact_format, workspace) as f:
+        f.write(json.dumps({"format": JSONL_HEADER, "version": JSONL_VERSION, "metadata": metadata}, separators=(",", ":")))
+        f.write("\n")
+        for entry in document.get("timeline", []):
+            f.write(json.dumps(parsed_analysis(entry), separators=(",", ":")))
+            f.write("\n")
+
+
+def read_lines(lines) -> Dict:
+    header = json.loads(next(lines))
+    if header.get("format") != JSONL_HEADER:
+        raise ValueError(f"Not a frame timeline: header {header!r}")
+    timeline = [json.loads(line) for line in lines if line.strip()]
+    return dict(header.get("metadata", {}), timeline=timeline)
+
+
+def read_timeline(path: str, workspace: Workspace = None) -> Dict:
+    """
+    Read an analysis document written by `write_timeline` in any format.
+
+    The format is detected from the file's first bytes rather than its name:
+    gzip or zstd magic, a JSON Lines header, or a plain JSON document. Entries
+    from JSON Lines files carry their analysis as a parsed object.
+    """
+    workspace = workspace or LOCAL_WORKSPACE
+    with workspace.open(path, "rb") as f:
+        magic = f.read(4)
+
+    if magic.startswith(GZIP_MAGIC):
+        with open_artifact(path, "r", "jsonl.gz", workspace) as f:
+            return read_lines(iter(f))
+    if magic == ZSTD_MAGIC:
+        with open_artifact(path, "r", "jsonl.zst", workspace) as f:
+            return read_lines(iter(f))
+
+    with open_artifact(path, "r", "json", workspace) as f:
+        first_line = f.readline()
+        if first_line.lstrip().startswith('{"format"'):
+            f.seek(0)
+            return read_lines(iter(f))
+        f.seek(0)
+        return json.load(f)
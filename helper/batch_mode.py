@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import trio
+from typing import List, Dict
+from openai import AsyncOpenAI
+
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+# The Batch API accepts up to 50,000 requests and 200 MB per input file
+MAX_REQUESTS_PER_FILE = 50000
+MAX_BYTES_PER_FILE = 190 * 1024 * 1024
+FINISHED_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class BatchInputWriter:
+    """
+    Writes chat completion requests to Batch API JSONL input files as they are built.
+
+    Requests go straight to disk, so a large job never holds every encoded
+    frame in memory at once. A new file is started whenever the current one
+    would exceed the Batch API's request or size limits.
+
+    Args:
+        batch_dir (str): Folder for the input files
+        name (str): Prefix of the file names
+    """
+
+    def __init__(self, batch_dir: str, name: str):
+        self.batch_dir = batch_dir
+        self.name = name
+        self.paths = []
+        self.custom_ids = []
+        self._handle = None
+        self._count = 0
+        self._size = 0
+
+    def add(self, custom_id: str, body: Dict):
+        """Append one request; body holds the chat.completions.create kwargs"""
+        line = json.dumps({
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": body,
+        }) + "\n"
+        line_size = len(line.encode("utf-8"))
+
+        if self._handle is None or self._count >= MAX_REQUESTS_PER_FILE or self._size + line_size > MAX_BYTES_PER_FILE:
+            if self._handle is not None:
+                self._handle.close()
+            os.makedirs(self.batch_dir, exist_ok=True)
+            path = os.path.join(self.batch_dir, f"{self.name}_{len(self.paths)}.jsonl")
+            self._handle = open(path, "w")
+            self.paths.append(path)
+            self._count = 0
+            self._size = 0
+
+        self._handle.write(line)
+        self._count += 1
+        self._size += line_size
+        self.custom_ids.append(custom_id)
+
+    def close(self) -> List[str]:
+        """Finish the current file and return the paths of all files written"""
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        return list(self.paths)
+
+    def remove(self):
+        """Delete every input file that is still on disk"""
+        self.close()
+        for path in self.paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def write_batch_files(requests: List[Dict], batch_dir: str, name: str) -> List[str]:
+    """
+    Write chat completion requests as Batch API JSONL input files.
+
+    Each request is {"custom_id": str, "body": {...chat.completions.create kwargs}}.
+
+    Returns:
+        Paths of the files written, in order
+    """
+    writer = BatchInputWriter(batch_dir, name)
+    for request in requests:
+        writer.add(request["custom_id"], request["body"])
+    return writer.close()
+
+
+async def submit_batch_file(client: AsyncOpenAI, path: str, metadata: Dict = None) -> str:
+    """Upload a JSONL input file and create a batch for it, returning the batch id"""
+    with open(path, "rb") as f:
+        input_file = await client.files.create(file=f, purpose="batch")
+
+    batch = await client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window="24h",
+        metadata=metadata
+    )
+    print(f"Submitted batch {batch.id} from {path}")
+    return batch.id
+
+
+async def wait_for_batch(client: AsyncOpenAI, batch_id: str, poll_interval: float = 30, timeout: float = None):
+    """Poll a batch until it reaches a final status and return the batch object"""
+    start_time = time.time()
+    while True:
+        batch = await client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        if counts is not None:
+            print(f"Batch {batch_id}: {batch.status} ({counts.completed}/{counts.total} done, {counts.failed} failed)")
+        else:
+            print(f"Batch {batch_id}: {batch.status}")
+
+        if batch.status in FINISHED_STATUSES:
+            return batch
+        if timeout is not None and time.time() - start_time > timeout:
+            raise TimeoutError(f"Batch {batch_id} did not finish within {timeout} seconds")
+        await trio.sleep(poll_interval)
+
+
+async def fetch_batch_results(client: AsyncOpenAI, batch) -> Dict[str, Dict]:
+    """
+    Download a finished batch's output and error files.
+
+    Returns:
+        {custom_id: {"content": str}} for successful requests and
+        {custom_id: {"error": str}} for failed ones
+    """
+    results = {}
+
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        content = await client.files.content(file_id)
+        for line in content.text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            custom_id = record["custom_id"]
+            response = record.get("response") or {}
+            if record.get("error") or response.get("status_code") != 200:
+                error = record.get("error") or response.get("body", {}).get("error")
+                results[custom_id] = {"error": json.dumps(error) if not isinstance(error, str) else error}
+                continue
+            results[custom_id] = {"content": response["body"]["choices"][0]["message"]["content"]}
+
+    return results
+
+
+async def run_batch(
+    client: AsyncOpenAI,
+    writer: BatchInputWriter,
+    poll_interval: float = 30,
+    timeout: float = None
+) -> Dict[str, Dict]:
+    """
+    Submit and wait for the requests written to a BatchInputWriter.
+
+    All input files are submitted up front and polled concurrently. Each input
+    file is deleted once it is uploaded, and any left over when submission
+    fails are deleted too. Requests missing from the output (e.g. an expired
+    batch) come back as errors so the caller never silently loses a frame.
+
+    Returns:
+        {custom_id: {"content": str} | {"error": str}} for every request
+    """
+    batch_ids = []
+    try:
+        for path in writer.close():
+            batch_ids.append(await submit_batch_file(client, path, {"name": writer.name}))
+            os.remove(path)
+    finally:
+        writer.remove()
+    results = {}
+
+    async def collect(batch_id):
+        batch = await wait_for_batch(client, batch_id, poll_interval, timeout)
+        results.update(await fetch_batch_results(client, batch))
+
+    async with trio.open_nursery() as nursery:
+        for batch_id in batch_ids:
+            nursery.start_soon(collect, batch_id)
+
+    for custom_id in writer.custom_ids:
+        if custom_id not in results:
+            results[custom_id] = {"error": "No result returned by batch"}
+    return results
@@ -0,0 +1,171 @@
+"""
+Backfill many submissions across a pool of worker processes.
+
+Each worker process runs one submission at a time with its own trio loop. A
+slot table shared by all workers caps concurrent OpenAI calls globally, and the
+per-minute request/token budgets are split evenly between workers.
+
+Input is a CSV (with a header) or JSON Lines file with submission_id,
+assignment_id and user_id per row.
+
+Usage:
+    python -m helper.batch_runner submissions.csv --workers 4 --max-api-calls 60 --summary batch_summary.json
+"""
+import os
+import csv
+import sys
+import json
+import time
+import argparse
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List
+
+
+def read_submissions(path: str) -> List[Dict]:
+    """Rows of {submission_id, assignment_id, user_id} from a .csv or .jsonl file"""
+    with open(path, "r", newline="") as f:
+        if path.endswith(".jsonl"):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+
+    submissions = []
+    for number, row in enumerate(rows, start=1):
+        if not row.get("submission_id"):
+            raise ValueError(f"Row {number} of {path} has no submission_id")
+        submissions.append({
+            "submission_id": row["submission_id"],
+            "assignment_id": row.get("assignment_id"),
+            "user_id": row.get("user_id"),
+        })
+    return submissions
+
+
+def init_worker(api_slots, workers: int):
+    """Runs once in every worker process before any submission"""
+    from helper.rate_limiter import set_shared_slots
+
+    set_shared_slots(api_slots)
+    # Each worker gets an equal share of the account's per-minute budgets
+    for variable, default in (("OPENAI_RPM_LIMIT", "5000"), ("OPENAI_TPM_LIMIT", "800000")):
+        os.environ[variable] = str(max(1, int(os.getenv(variable, default)) // workers))
+
+
+def run_submission(submission: Dict, log_dir: str) -> Dict:
+    """Process one submission in a worker; output goes to <log_dir>/<submission_id>.log"""
+    import trio
+    from helper.entry import main
+    from helper.openai_client import run_closing_clients
+
+    submission_id = submission["submission_id"]
+    start_time = time.time()
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, f"{submission_id}.log")
+
+    result = {"submission_id": submission_id, "status": "succeeded", "error": None, "log": log_path}
+    with open(log_path, "w") as log, contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            # Close the run's connection pool, so a worker does not leak one per submission
+            trio.run(run_closing_clients, main, submission_id, submission["assignment_id"], submission["user_id"])
+        except Exception as e:
+            print(f"Error: {type(e).__name__}: {str(e)}")
+            result["status"] = "failed"
+            result["error"] = f"{type(e).__name__}: {str(e)}"
+    result["seconds"] = round(time.time() - start_time, 2)
+    return result
+
+
+def run_batch_submissions(submissions: List[Dict], workers: int, max_api_calls: int, log_dir: str) -> List[Dict]:
+    """
+    Run `submissions` across `workers` processes and return one result per submission.
+
+    Args:
+        submissions (List[Dict]): Rows from `read_submissions`
+        workers (int): Number of worker processes
+        max_api_calls (int): Global cap on concurrent OpenAI calls across all workers
+        log_dir (str): Directory for per-submission logs
+    """
+    from helper.rate_limiter import SharedSlots
+
+    context = multiprocessing.get_context("spawn")
+    # Slots held by a worker that dies are reclaimed by the others
+    api_slots = SharedSlots(max_api_calls, context)
+    results = []
+    start_time = time.time()
+
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=context, initializer=init_worker, initargs=(api_slots, workers)
+    ) as pool:
+        futures = {pool.submit(run_submission, submission, log_dir): submission for submission in submissions}
+        try:
+            for future in as_completed(futures):
+                submission = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # The worker process itself died
+                    result = {
+                        "submission_id": submission["submission_id"],
+                        "status": "failed",
+                        "error": f"{type(e).__name__}: {str(e)}",
+                        "seconds": None,
+                    }
+                results.append(result)
+
+                failed = sum(1 for r in results if r["status"] != "succeeded")
+                elapsed = time.time() - start_time
+                remaining = (len(submissions) - len(results)) * elapsed / len(results)
+                print(
+                    f"[{len(results)}/{len(submissions)}] {result['submission_id']} {result['status']} "
+                    f"in {result['seconds']}s ({failed} failed, ~{remaining / 60:.1f} min left)"
+                )
+        except KeyboardInterrupt:
+            print("Interrupted; cancelling submissions that have not started")
+            for future in futures:
+                future.cancel()
+            raise
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("submissions", help="CSV or JSONL file of submission_id, assignment_id, user_id")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="Worker processes")
+    parser.add_argument("--max-api-calls", type=int, default=120, help="Concurrent OpenAI calls across all workers")
+    parser.add_argument("--log-dir", default="logs/batch", help="Directory for per-submission logs")
+    parser.add_argument("--summary", default="batch_summary.json", help="Where to write the per-submission summary")
+    args = parser.parse_args()
+
+    submissions = read_submissions(args.submissions)
+    print(f"Processing {len(submissions)} submissions on {args.workers} workers "
+          f"(max {args.max_api_calls} concurrent API calls)")
+
+    start_time = time.time()
+    results = run_batch_submissions(submissions, args.workers, args.max_api_calls, args.log_dir)
+    order = {submission["submission_id"]: index for index, submission in enumerate(submissions)}
+    results.sort(key=lambda result: order.get(result["submission_id"], len(order)))
+
+    succeeded = [result for result in results if result["status"] == "succeeded"]
+    failed = [result for result in results if result["status"] != "succeeded"]
+    summary = {
+        "total": len(results),
+        "succeeded": len(succeeded),
+        "failed": len(failed),
+        "seconds": round(time.time() - start_time, 2),
+        "results": results,
+    }
+    with open(args.summary, "w") as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"\n{len(succeeded)} succeeded, {len(failed)} failed in {summary['seconds']}s")
+    for result in failed:
+        print(f"  {result['submission_id']}: {result['error']}")
+    print(f"Summary saved to {args.summary}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
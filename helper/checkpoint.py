@@ -0,0 +1,92 @@
+import json
+from typing import Dict
+from helper.workspace import Workspace, LOCAL_WORKSPACE
+
+
+class CheckpointLog:
+    """
+    Append-only JSON Lines log of per-frame analysis results.
+
+    Every successful frame result is appended and flushed as soon as it
+    completes, so a crash only loses the frames that were in flight. With
+    `resume=True`, results already in the log are loaded and those frames are
+    skipped on the next run. Errors are not logged, so failed frames are retried.
+    Each record carries the model and prompt version that produced it, and
+    records written with a different model or prompt version are not resumed.
+
+    Args:
+        path (str): Location of the .jsonl log
+        resume (bool): Load an existing log instead of starting a fresh one
+        workspace (Workspace): Where the log lives (defaults to the working directory)
+        model (str): Model of this run
+        prompt_version (str): Prompt version of this run, as used in the cache key
+    """
+
+    def __init__(
+        self,
+        path: str,
+        resume: bool = True,
+        workspace: Workspace = None,
+        model: str = None,
+        prompt_version: str = None
+    ):
+        self.path = path
+        self.workspace = workspace or LOCAL_WORKSPACE
+        self.model = model
+        self.prompt_version = prompt_version
+        self.entries = self.load() if resume else {}
+        self.resumed = len(self.entries)
+        self.file = self.workspace.open(path, "a" if resume else "w")
+
+    def load(self) -> Dict[str, Dict]:
+        """Read {filename: {"result": ..., "hash": ...}} from the log, last write wins"""
+        entries = {}
+        stale = 0
+        if not self.workspace.exists(self.path):
+            return entries
+
+        with self.workspace.open(self.path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    filename = record["filename"]
+                except (ValueError, KeyError):
+                    # A torn final line from a crash mid-write; the frame is simply redone
+                    continue
+                if record.get("model") != self.model or record.get("prompt_version") != self.prompt_version:
+                    # Produced by another model or prompt; a newer matching record may follow
+                    stale += 1
+                    continue
+                entries[filename] = record
+        if stale:
+            print(f"Ignoring {stale} checkpoint records from another model or prompt version in {self.path}")
+        if entries:
+            print(f"Resuming with {len(entries)} frames from {self.path}")
+        return entries
+
+    def get(self, filename: str) -> Dict:
+        """The logged result for `filename`, or None"""
+        entry = self.entries.get(filename)
+        return entry["result"] if entry else None
+
+    def get_hash(self, filename: str) -> int:
+        entry = self.entries.get(filename)
+        return entry.get("hash") if entry else None
+
+    def append(self, filename: str, result: Dict, frame_hash: int = None):
+        """Record a finished frame; error results are skipped so they get retried"""
+        if "error" in result:
+            return
+        record = {
+            "filename": filename,
+            "result": result,
+            "hash": frame_hash,
+            "model": self.model,
+            "prompt_version": self.prompt_version,
+        }
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        self.entries[filename] = record
+
+    def close(self):
+        self.file.close()
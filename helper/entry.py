@@ -5,10 +5,51 @@ import re
 import json
 import trio
 from datetime import datetime, timezone, timedelta
-from time import sleep
 from typing import List, Dict
 from openai import AsyncOpenAI
+from helper.openai_client import get_openai_client, run_closing_clients
 from helper.timeline_analysis import main as timeline_analysis_main
+from helper.frame_dedup import group_near_duplicates, FrameGrouper, frame_hash
+from helper.analysis_cache import AnalysisCache, content_key
+from helper.image_preprocess import FramePreprocessor
+from helper.rate_limiter import AdaptiveRateLimiter
+from helper.batch_mode import BatchInputWriter, run_batch
+from helper.job_queue import JobProgress
+from helper.checkpoint import CheckpointLog
+from helper.s3_client import get_s3_client
+from helper.telemetry import span, start_trace, record_bytes
+from helper.model_cascade import ModelCascade, CASCADE_INSTRUCTIONS
+from helper.adaptive_sampling import AdaptiveSampler, frame_seconds
+from helper.memory_budget import ByteBudget, frame_memory_cost, DEFAULT_INFLIGHT_BYTES
+from helper.artifact_format import artifact_path, write_timeline
+from helper.workspace import Workspace, LOCAL_WORKSPACE, create_workspace
+from helper.prompt_templates import PROMPT_VERSION, frame_prompt
+
+
+VISION_MODEL = "gpt-4o"
+# Rough tokens per frame request (prompt + image + max_tokens) charged against the tpm budget
+FRAME_TOKEN_ESTIMATE = 2500
+# Same for a low-detail cascade tier-1 request
+CASCADE_TOKEN_ESTIMATE = 1500
+# How long a streaming worker waits for more frames to fill a multi-frame request
+PACK_WAIT_SECONDS = 0.5
+# Upper bound on concurrent Vision calls; the rate limiter adapts below it on 429s
+MAX_CONCURRENT_REQUESTS = 60
+
+# Sent as the system message of every frame request, so it is the same leading
+# prefix for each call and provider-side prompt caching can reuse it
+FRAME_ANALYSIS_PROMPT = frame_prompt(PROMPT_VERSION)
+
+
+def build_multi_frame_prompt(count: int) -> str:
+    """Instructions for analyzing `count` labelled frames in one request (sent after the system prompt)"""
+    return (
+        f"You are given {count} screenshots from the same screen recording, in order, each preceded "
+        f"by a \"Frame <n>\" label. Analyze every frame independently as the system instructions describe; "
+        f"they describe the answer for one screenshot. Instead of a single answer, return a JSON object "
+        f"{{\"frames\": [...]}} with exactly {count} entries, one per frame and in order, each of the form "
+        f"{{\"frame\": <n>, \"activity\": ..., \"open_windows\": [...]}}."
+    )
 
 
 def extract_and_convert_to_local(filename, offset_hours, offset_minutes):
@@ -36,41 +77,111 @@ def extract_and_convert_to_local(filename, offset_hours, offset_minutes):
         return None
 
 
+def list_image_objects(s3_client, bucket_name: str, prefix: str) -> List:
+    """List (key, size) of every .jpg under `prefix`, following pagination, sorted by file name"""
+    paginator = s3_client.get_paginator('list_objects_v2')
+    objects = []
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+        for item in page.get('Contents', []):
+            if item['Key'].endswith('.jpg'):
+                objects.append((item['Key'], item.get('Size', 0)))
+    objects.sort(key=lambda item: os.path.basename(item[0]))
+    return objects
+
+
+def list_image_keys(s3_client, bucket_name: str, prefix: str) -> List[str]:
+    """List every .jpg key under `prefix`, following pagination, sorted by file name"""
+    return [key for key, _ in list_image_objects(s3_client, bucket_name, prefix)]
+
+
+def fetch_image_bytes(s3_client, bucket_name: str, key: str) -> bytes:
+    """Download a single S3 object into memory"""
+    response = s3_client.get_object(Bucket=bucket_name, Key=key)
+    data = response['Body'].read()
+    record_bytes("download", len(data))
+    return data
+
+
+def download_image(s3_client, bucket_name: str, key: str, file_name: str, workspace: Workspace):
+    """Download one S3 object to `file_name` in the workspace"""
+    local_path = workspace.local_path(file_name)
+    if local_path is not None:
+        os.makedirs(os.path.dirname(local_path) or ".", exist_ok=True)
+        s3_client.download_file(bucket_name, key, local_path)
+        record_bytes("download", os.path.getsize(local_path))
+    else:
+        workspace.write_bytes(file_name, fetch_image_bytes(s3_client, bucket_name, key))
+
+
 # AWS S3 Download Function
-def download_images_from_s3(bucket_name: str, folder_path: str, prefix: str, s3_client=None):
+async def download_images_from_s3(
+    bucket_name: str,
+    folder_path: str,
+    prefix: str,
+    s3_client=None,
+    workspace: Workspace = None,
+    max_downloads: int = 16
+):
     """
     Downloads images from a specific folder in an S3 bucket to the specified local folder.
-    
+
+    The listing and the downloads run in worker threads, at most `max_downloads`
+    at a time, so the event loop is never blocked by boto3.
+
     Args:
         bucket_name (str): S3 bucket name
         folder_path (str): Local folder to save images
-        s3_client: boto3 S3 client (can be passed as an argument or default to a new client)
+        s3_client: boto3 S3 client (defaults to the shared client sized for max_downloads)
+        workspace (Workspace): Where `folder_path` lives (defaults to the working directory)
+        max_downloads (int): Maximum number of concurrent S3 downloads
     """
     if s3_client is None:
-        s3_client = boto3.client('s3')  # Initialize the S3 client
-    
+        s3_client = get_s3_client(max_pool_connections=max_downloads)
+    if workspace is None:
+        workspace = LOCAL_WORKSPACE
+
     # List objects in the S3 bucket with a prefix matching the folder path
-    response = s3_client.list_objects_v2(Bucket=bucket_name, Prefix=prefix)
-    
-    if 'Contents' not in response:
+    keys = await trio.to_thread.run_sync(list_image_keys, s3_client, bucket_name, prefix)
+
+    if not keys:
         print("Looking for images in folder:", os.path.abspath(folder_path))
         return
-    
-    os.makedirs(folder_path, exist_ok=True)  # Ensure the folder exists
 
-    for item in response['Contents']:
-        # Check if the object is an image and if its key starts with the specified folder path
-        file_key = item['Key']
-        if file_key.endswith('.jpg') and file_key.startswith(folder_path):  # Only download jpg images
-            file_name = os.path.join(folder_path, os.path.basename(file_key))
-            s3_client.download_file(bucket_name, file_key, file_name)
-            print(f"Downloaded {file_name}")
+    limiter = trio.CapacityLimiter(max_downloads)
+    errors = []
+
+    async def download(file_key):
+        file_name = os.path.join(folder_path, os.path.basename(file_key))
+        try:
+            await trio.to_thread.run_sync(
+                download_image, s3_client, bucket_name, file_key, file_name, workspace, limiter=limiter
+            )
+        except Exception as e:
+            print(f"Error downloading {file_key}: {str(e)}")
+            errors.append(e)
+            return
+        print(f"Downloaded {file_name}")
+
+    with span("s3_download", objects=len(keys)):
+        async with trio.open_nursery() as nursery:
+            for file_key in keys:
+                # Check if the key starts with the specified folder path
+                if file_key.startswith(folder_path):
+                    nursery.start_soon(download, file_key)
+    # The analysis expects every frame on disk, so a failed download fails the run
+    if errors:
+        raise errors[0]
 
 
 def encode_image(image_path: str) -> str:
     """Convert image to base64 string"""
     with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
+        return encode_image_bytes(image_file.read())
+
+
+def encode_image_bytes(image_bytes: bytes) -> str:
+    """Convert raw image bytes to base64 string"""
+    return base64.b64encode(image_bytes).decode('utf-8')
 
 
 def extract_time_from_filename(filename: str) -> str:
@@ -83,76 +194,329 @@ def extract_time_from_filename(filename: str) -> str:
     return None
 
 
+def build_frame_request(
+    base64_image: str,
+    detail: str = "high",
+    model: str = VISION_MODEL,
+    extra_instructions: str = "",
+    prompt_version: str = PROMPT_VERSION
+) -> Dict:
+    """Keyword arguments for chat.completions.create that analyze one frame
+
+    The static instructions come first and the image last, so every request
+    starts with the same prefix. `extra_instructions` (e.g. the cascade fields)
+    go in the user message, after that prefix. `prompt_version` picks another
+    template, e.g. to compare versions.
+    """
+    content = []
+    if extra_instructions:
+        content.append({"type": "text", "text": extra_instructions.strip()})
+    content.append({
+        "type": "image_url",
+        "image_url": {
+            "url": f"data:image/jpeg;base64,{base64_image}",
+            "detail": detail,
+        }
+    })
+    return {
+        "model": model,
+        "response_format": {"type": "json_object"},
+        "messages": [
+            {"role": "system", "content": frame_prompt(prompt_version)},
+            {"role": "user", "content": content}
+        ],
+        "max_tokens": 1000,
+        "temperature": 0
+    }
+
+
+def build_multi_frame_request(encoded_frames: List) -> Dict:
+    """
+    Keyword arguments for chat.completions.create that analyze several frames
+
+    Args:
+        encoded_frames (List): (base64_image, detail) per frame, in order
+    """
+    content = [{"type": "text", "text": build_multi_frame_prompt(len(encoded_frames))}]
+    for number, (base64_image, detail) in enumerate(encoded_frames, start=1):
+        content.append({"type": "text", "text": f"Frame {number}"})
+        content.append({
+            "type": "image_url",
+            "image_url": {
+                "url": f"data:image/jpeg;base64,{base64_image}",
+                "detail": detail,
+            }
+        })
+
+    return {
+        "model": VISION_MODEL,
+        "response_format": {"type": "json_object"},
+        "messages": [
+            {"role": "system", "content": FRAME_ANALYSIS_PROMPT},
+            {"role": "user", "content": content}
+        ],
+        "max_tokens": min(1000 * len(encoded_frames), 16000),
+        "temperature": 0
+    }
+
+
+def split_multi_frame_response(content: str, count: int) -> List[Dict]:
+    """
+    Split a multi-frame response into one analysis object per frame
+
+    Entries are matched on their "frame" number when present and on position
+    otherwise. Frames the model left out come back as None.
+    """
+    data = json.loads(content)
+    entries = data.get("frames", []) if isinstance(data, dict) else data
+    frames = [None] * count
+
+    for position, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            continue
+        number = entry.pop("frame", None)
+        slot = number - 1 if isinstance(number, int) and 1 <= number <= count else position
+        if slot < count and frames[slot] is None:
+            frames[slot] = entry
+    return frames
+
+
+def cache_prompt_version(
+    preprocessor: FramePreprocessor = None, cascade: ModelCascade = None, frames_per_request: int = 1
+) -> str:
+    """
+    Prompt version part of the cache key, including any preprocessing and cascade
+    settings, and the multi-frame prompt shape when frames are packed per request
+    """
+    version = PROMPT_VERSION
+    if preprocessor is not None:
+        version = f"{version}:{preprocessor.signature()}"
+    if cascade is not None:
+        version = f"{version}:{cascade.signature()}"
+    if frames_per_request > 1:
+        version = f"{version}:f{frames_per_request}"
+    return version
+
+
+def store_in_cache(cache: AnalysisCache, key: str, analysis: str):
+    """Cache an analysis; a failed write is logged and never fails the frame that was already paid for"""
+    try:
+        cache.put(key, analysis)
+    except Exception as e:
+        print(f"Warning: Cache write failed for {key} - {str(e)}")
+
+
+def frame_error_result(image_file: str, time_from_start: str, error) -> Dict:
+    return {
+        "time_from_start": time_from_start,
+        "filename": image_file,
+        "error": str(error),
+        "processed_at": datetime.now().isoformat()
+    }
+
+
+async def analyze_frame_group(
+        client: AsyncOpenAI,
+        frames: List,
+        rate_limiter: AdaptiveRateLimiter,
+        cache: AnalysisCache = None,
+        preprocessor: FramePreprocessor = None,
+        frames_per_request: int = None,
+) -> List[Dict]:
+    """Analyze several frames with a single Vision API call.
+
+    The instruction prompt is sent once for the whole group and the model returns
+    one analysis per frame, which is split back into per-frame timeline entries
+    (each with its own time_from_start). Cached frames are left out of the request.
+
+    Args:
+        frames (List): (image_path, image_file, image_bytes) per frame, in order;
+            image_bytes may be None to read image_path
+        frames_per_request (int): Configured group size, part of the cache key
+            (defaults to the size of this group)
+    """
+    results = [None] * len(frames)
+    # Keyed apart from single-frame answers, which come from a different prompt
+    prompt_version = cache_prompt_version(preprocessor, frames_per_request=max(2, frames_per_request or len(frames)))
+    to_send = []
+
+    for position, (image_path, image_file, image_bytes) in enumerate(frames):
+        time_from_start = extract_and_convert_to_local(image_file, 5, 30)
+        try:
+            if image_bytes is None:
+                with open(image_path, "rb") as f:
+                    image_bytes = f.read()
+
+            cache_key = None
+            if cache is not None:
+                cache_key = content_key(image_bytes, VISION_MODEL, prompt_version)
+                cached_analysis = cache.get(cache_key)
+                if cached_analysis is not None:
+                    results[position] = {
+                        "time_from_start": time_from_start,
+                        "analysis": cached_analysis,
+                        "cached": True,
+                    }
+                    continue
+
+            detail = "high"
+            if preprocessor is not None:
+                image_bytes, detail = await trio.to_thread.run_sync(preprocessor.process, image_bytes)
+            to_send.append((position, encode_image_bytes(image_bytes), detail, cache_key))
+        except Exception as e:
+            print(f"Error processing {image_file}: {str(e)}")
+            results[position] = frame_error_result(image_file, time_from_start, e)
+
+    if not to_send:
+        return results
+
+    try:
+        with span("frame_group_analysis", frames=len(to_send), first=frames[to_send[0][0]][1]):
+            response = await rate_limiter.call(
+                lambda: client.chat.completions.with_raw_response.create(
+                    **build_multi_frame_request([(encoded, detail) for _, encoded, detail, _ in to_send])
+                ),
+                FRAME_TOKEN_ESTIMATE * len(to_send)
+            )
+        frame_analyses = split_multi_frame_response(response.choices[0].message.content, len(to_send))
+    except Exception as e:
+        print(f"Error processing frame group starting at {frames[to_send[0][0]][1]}: {str(e)}")
+        frame_analyses = [e] * len(to_send)
+
+    for (position, _, _, cache_key), frame_analysis in zip(to_send, frame_analyses):
+        image_file = frames[position][1]
+        time_from_start = extract_and_convert_to_local(image_file, 5, 30)
+        if frame_analysis is None or isinstance(frame_analysis, Exception):
+            error = frame_analysis or "Frame missing from multi-frame response"
+            results[position] = frame_error_result(image_file, time_from_start, error)
+            continue
+
+        analysis = json.dumps(frame_analysis)
+        print(time_from_start, analysis)
+        if cache_key is not None:
+            store_in_cache(cache, cache_key, analysis)
+        results[position] = {
+            "time_from_start": time_from_start,
+            "analysis": analysis,
+        }
+
+    return results
+
+
+async def analyze_with_cascade_tier1(
+        client: AsyncOpenAI,
+        base64_image: str,
+        rate_limiter: AdaptiveRateLimiter,
+        cascade: ModelCascade,
+) -> str:
+    """Run the cheap first tier; returns its analysis, or None when the frame must be escalated"""
+    start_time = time.time()
+    try:
+        with span("cascade_tier1", model=cascade.tier1_model):
+            response = await rate_limiter.call(
+                lambda: client.chat.completions.with_raw_response.create(
+                    **build_frame_request(base64_image, cascade.tier1_detail, cascade.tier1_model, CASCADE_INSTRUCTIONS)
+                ),
+                CASCADE_TOKEN_ESTIMATE
+            )
+    except Exception as e:
+        print(f"Cascade tier 1 failed, escalating: {str(e)}")
+        cascade.tier1_failed()
+        return None
+
+    cascade.record(1, time.time() - start_time, getattr(response, "usage", None))
+    return cascade.accept(response.choices[0].message.content)
+
+
 async def analyze_single_image(
         client: AsyncOpenAI,
         image_path: str,
         image_file: str,
-        semaphore: trio.Semaphore,
+        rate_limiter: AdaptiveRateLimiter,
         delay=0,
+        cache: AnalysisCache = None,
+        image_bytes: bytes = None,
+        preprocessor: FramePreprocessor = None,
+        cascade: ModelCascade = None,
 ) -> Dict:
-    """Analyze a single image using OpenAI API with rate limiting"""
-    sleep(delay)
-    async with semaphore:  # Control concurrent requests
+    """Analyze a single image using OpenAI API with adaptive rate limiting.
+
+    Pass `image_bytes` to analyze a frame that is already in memory, in which
+    case `image_path` is not read. When a `preprocessor` is given the frame is
+    downscaled and recompressed before encoding, and it picks the detail level.
+    With a `cascade`, a cheap model answers first and the full model is only
+    called for frames it escalates.
+    """
+    await trio.sleep(delay)
+    time_from_start = extract_and_convert_to_local(image_file, 5, 30)
+    cache_key = None
+    prompt_version = cache_prompt_version(preprocessor, cascade)
+
+    # Answer from the cache before taking a concurrency slot
+    if cache is not None:
         try:
-            time_from_start = extract_and_convert_to_local(image_file, 5, 30)
-            base64_image = encode_image(image_path)
-
-            response = await client.chat.completions.create(
-                model="gpt-4o",
-                response_format={"type": "json_object"},
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": """Create an array of json object
-
-activity: <First, only look at the active window or active tab i.e. where the user's cursor or keyboard typing is active. which one of the following best describes the work user is doing on the active window. Pick any one of the following "Coding", "AI Copilot in IDE" (double check user must be in a code editor (native application), and not on any website that looks like code editor), "Reading Documentation" (must be an official documentation, make a guess based on url if url or page header looks like one for an official documentation), "Reading Web articles/documents" (for articles, blogs, PDFs or report on other webpages), "Reading Stackoverflow", "Watching video tutorial", "Interacting with AI Chatbot" (Select this if user is on an AI website like chatgpt, bolt.new, lovable.dev, claude, gemini, perplexity), "Testing" (select if user is running their code in command line or opening a website created by them for example on localhost, mstunnels, ngrok), "Creating Document" (word, excel, powerpoint), "Reading code in GitHub", "Google Search", "Other". You can pick only one category from double quotes, and do not make a category of your own.>
-open_windows: [
-{
-app: <Find out which app or web app the user is using>,
-action: <What is the user doing on  this app, answer based on what you see the contents of the app, include as many details as you can in 1 line>,
-prompt: <copy paste what user is asking the AI/Search engine to do. Only populate this field if you can see what the user has typed into a text box (and its not a textbox hint like "How can bolt help you today?" or "Edit code (Ctrl+I), @ to mention"). You should be 100% confident that for AI copilots in code editors,  Whatever you are copy pasting here must have been typed into a text box by a human (You know if it was written by human if it starts with small characters, improper grammar or punctuation use).>,
-},
-{...},
-{...}
-]
-
-If the user has multiple windows open with split screen, you can return one object for each window you see. If there's one primary window and others are in background you can skip returning details about the windows in background. Only return multiple when user is using split screen. Ignore the user webcam image overlays if any present."""
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}",
-                                    "detail": "high",
-                                }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=1000,
-                temperature=0
-            )
+            if image_bytes is None:
+                with open(image_path, "rb") as f:
+                    image_bytes = f.read()
+            cache_key = content_key(image_bytes, VISION_MODEL, prompt_version)
+            cached_analysis = cache.get(cache_key)
+            if cached_analysis is not None:
+                return {
+                    "time_from_start": time_from_start,
+                    "analysis": cached_analysis,
+                    "cached": True,
+                }
+        except Exception as e:
+            print(f"Warning: Cache lookup failed for {image_file} - {str(e)}")
+
+    try:
+        if image_bytes is None:
+            with open(image_path, "rb") as f:
+                image_bytes = f.read()
+
+        detail = "high"
+        if preprocessor is not None:
+            image_bytes, detail = await trio.to_thread.run_sync(preprocessor.process, image_bytes)
+        base64_image = encode_image_bytes(image_bytes)
+        # Only the encoded copy is needed from here on
+        image_bytes = None
+
+        analysis = None
+        if cascade is not None:
+            analysis = await analyze_with_cascade_tier1(client, base64_image, rate_limiter, cascade)
 
+        if analysis is None:
+            start_time = time.time()
+            # The limiter owns concurrency, rpm/tpm budgets and retries
+            with span("frame_analysis", frame=image_file):
+                response = await rate_limiter.call(
+                    lambda: client.chat.completions.with_raw_response.create(
+                        **build_frame_request(base64_image, detail)
+                    ),
+                    FRAME_TOKEN_ESTIMATE
+                )
             analysis = response.choices[0].message.content
-            print(time_from_start, analysis)
+            if cascade is not None:
+                cascade.record(2, time.time() - start_time, getattr(response, "usage", None))
 
-            return {
-                "time_from_start": time_from_start,
-                "analysis": analysis,
-            }
+        print(time_from_start, analysis)
 
-            
+        if cache_key is not None:
+            store_in_cache(cache, cache_key, analysis)
 
-        except Exception as e:
-            print(f"Error processing {image_file}: {str(e)}")
-            return {
-                "time_from_start": time_from_start,
-                "filename": image_file,
-                "error": str(e),
-                "processed_at": datetime.now().isoformat()
-            }
+        return {
+            "time_from_start": time_from_start,
+            "analysis": analysis,
+        }
+
+    except Exception as e:
+        print(f"Error processing {image_file}: {str(e)}")
+        return {
+            "time_from_start": time_from_start,
+            "filename": image_file,
+            "error": str(e),
+            "processed_at": datetime.now().isoformat()
+        }
 
 
 async def analyze_screenshots(
@@ -160,7 +524,19 @@ async def analyze_screenshots(
     api_key: str, 
     results_file: str, 
     image_range: List[int] = None,
-    max_concurrent: int = 3
+    max_concurrent: int = 3,
+    dedup_threshold: int = None,
+    cache: AnalysisCache = None,
+    preprocessor: FramePreprocessor = None,
+    rate_limiter: AdaptiveRateLimiter = None,
+    progress: JobProgress = None,
+    checkpoint: CheckpointLog = None,
+    frames_per_request: int = 1,
+    cascade: ModelCascade = None,
+    sample_seconds: float = None,
+    resolution_seconds: float = 10,
+    memory_budget: ByteBudget = None,
+    workspace: Workspace = None
 ):
     """
     Analyze screenshots concurrently using OpenAI's Vision API
@@ -171,73 +547,854 @@ async def analyze_screenshots(
         results_file (str): Path to save the results JSON file
         image_range (List[int]): Range of images to process [start, end]
         max_concurrent (int): Maximum number of concurrent API calls
+        dedup_threshold (int): Hamming distance under which consecutive frames are
+            treated as duplicates and share one API call (None disables dedup)
+        cache (AnalysisCache): Optional cache consulted before each API call
+        preprocessor (FramePreprocessor): Optional resize/recompress stage applied
+            to each frame before encoding
+        rate_limiter (AdaptiveRateLimiter): Shared limiter for API calls (defaults
+            to one capped at max_concurrent)
+        progress (JobProgress): Optional progress tracker, advanced per API call
+        checkpoint (CheckpointLog): Optional append-only log; frames already in it
+            are not analyzed again
+        frames_per_request (int): Consecutive frames packed into each API call
+        cascade (ModelCascade): Optional cheap-first model cascade for frames
+            analyzed one per request
+        sample_seconds (float): Enables adaptive sampling: analyze one frame per
+            this many seconds first, then refine only where the activity or app
+            changes between neighbours (replaces dedup)
+        resolution_seconds (float): Adaptive sampling stops refining gaps this short
+        memory_budget (ByteBudget): Cap on the estimated bytes of frames being read,
+            encoded and sent at once (defaults to DEFAULT_INFLIGHT_BYTES)
+        workspace (Workspace): Where the frames and results file live (defaults to
+            the working directory)
+    """
+    # Initialize OpenAI client; retries are handled by the rate limiter
+    client = get_openai_client(api_key, max_retries=0)
+
+    # Create the shared adaptive rate limiter
+    if rate_limiter is None:
+        rate_limiter = AdaptiveRateLimiter(max_concurrent)
+    if memory_budget is None:
+        memory_budget = ByteBudget(DEFAULT_INFLIGHT_BYTES)
+    if workspace is None:
+        workspace = LOCAL_WORKSPACE
+
+    # Sampling decides which frames stand for which, so frames are not hashed for dedup
+    if sample_seconds:
+        dedup_threshold = None
+    images, selected, image_paths, groups = await select_local_frames(
+        folder_path, image_range, dedup_threshold, workspace
+    )
+
+    if progress is not None:
+        progress.set_stage("analyze", total=len(selected))
+
+    group_sizes = {} if sample_seconds else {group["representative"]: len(group["members"]) for group in groups}
+    representative_results = {}
+
+    def frame_source(index):
+        # (image_path, image_file, image_bytes): frames with a real file are read
+        # inside the call, others are handed over as bytes
+        local_path = workspace.local_path(image_paths[index])
+        if local_path is not None:
+            return local_path, selected[index], None
+        return image_paths[index], selected[index], workspace.read_bytes(image_paths[index])
+
+    async def analyze_chunk(indices):
+        # Frames are read and encoded inside the call, once their bytes fit the budget
+        cost = sum(frame_memory_cost(local_file_size(image_paths[index], workspace)) for index in indices)
+        async with memory_budget.hold(cost):
+            if len(indices) == 1:
+                image_path, image_file, image_bytes = frame_source(indices[0])
+                chunk_results = [await analyze_single_image(
+                    client, image_path, image_file, rate_limiter,
+                    cache=cache, image_bytes=image_bytes, preprocessor=preprocessor, cascade=cascade
+                )]
+                image_bytes = None
+            else:
+                chunk_results = await analyze_frame_group(
+                    client, [frame_source(index) for index in indices], rate_limiter,
+                    cache=cache, preprocessor=preprocessor, frames_per_request=frames_per_request
+                )
+        for index, result in zip(indices, chunk_results):
+            representative_results[index] = result
+            if checkpoint is not None:
+                checkpoint.append(selected[index], result)
+            if progress is not None:
+                progress.add_result(result)
+                progress.increment(group_sizes.get(index, 1))
+
+    async def analyze_indices(indices):
+        # Only frames not already in the checkpoint need an API call
+        pending = []
+        for index in indices:
+            logged = checkpoint.get(selected[index]) if checkpoint is not None else None
+            if logged is not None:
+                representative_results[index] = logged
+                if progress is not None:
+                    progress.add_result(logged)
+                    progress.increment(group_sizes.get(index, 1))
+            else:
+                pending.append(index)
+
+        # Chunks of consecutive frames are pulled by a fixed pool of workers
+        step = max(1, frames_per_request)
+        chunks = [pending[i:i + step] for i in range(0, len(pending), step)]
+        await run_worker_pool(analyze_chunk, chunks, max_concurrent)
+
+    start_time = time.time()
+    print(f"Starting analysis of {len(images)} screenshots...")
+
+    sampler = None
+    if sample_seconds:
+        times = [extract_and_convert_to_local(image_file, 5, 30) for image_file in selected]
+        sampler = AdaptiveSampler(frame_seconds(times), sample_seconds, resolution_seconds)
+        indices = sampler.initial()
+        while indices:
+            await analyze_indices(indices)
+            for index in indices:
+                sampler.record(index, representative_results[index])
+            indices = sampler.refine()
+        groups = sampler.groups()
+        if progress is not None:
+            progress.increment(len(selected) - len(groups))
+    else:
+        await analyze_indices([group["representative"] for group in groups])
+
+    results = expand_duplicate_results(
+        groups, selected, [representative_results[group["representative"]] for group in groups]
+    )
+
+    return save_analysis_results(
+        results_file, results, len(images), groups, dedup_threshold, cache, start_time, preprocessor, rate_limiter,
+        cascade, sampler, memory_budget, workspace
+    )
+
+
+async def select_local_frames(folder_path: str, image_range: List[int], dedup_threshold: int, workspace: Workspace = None):
     """
-    # Initialize OpenAI client
-    client = AsyncOpenAI(api_key=api_key)
+    List the jpg frames in a workspace folder, apply the image range and group duplicates
+
+    Returns:
+        (images, selected, image_paths, groups) where `images` is every frame in the
+        folder and `groups` indexes into `selected` / `image_paths`
+    """
+    if workspace is None:
+        workspace = LOCAL_WORKSPACE
 
     # Get all jpg files from the folder
-    images = [f for f in os.listdir(folder_path) if f.endswith('.jpg')]
+    images = [f for f in workspace.listdir(folder_path) if f.endswith('.jpg')]
     images.sort()
 
-    # Create semaphore for rate limiting
-    semaphore = trio.Semaphore(max_concurrent)
+    # Select the images within the requested range
+    selected = [
+        image_file for num, image_file in enumerate(images)
+        if not image_range or image_range[0] <= num <= image_range[1]
+    ]
+    image_paths = [os.path.join(folder_path, image_file) for image_file in selected]
+
+    # Collapse runs of near-identical frames onto a representative frame
+    if dedup_threshold is not None:
+        groups = await trio.to_thread.run_sync(
+            lambda: group_near_duplicates(image_paths, dedup_threshold, read_bytes=workspace.read_bytes)
+        )
+    else:
+        groups = [{"representative": index, "members": [index]} for index in range(len(selected))]
+
+    return images, selected, image_paths, groups
+
+
+async def analyze_screenshots_batch(
+    folder_path: str,
+    api_key: str,
+    results_file: str,
+    image_range: List[int] = None,
+    dedup_threshold: int = None,
+    cache: AnalysisCache = None,
+    preprocessor: FramePreprocessor = None,
+    batch_dir: str = "batches",
+    poll_interval: float = 30,
+    timeout: float = None,
+    base_url: str = None,
+    progress: JobProgress = None,
+    checkpoint: CheckpointLog = None,
+    workspace: Workspace = None
+):
+    """
+    Analyze screenshots through the OpenAI Batch API instead of per-frame calls
+
+    Every frame request is written to JSONL batch input files as it is built,
+    submitted, and polled until done; the input files are deleted once
+    uploaded or when the job ends; results are then mapped back into the same timeline
+    structure `analyze_screenshots` produces. Meant for non-urgent backlogs:
+    the Batch API is cheaper and has its own, much larger rate limits.
+
+    Args:
+        folder_path (str): Path to the folder containing screenshots
+        api_key (str): OpenAI API key
+        results_file (str): Path to save the results JSON file
+        image_range (List[int]): Range of images to process [start, end]
+        dedup_threshold (int): Hamming distance under which consecutive frames are
+            treated as duplicates and share one request (None disables dedup)
+        cache (AnalysisCache): Optional cache; hits are not sent to the batch
+        preprocessor (FramePreprocessor): Optional resize/recompress stage
+        batch_dir (str): Folder for the JSONL batch input files
+        poll_interval (float): Seconds between batch status checks
+        timeout (float): Give up waiting after this many seconds (None waits)
+        base_url (str): Alternative API base URL, e.g. a local stand-in server
+        progress (JobProgress): Optional progress tracker
+        checkpoint (CheckpointLog): Optional append-only log; frames already in it
+            are not sent again
+        workspace (Workspace): Where the frames and results file live (defaults to
+            the working directory)
+    """
+    client = get_openai_client(api_key, base_url=base_url)
+    start_time = time.time()
+    if workspace is None:
+        workspace = LOCAL_WORKSPACE
+
+    images, selected, image_paths, groups = await select_local_frames(
+        folder_path, image_range, dedup_threshold, workspace
+    )
+    print(f"Preparing batch analysis of {len(images)} screenshots...")
+    if progress is not None:
+        progress.set_stage("batch", total=len(selected))
 
-    # Create tasks for all images
-    tasks = []
-    for num, image_file in enumerate(images):
-        if image_range and (num < image_range[0] or num > image_range[1]): 
+    prompt_version = cache_prompt_version(preprocessor)
+
+    representative_results = {}
+    cache_keys = {}
+    writer = BatchInputWriter(batch_dir, os.path.basename(results_file).split(".")[0])
+    try:
+        for group in groups:
+            index = group["representative"]
+            time_from_start = extract_and_convert_to_local(selected[index], 5, 30)
+            logged = checkpoint.get(selected[index]) if checkpoint is not None else None
+            if logged is not None:
+                representative_results[index] = logged
+                continue
+            try:
+                image_bytes = workspace.read_bytes(image_paths[index])
+
+                if cache is not None:
+                    cache_keys[index] = content_key(image_bytes, VISION_MODEL, prompt_version)
+                    cached_analysis = cache.get(cache_keys[index])
+                    if cached_analysis is not None:
+                        representative_results[index] = {
+                            "time_from_start": time_from_start,
+                            "analysis": cached_analysis,
+                            "cached": True,
+                        }
+                        continue
+
+                detail = "high"
+                if preprocessor is not None:
+                    image_bytes, detail = await trio.to_thread.run_sync(preprocessor.process, image_bytes)
+                writer.add(str(index), build_frame_request(encode_image_bytes(image_bytes), detail))
+            except Exception as e:
+                print(f"Error preparing {selected[index]}: {str(e)}")
+                representative_results[index] = {
+                    "time_from_start": time_from_start,
+                    "filename": selected[index],
+                    "error": str(e),
+                    "processed_at": datetime.now().isoformat()
+                }
+
+        if writer.custom_ids:
+            batch_results = await run_batch(client, writer, poll_interval, timeout)
+        else:
+            batch_results = {}
+    finally:
+        writer.remove()
+
+    for custom_id, batch_result in batch_results.items():
+        index = int(custom_id)
+        time_from_start = extract_and_convert_to_local(selected[index], 5, 30)
+        if "error" in batch_result:
+            representative_results[index] = {
+                "time_from_start": time_from_start,
+                "filename": selected[index],
+                "error": batch_result["error"],
+                "processed_at": datetime.now().isoformat()
+            }
             continue
-        image_path = os.path.join(folder_path, image_file)
-        task = analyze_single_image(client, image_path, image_file, semaphore)
-        tasks.append(task)
+        if index in cache_keys:
+            store_in_cache(cache, cache_keys[index], batch_result["content"])
+        representative_results[index] = {
+            "time_from_start": time_from_start,
+            "analysis": batch_result["content"],
+        }
+        if checkpoint is not None:
+            checkpoint.append(selected[index], representative_results[index])
+
+    results = expand_duplicate_results(
+        groups, selected, [representative_results[group["representative"]] for group in groups]
+    )
+    if progress is not None:
+        for result in results:
+            progress.add_result(result)
+        progress.increment(len(results))
+
+    return save_analysis_results(
+        results_file, results, len(images), groups, dedup_threshold, cache, start_time, preprocessor,
+        workspace=workspace
+    )
+
 
-    # Process images concurrently using trio
+async def stream_and_analyze_from_s3(
+    bucket_name: str,
+    prefix: str,
+    api_key: str,
+    results_file: str,
+    image_range: List[int] = None,
+    max_concurrent: int = 3,
+    max_downloads: int = 16,
+    dedup_threshold: int = None,
+    cache: AnalysisCache = None,
+    s3_client=None,
+    preprocessor: FramePreprocessor = None,
+    rate_limiter: AdaptiveRateLimiter = None,
+    progress: JobProgress = None,
+    checkpoint: CheckpointLog = None,
+    frames_per_request: int = 1,
+    cascade: ModelCascade = None,
+    memory_budget: ByteBudget = None,
+    workspace: Workspace = None
+):
+    """
+    Stream screenshots from S3 straight into the analysis workers
+
+    Keys are listed page by page, downloaded into memory by a bounded pool of
+    workers and pushed through trio memory channels to the analysis workers as
+    they arrive, so nothing is staged on disk and the first API call starts after
+    the first download rather than the last one. Besides the download and call
+    counts, the frames held between download and the end of their API call are
+    capped by `memory_budget`, estimated from the object sizes in the listing.
+
+    Args:
+        bucket_name (str): S3 bucket name
+        prefix (str): Key prefix of the submission's screenshots
+        api_key (str): OpenAI API key
+        results_file (str): Path to save the results JSON file
+        image_range (List[int]): Range of images to process [start, end]
+        max_concurrent (int): Maximum number of concurrent API calls
+        max_downloads (int): Maximum number of concurrent S3 downloads
+        dedup_threshold (int): Hamming distance under which consecutive frames are
+            treated as duplicates and share one API call (None disables dedup)
+        cache (AnalysisCache): Optional cache consulted before each API call
+        s3_client: boto3 S3 client (defaults to the shared client sized for max_downloads)
+        preprocessor (FramePreprocessor): Optional resize/recompress stage applied
+            to each frame before encoding
+        rate_limiter (AdaptiveRateLimiter): Shared limiter for API calls (defaults
+            to one capped at max_concurrent)
+        progress (JobProgress): Optional progress tracker, advanced per frame
+        checkpoint (CheckpointLog): Optional append-only log; frames already in it
+            are neither downloaded nor analyzed again
+        frames_per_request (int): Frames packed into each API call. The pool has
+            max_concurrent // frames_per_request workers, so the number of frames in
+            flight stays about max_concurrent. A single packing stage fills each
+            request and sends a partial one when it does not fill within PACK_WAIT_SECONDS
+        cascade (ModelCascade): Optional cheap-first model cascade for frames
+            analyzed one per request
+        memory_budget (ByteBudget): Cap on the estimated bytes of downloaded frames
+            not yet analyzed (defaults to DEFAULT_INFLIGHT_BYTES)
+        workspace (Workspace): Where the results file is written (defaults to the
+            working directory)
+    """
+    if s3_client is None:
+        s3_client = get_s3_client(max_pool_connections=max_downloads)
+    client = get_openai_client(api_key, max_retries=0)
+    if rate_limiter is None:
+        rate_limiter = AdaptiveRateLimiter(max_concurrent)
+    if memory_budget is None:
+        memory_budget = ByteBudget(DEFAULT_INFLIGHT_BYTES)
+    download_limiter = trio.CapacityLimiter(max_downloads)
     start_time = time.time()
-    print(f"Starting analysis of {len(images)} screenshots...")
 
-    results = await trio.gather(*tasks)
+    objects = await trio.to_thread.run_sync(list_image_objects, s3_client, bucket_name, prefix)
+    keys = [key for key, _ in objects]
+    selected_objects = [
+        item for num, item in enumerate(objects)
+        if not image_range or image_range[0] <= num <= image_range[1]
+    ]
+    selected = [key for key, _ in selected_objects]
+    filenames = [os.path.basename(key) for key in selected]
+    print(f"Starting streaming analysis of {len(selected)} of {len(keys)} screenshots...")
+    if progress is not None:
+        progress.set_stage("analyze", total=len(selected))
+
+    grouper = FrameGrouper(dedup_threshold) if dedup_threshold is not None else None
+    results = {}
+    hashes = {}
+    first_call_at = []
+
+    index_send, index_recv = trio.open_memory_channel(0)
+    downloaded_send, downloaded_recv = trio.open_memory_channel(max_downloads)
+    frame_send, frame_recv = trio.open_memory_channel(max_concurrent)
+    batch_send, batch_recv = trio.open_memory_channel(0)
+
+    costs = {}
+
+    def release_frame(index):
+        memory_budget.release(costs.pop(index, 0))
+
+    async def feed_indices():
+        # Budget is taken here, in capture order, so the frame the dedup stage is
+        # waiting for always has its share and later frames cannot starve it
+        async with index_send:
+            for index in range(len(selected)):
+                if checkpoint is None or checkpoint.get(filenames[index]) is None:
+                    costs[index] = frame_memory_cost(selected_objects[index][1])
+                    await memory_budget.acquire(costs[index])
+                await index_send.send(index)
+
+    async def download_worker(index_recv, downloaded_send):
+        async with index_recv, downloaded_send:
+            async for index in index_recv:
+                # Frames already in the checkpoint are answered from it without a download
+                if checkpoint is not None and checkpoint.get(filenames[index]) is not None:
+                    await downloaded_send.send((index, None, None))
+                    continue
+                try:
+                    data = await trio.to_thread.run_sync(
+                        fetch_image_bytes, s3_client, bucket_name, selected[index],
+                        limiter=download_limiter
+                    )
+                    error = None
+                except Exception as e:
+                    print(f"Error downloading {selected[index]}: {str(e)}")
+                    data, error = None, str(e)
+                await downloaded_send.send((index, data, error))
+
+    async def order_and_dedup(downloaded_recv, frame_send):
+        # Without dedup frames go to the workers in arrival order. With dedup they
+        # are released in capture order, since grouping compares neighbours.
+        pending = {}
+        next_index = 0
+        async with downloaded_recv, frame_send:
+            async for index, data, error in downloaded_recv:
+                if grouper is None:
+                    await frame_send.send((index, data, error))
+                    continue
+
+                pending[index] = (data, error)
+                while next_index in pending:
+                    data, error = pending.pop(next_index)
+                    hash_value = None
+                    if data is not None:
+                        try:
+                            hash_value = await trio.to_thread.run_sync(frame_hash, data, dedup_threshold)
+                        except Exception as e:
+                            print(f"Warning: Could not hash {filenames[next_index]} - {str(e)}")
+                    elif checkpoint is not None:
+                        hash_value = checkpoint.get_hash(filenames[next_index])
+                    hashes[next_index] = hash_value
+                    if grouper.add(next_index, hash_value):
+                        await frame_send.send((next_index, data, error))
+                    else:
+                        release_frame(next_index)
+                        if progress is not None:
+                            progress.increment()
+                    next_index += 1
+
+    async def pack_frames(frame_recv, batch_send):
+        # One task fills every request, so concurrent workers never split frames
+        # between half-full requests; a partial one is sent when downloads or the
+        # dedup stage fall behind for PACK_WAIT_SECONDS
+        async with frame_recv, batch_send:
+            async for frame in frame_recv:
+                batch = [frame]
+                with trio.move_on_after(PACK_WAIT_SECONDS):
+                    while len(batch) < frames_per_request:
+                        try:
+                            batch.append(await frame_recv.receive())
+                        except trio.EndOfChannel:
+                            break
+                await batch_send.send(batch)
+                batch = frame = None
+
+    async def analysis_worker(batch_recv):
+        async with batch_recv:
+            async for batch in batch_recv:
+                to_analyze = []
+                for index, data, error in batch:
+                    logged = checkpoint.get(filenames[index]) if checkpoint is not None else None
+                    if logged is not None:
+                        results[index] = logged
+                    elif error is not None:
+                        time_from_start = extract_and_convert_to_local(filenames[index], 5, 30)
+                        results[index] = frame_error_result(filenames[index], time_from_start, error)
+                    else:
+                        to_analyze.append((index, data))
+                        continue
+                    release_frame(index)
+                    if progress is not None:
+                        progress.add_result(results[index])
+                        progress.increment()
+                # Drop this task's references so analyzed frames are freed with their call
+                batch = data = None
+
+                if not to_analyze:
+                    continue
+                if not first_call_at:
+                    first_call_at.append(time.time())
+                    print(f"First frame ready for analysis after {first_call_at[0] - start_time:.2f} seconds")
+
+                analyzed_indices = [index for index, _ in to_analyze]
+                if len(to_analyze) == 1:
+                    index, data = to_analyze[0]
+                    batch_results = [await analyze_single_image(
+                        client, None, filenames[index], rate_limiter,
+                        cache=cache, image_bytes=data, preprocessor=preprocessor, cascade=cascade
+                    )]
+                else:
+                    batch_results = await analyze_frame_group(
+                        client, [(None, filenames[index], data) for index, data in to_analyze], rate_limiter,
+                        cache=cache, preprocessor=preprocessor, frames_per_request=frames_per_request
+                    )
+
+                for index, _ in to_analyze:
+                    release_frame(index)
+                to_analyze = None
+
+                for index, result in zip(analyzed_indices, batch_results):
+                    results[index] = result
+                    if checkpoint is not None:
+                        checkpoint.append(filenames[index], result, hashes.get(index))
+                    if progress is not None:
+                        progress.add_result(result)
+                        progress.increment()
+
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(feed_indices)
+        async with index_recv, downloaded_send:
+            for _ in range(max_downloads):
+                nursery.start_soon(download_worker, index_recv.clone(), downloaded_send.clone())
+        nursery.start_soon(order_and_dedup, downloaded_recv, frame_send)
+        nursery.start_soon(pack_frames, frame_recv, batch_send)
+        async with batch_recv:
+            for _ in range(max(1, max_concurrent // max(1, frames_per_request))):
+                nursery.start_soon(analysis_worker, batch_recv.clone())
+
+    if grouper is not None:
+        groups = grouper.groups
+    else:
+        groups = [{"representative": index, "members": [index]} for index in range(len(selected))]
+    representative_results = [results[group["representative"]] for group in groups]
+    results = expand_duplicate_results(groups, filenames, representative_results)
+
+    return save_analysis_results(
+        results_file, results, len(keys), groups, dedup_threshold, cache, start_time, preprocessor, rate_limiter,
+        cascade, memory_budget=memory_budget, workspace=workspace
+    )
+
+
+def local_file_size(path: str, workspace: Workspace = None) -> int:
+    """Size of a workspace file, 0 if it cannot be read (the analysis reports the error)"""
+    try:
+        return (workspace or LOCAL_WORKSPACE).size(path)
+    except OSError:
+        return 0
+
+
+async def run_worker_pool(func, items: List, workers: int):
+    """
+    Call `func(item)` for every item with at most `workers` calls running.
+
+    Only `workers` tasks exist at a time and each takes the next item when it
+    finishes, so no task or coroutine is created per item up front.
+    """
+    send_channel, receive_channel = trio.open_memory_channel(0)
+
+    async def worker(receive_channel):
+        async with receive_channel:
+            async for item in receive_channel:
+                await func(item)
+
+    async with trio.open_nursery() as nursery:
+        async with receive_channel:
+            for _ in range(max(1, min(workers, len(items)))):
+                nursery.start_soon(worker, receive_channel.clone())
+        async with send_channel:
+            for item in items:
+                await send_channel.send(item)
+
+
+def expand_duplicate_results(groups: List[Dict], filenames: List[str], representative_results: List[Dict]) -> List[Dict]:
+    """Fill every skipped frame from its representative so durations stay correct"""
+    results = []
+    for group, result in zip(groups, representative_results):
+        representative_file = filenames[group["representative"]]
+        for index in group["members"]:
+            if index == group["representative"]:
+                results.append(result)
+                continue
+            duplicate = dict(result)
+            duplicate["time_from_start"] = extract_and_convert_to_local(filenames[index], 5, 30)
+            duplicate["duplicate_of"] = representative_file
+            if "filename" in duplicate:
+                duplicate["filename"] = filenames[index]
+            results.append(duplicate)
+    return results
+
+
+def save_analysis_results(
+    results_file: str,
+    results: List[Dict],
+    total_screenshots: int,
+    groups: List[Dict],
+    dedup_threshold: int,
+    cache: AnalysisCache,
+    start_time: float,
+    preprocessor: FramePreprocessor = None,
+    rate_limiter: AdaptiveRateLimiter = None,
+    cascade: ModelCascade = None,
+    sampler: AdaptiveSampler = None,
+    memory_budget: ByteBudget = None,
+    workspace: Workspace = None
+) -> List[Dict]:
+    """Sort results into a timeline, write the analysis JSON to the workspace and return the timeline"""
+    frames = sum(len(group["members"]) for group in groups)
+    dedup_stats = {
+        "frames": frames,
+        "api_calls": len(groups),
+        "calls_saved": frames - len(groups),
+        "threshold": dedup_threshold,
+    }
+    if dedup_threshold is not None:
+        print(f"Deduplication saved {dedup_stats['calls_saved']} of {frames} API calls")
 
     # Sort results by timestamp
     timeline = sorted(results, key=lambda x: x['time_from_start'] if x['time_from_start'] else '')
 
-    # Save results
-    with open(results_file, 'w') as f:
-        json.dump({
-            "timeline": timeline,
-            "total_screenshots": len(images),
-            "processing_time": f"{time.time() - start_time:.2f} seconds",
-            "last_updated": datetime.now().isoformat()
-        }, f, indent=4)
+    # Save results in the format implied by the file name
+    write_timeline(results_file, {
+        "timeline": timeline,
+        "total_screenshots": total_screenshots,
+        "dedup": dedup_stats,
+        "cache": cache.stats() if cache is not None else None,
+        "preprocess": preprocessor.stats() if preprocessor is not None else None,
+        "rate_limiter": rate_limiter.stats() if rate_limiter is not None else None,
+        "cascade": cascade.stats() if cascade is not None else None,
+        "sampling": sampler.stats() if sampler is not None else None,
+        "memory_budget": memory_budget.stats() if memory_budget is not None else None,
+        "prompt_version": PROMPT_VERSION,
+        "processing_time": f"{time.time() - start_time:.2f} seconds",
+        "last_updated": datetime.now().isoformat()
+    }, workspace)
 
     print(f"\nAnalysis complete in {time.time() - start_time:.2f} seconds")
+    if cache is not None:
+        print(f"Analysis cache: {cache.stats()}")
+    if rate_limiter is not None:
+        print(f"Rate limiter: {rate_limiter.stats()}")
+    if preprocessor is not None:
+        stats = preprocessor.stats()
+        print(
+            f"Preprocessing saved {stats['bytes_saved']} bytes and "
+            f"~{stats['estimated_tokens_saved']} input tokens over {stats['frames']} frames"
+        )
+    if cascade is not None:
+        stats = cascade.stats()
+        print(
+            f"Cascade escalated {stats['escalated']} of {stats['frames']} frames "
+            f"({stats['escalation_rate']}), ${stats['cost_per_frame_usd']} per frame"
+        )
+    if sampler is not None:
+        stats = sampler.stats()
+        print(
+            f"Adaptive sampling analyzed {stats['analyzed']} of {stats['frames']} frames "
+            f"in {stats['rounds']} rounds ({stats['segments']} segments)"
+        )
     print(f"Results saved to {results_file}")
 
     return timeline
 
 
 # Main entry point of the script
-async def main(submission_id, assignment_id, user_id):
+def build_rate_limiter() -> AdaptiveRateLimiter:
+    """
+    Limiter over the account's per-minute OpenAI budgets (OPENAI_RPM_LIMIT,
+    OPENAI_TPM_LIMIT). Submissions running at the same time in one process must
+    share one limiter, otherwise each of them spends the whole budget.
+    """
+    return AdaptiveRateLimiter(
+        MAX_CONCURRENT_REQUESTS,
+        int(os.getenv("OPENAI_RPM_LIMIT", "5000")),
+        int(os.getenv("OPENAI_TPM_LIMIT", "800000"))
+    )
+
+
+async def main(
+    submission_id,
+    assignment_id,
+    user_id,
+    progress: JobProgress = None,
+    workspace: Workspace = None,
+    rate_limiter: AdaptiveRateLimiter = None
+):
     # Configuration
     ASSIGNMENT_ID=submission_id
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")  # Replace with your actual API key
     SCREENSHOTS_FOLDER = f"screenshots/{ASSIGNMENT_ID}"
-    RESULTS_FILE = f"analysis/{ASSIGNMENT_ID}.json"
-    IMAGE_RANGE = [0, 2200]  # Specify which images to process (adjust as needed)
-    MAX_CONCURRENT_REQUESTS = 60  # Adjust based on your API limits
+    # "json" (pretty-printed) or compressed JSON Lines: "jsonl.gz" / "jsonl.zst"
+    ARTIFACT_FORMAT = os.getenv("ARTIFACT_FORMAT", "json")
+    RESULTS_FILE = artifact_path(f"analysis/{ASSIGNMENT_ID}", ARTIFACT_FORMAT)
+    IMAGE_RANGE = [0, int(os.getenv("MAX_FRAME_INDEX", "2200"))]  # Specify which images to process (adjust as needed)
+    # Max dhash bit difference for frames sharing one API call. 0 merges byte-identical
+    # frames only: small text edits (a typed prompt, a new code line) move a dhash by
+    # just 1-2 bits, so raise this only after checking it on real recordings
+    DEDUP_THRESHOLD = int(os.getenv("DEDUP_THRESHOLD", "0"))
+    CACHE_PATH = os.getenv("ANALYSIS_CACHE_PATH", "cache/frame_analysis.db")
+    CHECKPOINT_FILE = f"analysis/{ASSIGNMENT_ID}.checkpoint.jsonl"
+    RESUME = os.getenv("RESUME_ANALYSIS", "1") == "1"  # Skip frames already in the checkpoint log
+    STREAM_FROM_S3 = True  # Analyze frames as they download instead of staging them on disk
+    USE_BATCH_API = os.getenv("USE_BATCH_API") == "1"  # Offline Batch API mode for non-urgent runs
+    BATCH_BASE_URL = os.getenv("OPENAI_BATCH_BASE_URL")  # Point at a local stand-in for testing
+    MAX_CONCURRENT_DOWNLOADS = 16
+    # Estimated bytes of frames held between read/download and the end of their API call
+    MAX_INFLIGHT_BYTES = int(float(os.getenv("MAX_INFLIGHT_MB", "256")) * 1024 * 1024)
+    FRAMES_PER_REQUEST = int(os.getenv("FRAMES_PER_REQUEST", "1"))  # >1 packs frames into one Vision call
+    # Cheap model first, gpt-4o only for uncertain frames or frames with a typed AI prompt
+    USE_MODEL_CASCADE = os.getenv("MODEL_CASCADE") == "1"
+    CASCADE_CONFIDENCE = float(os.getenv("CASCADE_CONFIDENCE", "0.8"))
+    # Adaptive sampling: one frame per SAMPLE_SECONDS, refined down to SAMPLE_RESOLUTION_SECONDS
+    # around activity/app changes (0 analyzes every frame)
+    SAMPLE_SECONDS = float(os.getenv("SAMPLE_SECONDS", "0"))
+    SAMPLE_RESOLUTION_SECONDS = float(os.getenv("SAMPLE_RESOLUTION_SECONDS", "10"))
+    # Frame preprocessing (downscale, mask the webcam overlay, recompress, pick the
+    # detail level). Off by default: shrinking frames can cost accuracy on small
+    # on-screen text, so enable it only after checking it on real recordings
+    PREPROCESS_FRAMES = os.getenv("PREPROCESS_FRAMES") == "1"
+    PREPROCESS_MAX_TILES = int(os.getenv("PREPROCESS_MAX_TILES", "4"))
+    PREPROCESS_QUALITY = int(os.getenv("PREPROCESS_QUALITY", "75"))
+    PREPROCESS_DETAIL = os.getenv("PREPROCESS_DETAIL", "auto")  # "high", "low" or "auto"
+    # Webcam overlay box as left,top,right,bottom fractions, e.g. "0.8,0.75,1.0,1.0"
+    PREPROCESS_WEBCAM_REGION = os.getenv("PREPROCESS_WEBCAM_REGION")
+    preprocessor = None
+    if PREPROCESS_FRAMES:
+        preprocessor = FramePreprocessor(
+            max_tiles=PREPROCESS_MAX_TILES,
+            quality=PREPROCESS_QUALITY,
+            webcam_region=tuple(float(v) for v in PREPROCESS_WEBCAM_REGION.split(",")) if PREPROCESS_WEBCAM_REGION else None,
+            detail=PREPROCESS_DETAIL
+        )
     PREFIX=f"screenshots/{ASSIGNMENT_ID}"
-    # Download images from S3 before starting analysis
     BUCKET_NAME = os.getenv("S3_BUCKET_NAME")  # Replace with your S3 bucket name
-    download_images_from_s3(BUCKET_NAME, SCREENSHOTS_FOLDER, PREFIX)
-
-    # Run analysis after downloading images
-    timeline = await analyze_screenshots(
-        SCREENSHOTS_FOLDER,
-        OPENAI_API_KEY,
-        RESULTS_FILE,
-        IMAGE_RANGE,
-        MAX_CONCURRENT_REQUESTS
-    )   
-    await timeline_analysis_main(submission_id, assignment_id, user_id)
+
+    TRACE_FILE = f"traces/{ASSIGNMENT_ID}.json"  # Spans, token usage and bytes for this run
+    # Where frames and intermediate artifacts live: "local" (the working directory),
+    # "disk" / "tmpfs" (a private temporary directory) or "memory"; the last three
+    # are removed when the job ends
+    WORKSPACE_BACKEND = os.getenv("WORKSPACE_BACKEND", "local")
+
+    cascade = ModelCascade(confidence_threshold=CASCADE_CONFIDENCE) if USE_MODEL_CASCADE else None
+    trace = start_trace(submission_id)
+    if rate_limiter is None:
+        rate_limiter = build_rate_limiter()
+    memory_budget = ByteBudget(MAX_INFLIGHT_BYTES)
+
+    owns_workspace = workspace is None
+    if owns_workspace:
+        workspace = create_workspace(WORKSPACE_BACKEND, submission_id)
+
+    cache = AnalysisCache(CACHE_PATH)
+    checkpoint = CheckpointLog(
+        CHECKPOINT_FILE,
+        resume=RESUME,
+        workspace=workspace,
+        model=VISION_MODEL,
+        prompt_version=cache_prompt_version(preprocessor, cascade, FRAMES_PER_REQUEST)
+    )
+    try:
+        try:
+            with span("frame_analysis_stage", submission_id=submission_id):
+                if USE_BATCH_API:
+                    if progress is not None:
+                        progress.set_stage("download")
+                    await download_images_from_s3(
+                        BUCKET_NAME, SCREENSHOTS_FOLDER, PREFIX, workspace=workspace, max_downloads=MAX_CONCURRENT_DOWNLOADS
+                    )
+                    await analyze_screenshots_batch(
+                        SCREENSHOTS_FOLDER,
+                        OPENAI_API_KEY,
+                        RESULTS_FILE,
+                        IMAGE_RANGE,
+                        DEDUP_THRESHOLD,
+                        cache,
+                        preprocessor,
+                        base_url=BATCH_BASE_URL,
+                        progress=progress,
+                        checkpoint=checkpoint,
+                        workspace=workspace
+                    )
+                elif STREAM_FROM_S3 and not SAMPLE_SECONDS:
+                    await stream_and_analyze_from_s3(
+                        BUCKET_NAME,
+                        PREFIX,
+                        OPENAI_API_KEY,
+                        RESULTS_FILE,
+                        IMAGE_RANGE,
+                        MAX_CONCURRENT_REQUESTS,
+                        MAX_CONCURRENT_DOWNLOADS,
+                        DEDUP_THRESHOLD,
+                        cache,
+                        preprocessor=preprocessor,
+                        rate_limiter=rate_limiter,
+                        progress=progress,
+                        checkpoint=checkpoint,
+                        frames_per_request=FRAMES_PER_REQUEST,
+                        cascade=cascade,
+                        memory_budget=memory_budget,
+                        workspace=workspace
+                    )
+                else:
+                    # Download images from S3 before starting analysis
+                    if progress is not None:
+                        progress.set_stage("download")
+                    await download_images_from_s3(
+                        BUCKET_NAME, SCREENSHOTS_FOLDER, PREFIX, workspace=workspace, max_downloads=MAX_CONCURRENT_DOWNLOADS
+                    )
+
+                    # Run analysis after downloading images
+                    await analyze_screenshots(
+                        SCREENSHOTS_FOLDER,
+                        OPENAI_API_KEY,
+                        RESULTS_FILE,
+                        IMAGE_RANGE,
+                        MAX_CONCURRENT_REQUESTS,
+                        DEDUP_THRESHOLD,
+                        cache,
+                        preprocessor=preprocessor,
+                        rate_limiter=rate_limiter,
+                        progress=progress,
+                        checkpoint=checkpoint,
+                        frames_per_request=FRAMES_PER_REQUEST,
+                        cascade=cascade,
+                        sample_seconds=SAMPLE_SECONDS or None,
+                        resolution_seconds=SAMPLE_RESOLUTION_SECONDS,
+                        memory_budget=memory_budget,
+                        workspace=workspace
+                    )
+        finally:
+            checkpoint.close()
+            cache.close()
+
+        with span("timeline_analysis_stage", submission_id=submission_id):
+            await timeline_analysis_main(
+                submission_id, assignment_id, user_id, progress=progress, workspace=workspace, file_path=RESULTS_FILE
+            )
+    finally:
+        trace.save(TRACE_FILE)
+        if owns_workspace:
+            workspace.cleanup()
 
 if __name__ == "__main__":
-    trio.run(main)
+    import sys
+
+    if len(sys.argv) != 4:
+        print("Usage: python -m helper.entry <submission_id> <assignment_id> <user_id>")
+        print("For many submissions use: python -m helper.batch_runner <submissions.csv>")
+        sys.exit(2)
+    trio.run(run_closing_clients, main, *sys.argv[1:4])
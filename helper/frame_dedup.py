@@ -0,0 +1,126 @@
+import io
+import hashlib
+from typing import List, Dict, Union
+from PIL import Image
+
+# A 16x16 grid (256 bits) still misses small text edits on a full-resolution
+# screen, so near-duplicate thresholds above 0 are only safe for static content
+DEFAULT_HASH_SIZE = 16
+
+
+def dhash(image_path: Union[str, bytes], hash_size: int = DEFAULT_HASH_SIZE) -> int:
+    """
+    Compute the difference hash of an image.
+
+    The image is shrunk to (hash_size + 1) x hash_size greyscale pixels and each
+    bit records whether a pixel is brighter than its right-hand neighbour, so
+    frames that look the same produce hashes a few bits apart.
+
+    Args:
+        image_path (str | bytes): Path to the image file, or its raw bytes
+        hash_size (int): Width/height of the hash grid (hash_size ** 2 bits)
+    """
+    source = io.BytesIO(image_path) if isinstance(image_path, bytes) else image_path
+    with Image.open(source) as image:
+        pixels = list(
+            image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR).getdata()
+        )
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def content_hash(image_path: Union[str, bytes]) -> int:
+    """Digest of the image file's bytes as an int: equal only for byte-identical frames"""
+    if not isinstance(image_path, bytes):
+        with open(image_path, "rb") as f:
+            image_path = f.read()
+    return int.from_bytes(hashlib.blake2b(image_path, digest_size=16).digest(), "big")
+
+
+def frame_hash(image_path: Union[str, bytes], threshold: int, hash_size: int = DEFAULT_HASH_SIZE) -> int:
+    """
+    Hash that frames are grouped on.
+
+    With threshold 0 only exact duplicates may share an API call, so the hash is
+    a digest of the file's bytes; a perceptual hash can be identical for two
+    frames that differ by a typed line. Above 0 it is the `dhash`.
+    """
+    if threshold == 0:
+        return content_hash(image_path)
+    return dhash(image_path, hash_size)
+
+
+def hamming_distance(hash1: int, hash2: int) -> int:
+    """Number of differing bits between two hashes"""
+    return bin(hash1 ^ hash2).count("1")
+
+
+class FrameGrouper:
+    """
+    Incrementally group consecutive near-identical frames behind a representative.
+
+    Each frame is compared against the representative of the current group rather
+    than its direct predecessor, so slow drift (e.g. a line typed per frame) still
+    starts a new group once it adds up to more than `threshold` bits. Frames must
+    be added in capture order.
+    """
+
+    def __init__(self, threshold: int):
+        self.threshold = threshold
+        self.groups = []
+        self.representative_hash = None
+
+    def add(self, index: int, frame_hash: int = None) -> bool:
+        """
+        Add a frame and return True if it starts a new group (needs an API call).
+
+        Pass frame_hash=None for frames that could not be hashed; they are never
+        merged so the API call can surface the error.
+        """
+        if (
+            frame_hash is not None
+            and self.representative_hash is not None
+            and hamming_distance(frame_hash, self.representative_hash) <= self.threshold
+        ):
+            self.groups[-1]["members"].append(index)
+            return False
+
+        self.groups.append({"representative": index, "members": [index]})
+        self.representative_hash = frame_hash
+        return True
+
+
+def group_near_duplicates(
+    image_paths: List[str], threshold: int, hash_size: int = DEFAULT_HASH_SIZE, read_bytes=None
+) -> List[Dict]:
+    """
+    Group consecutive near-identical frames behind a representative frame.
+
+    Args:
+        image_paths (List[str]): Frame paths, sorted in capture order
+        threshold (int): Maximum hamming distance to count as a duplicate (0 groups
+            byte-identical frames only)
+        hash_size (int): Hash grid size passed to `dhash`
+        read_bytes: Optional callable returning a frame's bytes for its path
+            (e.g. Workspace.read_bytes); frames are opened directly otherwise
+
+    Returns:
+        List of {"representative": index, "members": [indices]} in capture order.
+        The representative is always the first entry of its own members list.
+    """
+    grouper = FrameGrouper(threshold)
+
+    for index, image_path in enumerate(image_paths):
+        try:
+            value = frame_hash(read_bytes(image_path) if read_bytes else image_path, threshold, hash_size)
+        except Exception as e:
+            print(f"Warning: Could not hash {image_path} - {str(e)}")
+            value = None
+        grouper.add(index, value)
+
+    return grouper.groups
@@ -0,0 +1,145 @@
+import io
+import math
+from typing import Tuple, Dict
+from PIL import Image, ImageDraw, ImageFilter, ImageStat
+
+
+def estimate_image_tokens(width: int, height: int, detail: str = "high") -> int:
+    """
+    Estimate the input tokens the Vision API bills for an image.
+
+    Low detail is a flat 85 tokens. High detail scales the image to fit within
+    2048x2048, then its shortest side to 768px, and bills 170 tokens per 512px
+    tile plus the 85 token base.
+    """
+    if detail == "low":
+        return 85
+
+    width, height = fit_for_high_detail(width, height)
+    tiles = math.ceil(width / 512) * math.ceil(height / 512)
+    return 85 + 170 * tiles
+
+
+def fit_for_high_detail(width: int, height: int) -> Tuple[int, int]:
+    """Apply the API's own high detail scaling so we never send pixels it discards"""
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+class FramePreprocessor:
+    """
+    Shrink screenshots before they are base64 encoded and sent to the Vision API.
+
+    Each frame is downscaled to fit `max_tiles` 512px tiles, the webcam overlay
+    region is optionally masked out, and the result is recompressed as JPEG at
+    `quality`. With detail="auto", frames with little visible structure (blank
+    screens, video, loading pages) are sent at low detail and everything else at
+    high detail. Byte and token savings are accumulated across frames.
+
+    Args:
+        max_tiles (int): Tile budget per frame at high detail
+        quality (int): JPEG quality used when recompressing
+        webcam_region (Tuple[float, float, float, float]): Overlay box to mask as
+            (left, top, right, bottom) fractions of the frame, or None
+        detail (str): "high", "low" or "auto"
+        low_detail_edge_threshold (float): Mean edge intensity under which "auto"
+            picks low detail
+    """
+
+    def __init__(
+        self,
+        max_tiles: int = 4,
+        quality: int = 75,
+        webcam_region: Tuple[float, float, float, float] = None,
+        detail: str = "auto",
+        low_detail_edge_threshold: float = 6.0
+    ):
+        self.max_tiles = max_tiles
+        self.quality = quality
+        self.webcam_region = webcam_region
+        self.detail = detail
+        self.low_detail_edge_threshold = low_detail_edge_threshold
+
+        self.frames = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.low_detail_frames = 0
+
+    def signature(self) -> str:
+        """Short description of the settings, used to keep cached results apart"""
+        region = ",".join(str(v) for v in self.webcam_region) if self.webcam_region else "none"
+        return f"t{self.max_tiles}-q{self.quality}-w{region}-d{self.detail}"
+
+    def process(self, image_bytes: bytes) -> Tuple[bytes, str]:
+        """
+        Preprocess one frame.
+
+        Returns:
+            (jpeg_bytes, detail) ready to be base64 encoded into the request
+        """
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            image = image.convert("RGB")
+        original_size = image.size
+
+        if self.webcam_region:
+            left, top, right, bottom = self.webcam_region
+            width, height = image.size
+            ImageDraw.Draw(image).rectangle(
+                [left * width, top * height, right * width, bottom * height], fill=(0, 0, 0)
+            )
+
+        # Resize to what the API would keep anyway, then further to the tile budget
+        width, height = fit_for_high_detail(*image.size)
+        while math.ceil(width / 512) * math.ceil(height / 512) > self.max_tiles and min(width, height) > 64:
+            width, height = int(width * 0.9), int(height * 0.9)
+        if (width, height) != image.size:
+            image = image.resize((width, height), Image.LANCZOS)
+
+        detail = self.detail
+        if detail == "auto":
+            detail = "high" if self.edge_density(image) >= self.low_detail_edge_threshold else "low"
+        if detail == "low":
+            # Low detail is processed at 512x512, so extra pixels are wasted upload
+            image.thumbnail((512, 512), Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=self.quality, optimize=True)
+        processed = buffer.getvalue()
+
+        # Keep the original bytes if recompressing made the frame larger
+        if len(processed) >= len(image_bytes) and image.size == original_size:
+            processed = image_bytes
+
+        self.frames += 1
+        self.bytes_in += len(image_bytes)
+        self.bytes_out += len(processed)
+        self.tokens_in += estimate_image_tokens(*original_size, "high")
+        self.tokens_out += estimate_image_tokens(*image.size, detail)
+        if detail == "low":
+            self.low_detail_frames += 1
+
+        return processed, detail
+
+    @staticmethod
+    def edge_density(image: Image.Image) -> float:
+        """Mean edge intensity of a small greyscale thumbnail (text-heavy frames score high)"""
+        thumbnail = image.convert("L")
+        thumbnail.thumbnail((256, 256))
+        return ImageStat.Stat(thumbnail.filter(ImageFilter.FIND_EDGES)).mean[0]
+
+    def stats(self) -> Dict:
+        """Bytes and estimated input tokens saved across all processed frames"""
+        return {
+            "frames": self.frames,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "bytes_saved": self.bytes_in - self.bytes_out,
+            "estimated_tokens_in": self.tokens_in,
+            "estimated_tokens_out": self.tokens_out,
+            "estimated_tokens_saved": self.tokens_in - self.tokens_out,
+            "low_detail_frames": self.low_detail_frames,
+        }
@@ -0,0 +1,215 @@
+import math
+import time
+import uuid
+import threading
+import trio
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from helper.live_report import LiveReport
+
+
+class JobProgress:
+    """
+    Per-stage progress of one pipeline run.
+
+    The pipeline calls `set_stage` when it moves on and `increment` as units of
+    work (e.g. frames) finish; `to_dict` is what the status endpoint returns.
+    Frame results passed to `add_result` feed the optional live `report`.
+    The pipeline and the status endpoint run on different threads, so every
+    read and update holds `lock`.
+    """
+
+    def __init__(self, report: LiveReport = None):
+        self.stage = None
+        self.stages = {}
+        self.report = report
+        self.lock = threading.RLock()
+
+    def set_stage(self, name: str, total: int = None):
+        now = time.time()
+        with self.lock:
+            if self.stage is not None and self.stages[self.stage]["finished_at"] is None:
+                self.stages[self.stage]["finished_at"] = now
+            self.stage = name
+            self.stages[name] = {"started_at": now, "finished_at": None, "done": 0, "total": total}
+
+    def set_total(self, total: int):
+        with self.lock:
+            if self.stage is not None:
+                self.stages[self.stage]["total"] = total
+
+    def increment(self, count: int = 1):
+        with self.lock:
+            if self.stage is not None:
+                self.stages[self.stage]["done"] += count
+
+    def add_result(self, result: Dict):
+        if self.report is not None:
+            self.report.add(result)
+
+    def finish(self):
+        with self.lock:
+            if self.stage is not None and self.stages[self.stage]["finished_at"] is None:
+                self.stages[self.stage]["finished_at"] = time.time()
+        if self.report is not None:
+            self.report.finish()
+
+    def to_dict(self) -> Dict:
+        with self.lock:
+            return {"stage": self.stage, "stages": {name: dict(info) for name, info in self.stages.items()}}
+
+
+class Job(JobProgress):
+    """A queued pipeline run for one submission"""
+
+    def __init__(self, submission_id: str, assignment_id: str, user_id: str):
+        super().__init__(LiveReport())
+        self.id = uuid.uuid4().hex
+        self.submission_id = submission_id
+        self.assignment_id = assignment_id
+        self.user_id = user_id
+        self.status = "queued"
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def to_dict(self) -> Dict:
+        with self.lock:
+            data = super().to_dict()
+            data.update({
+                "job_id": self.id,
+                "submission_id": self.submission_id,
+                "assignment_id": self.assignment_id,
+                "user_id": self.user_id,
+                "status": self.status,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            })
+            return data
+
+
+class JobQueue:
+    """
+    In-process job queue drained by a trio loop on a background thread.
+
+    `enqueue` can be called from any thread (e.g. an HTTP handler) and returns
+    immediately. At most `max_parallel` submissions run at once, and enqueueing
+    a submission that is already queued or running returns the existing job
+    instead of starting a second run. Finished jobs are dropped once they are
+    older than `finished_ttl` or more than `max_finished` of them are held.
+
+    Jobs live only in this process: they are lost if it exits, and on a
+    serverless host (e.g. Vercel) the instance may be frozen or recycled as
+    soon as the response that queued the job is sent. Run the pipeline on a
+    long-lived process (or through helper.batch_runner) when runs must finish.
+
+    Args:
+        runner: async callable (submission_id, assignment_id, user_id, progress=job)
+        max_parallel (int): Maximum number of submissions processed concurrently
+        finished_ttl (float): Seconds a finished job stays queryable
+        max_finished (int): Maximum number of finished jobs kept
+    """
+
+    def __init__(
+        self,
+        runner: Callable[..., Awaitable],
+        max_parallel: int = 2,
+        finished_ttl: float = 3600,
+        max_finished: int = 1000
+    ):
+        self.runner = runner
+        self.max_parallel = max_parallel
+        self.finished_ttl = finished_ttl
+        self.max_finished = max_finished
+        self.jobs = {}
+        self.active_by_submission = {}
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.thread = None
+        self.trio_token = None
+        self.send_channel = None
+
+    def start(self):
+        """Start the worker thread (idempotent)"""
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=trio.run, args=(self.worker,), daemon=True)
+            self.thread.start()
+        self.ready.wait()
+
+    def enqueue(self, submission_id: str, assignment_id: str, user_id: str) -> Tuple[Job, bool]:
+        """
+        Queue a pipeline run.
+
+        Returns:
+            (job, created) where created is False if an active job for the same
+            submission already existed and was returned instead
+        """
+        self.start()
+        with self.lock:
+            self.prune()
+            existing = self.active_by_submission.get(submission_id)
+            if existing is not None and existing.active:
+                return existing, False
+
+            job = Job(submission_id, assignment_id, user_id)
+            self.jobs[job.id] = job
+            self.active_by_submission[submission_id] = job
+
+        trio.from_thread.run_sync(self.send_channel.send_nowait, job, trio_token=self.trio_token)
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def prune(self):
+        """Drop expired finished jobs, oldest first; the caller holds `lock`"""
+        finished = sorted(
+            (job for job in self.jobs.values() if job.finished_at is not None),
+            key=lambda job: job.finished_at
+        )
+        cutoff = time.time() - self.finished_ttl
+        excess = len(finished) - self.max_finished
+        for position, job in enumerate(finished):
+            if position >= excess and job.finished_at >= cutoff:
+                break
+            del self.jobs[job.id]
+            if self.active_by_submission.get(job.submission_id) is job:
+                del self.active_by_submission[job.submission_id]
+
+    async def worker(self):
+        self.send_channel, receive_channel = trio.open_memory_channel(math.inf)
+        self.trio_token = trio.lowlevel.current_trio_token()
+        self.ready.set()
+
+        limiter = trio.CapacityLimiter(self.max_parallel)
+        async with trio.open_nursery() as nursery:
+            async for job in receive_channel:
+                await limiter.acquire_on_behalf_of(job)
+                nursery.start_soon(self.run_job, job, limiter)
+
+    async def run_job(self, job: Job, limiter: trio.CapacityLimiter):
+        with job.lock:
+            job.status = "running"
+            job.started_at = time.time()
+        try:
+            await self.runner(job.submission_id, job.assignment_id, job.user_id, progress=job)
+            with job.lock:
+                job.status = "succeeded"
+        except Exception as e:
+            print(f"Job {job.id} for submission {job.submission_id} failed: {str(e)}")
+            with job.lock:
+                job.status = "failed"
+                job.error = str(e)
+        finally:
+            job.finish()
+            with job.lock:
+                job.finished_at = time.time()
+            limiter.release_on_behalf_of(job)
@@ -0,0 +1,162 @@
+import json
+import time
+import bisect
+import threading
+from typing import Dict, List
+from helper.timeline_table import clean_json_string, parse_clock
+
+
+class LiveReport:
+    """
+    Partial timeline report that is updated as each frame result arrives.
+
+    Frame results come in whatever order the API calls finish. Each one is
+    parsed once and inserted in capture order. Activity durations are kept as
+    running totals: a frame counts for the gap to the next frame received so
+    far, so a late frame only moves time from its predecessor to itself. Gaps
+    longer than `max_gap_seconds` (recording pauses, or not yet analyzed runs)
+    count as `frame_interval` instead. Prompts are kept sorted as they arrive,
+    and the app-actions timeline is deduplicated over the parsed window rows
+    when a snapshot is taken.
+
+    `add` is called from the pipeline's trio thread and `snapshot` / `wait` from
+    HTTP handler threads, so all state is guarded by one condition variable.
+
+    Args:
+        frame_interval (int): Seconds a frame counts for when no usable gap is known
+        max_gap_seconds (int): Longest gap attributed to the frame before it
+    """
+
+    def __init__(self, frame_interval: int = 5, max_gap_seconds: int = 300):
+        self.frame_interval = frame_interval
+        self.max_gap_seconds = max_gap_seconds
+        self.condition = threading.Condition()
+        self.version = 0
+        self.finished = False
+
+        # Parallel lists sorted by capture time
+        self.timestamps = []
+        self.times = []
+        self.activities = []
+        self.windows = []
+
+        self.durations = {}
+        self.prompts = []
+        self.errors = 0
+        self.skipped = 0
+        self.first_result_at = None
+        self._app_actions = None
+
+    def interval(self, position: int) -> int:
+        """Seconds the frame at `position` currently counts for"""
+        if position + 1 >= len(self.timestamps):
+            return self.frame_interval
+        gap = (self.timestamps[position + 1] - self.timestamps[position]) % 86400
+        return gap if 0 < gap <= self.max_gap_seconds else self.frame_interval
+
+    def add(self, result: Dict):
+        """Fold one frame result (a timeline entry) into the report"""
+        if result is None:
+            return
+        timestamp = parse_clock(result.get("time_from_start"))
+        if "error" in result:
+            with self.condition:
+                self.errors += 1
+                self.version += 1
+                self.condition.notify_all()
+            return
+
+        try:
+            analysis = result["analysis"]
+            if isinstance(analysis, str):
+                analysis = json.loads(clean_json_string(analysis))
+            activity = analysis["activity"]
+            windows = [
+                (window.get("app", ""), window.get("action", ""), window.get("prompt") or "")
+                for window in analysis["open_windows"]
+            ]
+        except Exception:
+            with self.condition:
+                self.skipped += 1
+            return
+        if timestamp < 0:
+            with self.condition:
+                self.skipped += 1
+            return
+
+        with self.condition:
+            position = bisect.bisect_right(self.timestamps, timestamp)
+            # The predecessor's interval is about to shrink to the gap to this frame
+            if position > 0:
+                previous = self.activities[position - 1]
+                self.durations[previous] -= self.interval(position - 1)
+
+            self.timestamps.insert(position, timestamp)
+            self.times.insert(position, result["time_from_start"])
+            self.activities.insert(position, activity)
+            self.windows.insert(position, windows)
+
+            if position > 0:
+                previous = self.activities[position - 1]
+                self.durations[previous] += self.interval(position - 1)
+            self.durations[activity] = self.durations.get(activity, 0) + self.interval(position)
+
+            for _, _, prompt in windows:
+                if prompt:
+                    entry = (timestamp, len(self.prompts), result["time_from_start"], prompt)
+                    bisect.insort(self.prompts, entry)
+
+            if self.first_result_at is None:
+                self.first_result_at = time.time()
+            self._app_actions = None
+            self.version += 1
+            self.condition.notify_all()
+
+    def finish(self):
+        """Mark the report complete and wake every waiting stream"""
+        with self.condition:
+            self.finished = True
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version: int, timeout: float) -> int:
+        """Block until the report moves past `version` (or `timeout`); returns the current version"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def app_actions_timeline(self) -> List[Dict]:
+        """App/action timeline with consecutive duplicates removed (cached until the next frame)"""
+        if self._app_actions is None:
+            timeline = []
+            previous = None
+            for time_str, windows in zip(self.times, self.windows):
+                for app, action, _ in windows:
+                    if previous != (app, action):
+                        timeline.append({"time": time_str, "app": app, "action": action})
+                        previous = (app, action)
+            self._app_actions = timeline
+        return self._app_actions
+
+    def snapshot(self) -> Dict:
+        """Current partial report in the shape of the final timeline analysis output"""
+        with self.condition:
+            return {
+                "version": self.version,
+                "finished": self.finished,
+                "frames": len(self.timestamps),
+                "errors": self.errors,
+                "skipped": self.skipped,
+                "first_result_at": self.first_result_at,
+                "activity_durations": {
+                    activity: seconds for activity, seconds in
+                    sorted(self.durations.items(), key=lambda item: item[1], reverse=True)
+                    if seconds > 0
+                },
+                "prompts_timeline": [
+                    {"time_from_start": time_str, "prompt": prompt}
+                    for _, _, time_str, prompt in self.prompts
+                ],
+                "app_actions_timeline": list(self.app_actions_timeline()),
+                "metadata": {"time_interval": self.frame_interval, "duration_unit": "seconds"},
+            }
@@ -0,0 +1,93 @@
+import trio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict
+
+# Default cap on the estimated bytes held by frames that are in flight
+DEFAULT_INFLIGHT_BYTES = 256 * 1024 * 1024
+
+
+def frame_memory_cost(image_size: int) -> int:
+    """
+    Estimated peak bytes held while one frame of `image_size` bytes is analyzed:
+    the raw JPEG, its base64 string (4/3 larger) and the copy of it inside the
+    serialized request body.
+    """
+    encoded = (image_size + 2) // 3 * 4
+    return image_size + 2 * encoded
+
+
+class ByteBudget:
+    """
+    Admit work against a budget of bytes held in memory rather than a task count.
+
+    `acquire(cost)` waits until `cost` fits under `max_bytes` next to everything
+    already admitted. Waiters are admitted in arrival order, so a large frame is
+    not starved by smaller ones behind it. A single item larger than the whole
+    budget is admitted once nothing else is in flight, which slows the pipeline
+    down instead of blocking it.
+
+    Args:
+        max_bytes (int): Budget for the estimated bytes in flight
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_INFLIGHT_BYTES):
+        self.max_bytes = max_bytes
+        self.in_flight = 0
+        self.peak = 0
+        self.waits = 0
+        self.waiters = deque()
+
+    def fits(self, cost: int) -> bool:
+        return self.in_flight == 0 or self.in_flight + cost <= self.max_bytes
+
+    def grant(self, cost: int):
+        self.in_flight += cost
+        self.peak = max(self.peak, self.in_flight)
+
+    async def acquire(self, cost: int):
+        # Checkpoint first: a cancellation here must not leave the bytes granted
+        await trio.lowlevel.checkpoint()
+        if not self.waiters and self.fits(cost):
+            self.grant(cost)
+            return
+
+        self.waits += 1
+        waiter = [cost, trio.Event()]
+        self.waiters.append(waiter)
+        try:
+            await waiter[1].wait()
+        except trio.Cancelled:
+            # Hand back a grant that raced with the cancellation, or leave the queue
+            if waiter[1].is_set():
+                self.release(cost)
+            else:
+                self.waiters.remove(waiter)
+                self.wake()
+            raise
+
+    def release(self, cost: int):
+        self.in_flight -= cost
+        self.wake()
+
+    def wake(self):
+        """Admit queued waiters from the front for as long as they fit"""
+        while self.waiters and self.fits(self.waiters[0][0]):
+            cost, event = self.waiters.popleft()
+            self.grant(cost)
+            event.set()
+
+    @asynccontextmanager
+    async def hold(self, cost: int):
+        await self.acquire(cost)
+        try:
+            yield
+        finally:
+            self.release(cost)
+
+    def stats(self) -> Dict:
+        return {
+            "max_bytes": self.max_bytes,
+            "peak_bytes": self.peak,
+            "waits": self.waits,
+        }
@@ -0,0 +1,149 @@
+import json
+from typing import Dict, Optional, Tuple
+from helper.telemetry import cached_prompt_tokens
+
+# USD per 1M (input, output) tokens
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+# Share of the input price billed for prompt tokens served from the prompt cache
+CACHED_INPUT_PRICE_FACTOR = 0.5
+
+# Frames in these categories usually show a typed prompt that the full model
+# should transcribe, so they are always escalated
+ESCALATE_ACTIVITIES = ("Interacting with AI Chatbot", "AI Copilot in IDE")
+
+CASCADE_INSTRUCTIONS = """
+
+Also add these two fields to the JSON object:
+confidence: <a number between 0 and 1: how sure you are that the activity category and the open windows are right>
+contains_ai_prompt: <true if any window shows a prompt typed into an AI tool (chatbot, copilot chat, AI website), otherwise false>"""
+
+
+def token_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+    """USD for one call; `cached_tokens` of the prompt tokens are billed at the cached rate"""
+    input_price, output_price = MODEL_PRICES.get(model, MODEL_PRICES["gpt-4o"])
+    input_cost = (prompt_tokens - cached_tokens) * input_price + cached_tokens * input_price * CACHED_INPUT_PRICE_FACTOR
+    return (input_cost + completion_tokens * output_price) / 1_000_000
+
+
+class ModelCascade:
+    """
+    Two-tier frame analysis: a cheap model at low detail answers first and the
+    full model is only called when the first answer is not good enough.
+
+    A tier-1 answer is accepted when it parses, reports a confidence of at least
+    `confidence_threshold`, does not flag a typed AI prompt and is not in one of
+    `escalate_activities`. Otherwise the frame is escalated. Latency, tokens and
+    cost are recorded per tier.
+
+    Args:
+        tier1_model (str): Model used for the first pass
+        tier1_detail (str): Image detail level of the first pass
+        confidence_threshold (float): Minimum tier-1 confidence to accept
+        escalate_activities (tuple): Activity categories that are always escalated
+        tier2_model (str): Full model used for escalated frames (for cost reporting)
+    """
+
+    def __init__(
+        self,
+        tier1_model: str = "gpt-4o-mini",
+        tier1_detail: str = "low",
+        confidence_threshold: float = 0.8,
+        escalate_activities: Tuple[str, ...] = ESCALATE_ACTIVITIES,
+        tier2_model: str = "gpt-4o"
+    ):
+        self.tier1_model = tier1_model
+        self.tier1_detail = tier1_detail
+        self.confidence_threshold = confidence_threshold
+        self.escalate_activities = escalate_activities
+        self.tier2_model = tier2_model
+
+        self.frames = 0
+        self.escalations = {}
+        self.tiers = {
+            tier: {"calls": 0, "seconds": 0.0, "prompt_tokens": 0, "cached_prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0}
+            for tier in (1, 2)
+        }
+
+    def signature(self) -> str:
+        """Settings that change the stored analysis, for the cache key"""
+        return f"cascade-{self.tier1_model}-{self.tier1_detail}-{self.confidence_threshold}"
+
+    def escalate(self, reason: str):
+        self.escalations[reason] = self.escalations.get(reason, 0) + 1
+
+    def tier1_failed(self):
+        """The tier-1 call itself failed; the frame goes to the full model"""
+        self.frames += 1
+        self.escalate("tier1_error")
+
+    def accept(self, content: str) -> Optional[str]:
+        """
+        Decide on a tier-1 answer.
+
+        Returns:
+            The analysis JSON (without the cascade-only fields) to keep, or None
+            if the frame has to go to the full model
+        """
+        self.frames += 1
+        try:
+            analysis = json.loads(content)
+            confidence = float(analysis.pop("confidence", 0))
+            contains_ai_prompt = analysis.pop("contains_ai_prompt", True) not in (False, "false", "False")
+            activity = analysis["activity"]
+            analysis["open_windows"]
+        except (ValueError, TypeError, KeyError, AttributeError):
+            self.escalate("unparseable")
+            return None
+
+        if contains_ai_prompt:
+            self.escalate("ai_prompt")
+            return None
+        if activity in self.escalate_activities:
+            self.escalate("activity")
+            return None
+        if confidence < self.confidence_threshold:
+            self.escalate("low_confidence")
+            return None
+        return json.dumps(analysis)
+
+    def record(self, tier: int, seconds: float, usage):
+        """Account one call of `tier` (1 or 2) with its response.usage"""
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        cached_tokens = cached_prompt_tokens(usage)
+        model = self.tier1_model if tier == 1 else self.tier2_model
+        stats = self.tiers[tier]
+        stats["calls"] += 1
+        stats["seconds"] += seconds
+        stats["prompt_tokens"] += prompt_tokens
+        stats["cached_prompt_tokens"] += cached_tokens
+        stats["completion_tokens"] += completion_tokens
+        stats["cost"] += token_cost(model, prompt_tokens, completion_tokens, cached_tokens)
+
+    def stats(self) -> Dict:
+        escalated = sum(self.escalations.values())
+        tiers = {}
+        for tier, stats in self.tiers.items():
+            calls = stats["calls"]
+            tiers[f"tier{tier}"] = {
+                "model": self.tier1_model if tier == 1 else self.tier2_model,
+                "calls": calls,
+                "avg_latency_seconds": round(stats["seconds"] / calls, 3) if calls else None,
+                "prompt_tokens": stats["prompt_tokens"],
+                "cached_prompt_tokens": stats["cached_prompt_tokens"],
+                "completion_tokens": stats["completion_tokens"],
+                "cost_usd": round(stats["cost"], 6),
+                "cost_per_call_usd": round(stats["cost"] / calls, 6) if calls else None,
+            }
+        total_cost = sum(stats["cost"] for stats in self.tiers.values())
+        return {
+            "frames": self.frames,
+            "escalated": escalated,
+            "escalation_rate": round(escalated / self.frames, 3) if self.frames else None,
+            "escalation_reasons": dict(self.escalations),
+            "cost_per_frame_usd": round(total_cost / self.frames, 6) if self.frames else None,
+            "tiers": tiers,
+        }
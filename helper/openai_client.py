@@ -0,0 +1,114 @@
+import os
+import threading
+import importlib.util
+from contextlib import asynccontextmanager
+import httpx
+import trio
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+# Keep-alive pool shared by every OpenAI call in a process; sized for the frame
+# analysis concurrency limit plus the summarization calls
+DEFAULT_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+KEEPALIVE_EXPIRY = 120.0
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package (pip install httpx[http2])"""
+    return importlib.util.find_spec("h2") is not None
+
+
+def build_http_client(max_connections: int = DEFAULT_MAX_CONNECTIONS) -> httpx.AsyncClient:
+    """httpx client with a keep-alive pool of `max_connections`, over HTTP/2 when available"""
+    return DefaultAsyncHttpxClient(
+        http2=http2_available(),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(600.0, connect=10.0)
+    )
+
+
+def get_openai_client(
+    api_key: str = None,
+    base_url: str = None,
+    max_retries: int = 2,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS
+) -> AsyncOpenAI:
+    """
+    Return the process-wide AsyncOpenAI client for this key and base URL.
+
+    Every stage (frame analysis, prompt merge, app actions summary) and every
+    submission handled by a warm process reuses the same connection pool, so
+    TLS handshakes are paid once rather than per stage. Variants with a
+    different `max_retries` are derived with `with_options` and share the pool.
+
+    Connections belong to the trio run that opened them, so clients are cached
+    per run; a new `trio.run` (e.g. the next submission in a batch worker) gets a
+    fresh pool. Runs that end should close their pool with `close_openai_clients`
+    (or `run_closing_clients`), otherwise its sockets stay open.
+
+    Args:
+        api_key (str): OpenAI API key (defaults to OPENAI_API_KEY)
+        base_url (str): Alternative API base URL
+        max_retries (int): SDK-level retries for calls made with this client
+        max_connections (int): Pool size, used when the pool is first created
+    """
+    try:
+        run = trio.lowlevel.current_trio_token()
+    except RuntimeError:
+        run = None
+
+    with _clients_lock:
+        # Forget pools that belong to a trio run that has ended
+        for key in [key for key in _clients if key[0] is not run]:
+            del _clients[key]
+
+        base_key = (run, api_key, base_url, None)
+        base_client = _clients.get(base_key)
+        if base_client is None:
+            base_client = AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=build_http_client(max_connections)
+            )
+            _clients[base_key] = base_client
+
+        key = (run, api_key, base_url, max_retries)
+        client = _clients.get(key)
+        if client is None:
+            client = base_client.with_options(max_retries=max_retries)
+            _clients[key] = client
+        return client
+
+
+async def close_openai_clients():
+    """Close the connection pools opened by the current trio run and forget its clients"""
+    run = trio.lowlevel.current_trio_token()
+    with _clients_lock:
+        keys = [key for key in _clients if key[0] is run]
+        clients = [(key, _clients.pop(key)) for key in keys]
+    # Retry variants share the base client's pool, so closing the base closes it
+    with trio.CancelScope(shield=True):
+        for key, client in clients:
+            if key[3] is None:
+                await client.close()
+
+
+@asynccontextmanager
+async def closing_openai_clients():
+    """Close this run's OpenAI connection pools when the block exits, even on errors"""
+    try:
+        yield
+    finally:
+        await close_openai_clients()
+
+
+async def run_closing_clients(async_fn, *args):
+    """`await async_fn(*args)`, then close the OpenAI clients it opened; pass to trio.run"""
+    async with closing_openai_clients():
+        return await async_fn(*args)
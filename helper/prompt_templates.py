@@ -0,0 +1,100 @@
+import math
+from typing import Dict, List, Tuple
+
+# Frame analysis instructions by version. The version is part of the analysis
+# cache key, so add a new entry instead of editing an existing one, and only
+# point PROMPT_VERSION at it once benchmarks/prompt_parity.py shows it agrees
+# with the current version on real recordings.
+FRAME_PROMPTS = {
+    # Original wording
+    "1": """Create an array of json object
+
+activity: <First, only look at the active window or active tab i.e. where the user's cursor or keyboard typing is active. which one of the following best describes the work user is doing on the active window. Pick any one of the following "Coding", "AI Copilot in IDE" (double check user must be in a code editor (native application), and not on any website that looks like code editor), "Reading Documentation" (must be an official documentation, make a guess based on url if url or page header looks like one for an official documentation), "Reading Web articles/documents" (for articles, blogs, PDFs or report on other webpages), "Reading Stackoverflow", "Watching video tutorial", "Interacting with AI Chatbot" (Select this if user is on an AI website like chatgpt, bolt.new, lovable.dev, claude, gemini, perplexity), "Testing" (select if user is running their code in command line or opening a website created by them for example on localhost, mstunnels, ngrok), "Creating Document" (word, excel, powerpoint), "Reading code in GitHub", "Google Search", "Other". You can pick only one category from double quotes, and do not make a category of your own.>
+open_windows: [
+{
+app: <Find out which app or web app the user is using>,
+action: <What is the user doing on  this app, answer based on what you see the contents of the app, include as many details as you can in 1 line>,
+prompt: <copy paste what user is asking the AI/Search engine to do. Only populate this field if you can see what the user has typed into a text box (and its not a textbox hint like "How can bolt help you today?" or "Edit code (Ctrl+I), @ to mention"). You should be 100% confident that for AI copilots in code editors,  Whatever you are copy pasting here must have been typed into a text box by a human (You know if it was written by human if it starts with small characters, improper grammar or punctuation use).>,
+},
+{...},
+{...}
+]
+
+If the user has multiple windows open with split screen, you can return one object for each window you see. If there's one primary window and others are in background you can skip returning details about the windows in background. Only return multiple when user is using split screen. Ignore the user webcam image overlays if any present.""",
+
+    # Same rules, compact wording and an explicit output shape
+    "2": """Describe the screenshot as a JSON object: {"activity": ..., "open_windows": [{"app": ..., "action": ..., "prompt": ...}]}
+
+activity: the work in the active window (where the cursor or typing is). Exactly one of:
+"Coding"
+"AI Copilot in IDE" (only in a native code editor, not a website that looks like one)
+"Reading Documentation" (official documentation, judged by the URL or page header)
+"Reading Web articles/documents" (articles, blogs, PDFs or reports on other pages)
+"Reading Stackoverflow"
+"Watching video tutorial"
+"Interacting with AI Chatbot" (AI websites such as chatgpt, bolt.new, lovable.dev, claude, gemini, perplexity)
+"Testing" (running their code in a terminal, or opening their own site on localhost, mstunnels, ngrok)
+"Creating Document" (word, excel, powerpoint)
+"Reading code in GitHub"
+"Google Search"
+"Other"
+Never invent a category.
+
+open_windows: one object for the primary window, one per window only when the screen is split; skip background windows.
+app: the app or web app in use.
+action: what the user is doing in it, with as much detail as fits in one line.
+prompt: the exact text the user typed into an AI or search text box, else "". Never copy placeholder hints such as "How can bolt help you today?" or "Edit code (Ctrl+I), @ to mention". For AI copilots in code editors, only include text you are certain a human typed (lowercase start, loose grammar or punctuation).
+
+Ignore webcam overlays.""",
+}
+PROMPT_VERSION = "1"
+
+# OpenAI only caches prompt prefixes of at least this many tokens
+MIN_CACHED_PREFIX_TOKENS = 1024
+# Characters per token used when tiktoken is not installed
+CHARS_PER_TOKEN = 4
+
+
+def frame_prompt(version: str = PROMPT_VERSION) -> str:
+    """Frame analysis instructions of a template version"""
+    if version not in FRAME_PROMPTS:
+        raise ValueError(f"Unknown prompt version {version!r}; use one of {', '.join(FRAME_PROMPTS)}")
+    return FRAME_PROMPTS[version]
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> Tuple[int, bool]:
+    """
+    Tokens in `text` for `model`.
+
+    Returns:
+        (tokens, exact): exact is False when tiktoken is not installed and the
+        count is estimated from the length
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return math.ceil(len(text) / CHARS_PER_TOKEN), False
+    return len(tiktoken.encoding_for_model(model).encode(text)), True
+
+
+def token_report(model: str = "gpt-4o", input_price: float = 2.50) -> List[Dict]:
+    """
+    Size and cost of every frame prompt version.
+
+    Args:
+        model (str): Model whose tokenizer is used
+        input_price (float): USD per 1M input tokens
+    """
+    rows = []
+    for version, text in FRAME_PROMPTS.items():
+        tokens, exact = count_tokens(text, model)
+        rows.append({
+            "version": version,
+            "current": version == PROMPT_VERSION,
+            "chars": len(text),
+            "tokens": tokens,
+            "exact": exact,
+            "usd_per_1000_frames": round(tokens * input_price / 1000, 4),
+            "cacheable": tokens >= MIN_CACHED_PREFIX_TOKENS,
+        })
+    return rows
@@ -0,0 +1,302 @@
+import os
+import re
+import time
+import random
+import multiprocessing
+import trio
+from typing import Awaitable, Callable, Dict
+from openai import RateLimitError, APIConnectionError, InternalServerError
+from helper.telemetry import record_openai_call, record_openai_retry, cached_prompt_tokens
+
+
+def parse_reset_duration(value: str) -> float:
+    """Parse an x-ratelimit-reset-* header such as "20ms", "1s" or "6m0s" into seconds"""
+    if not value:
+        return 0.0
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    seconds = 0.0
+    for amount, unit in re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value):
+        seconds += float(amount) * units[unit]
+    return seconds
+
+
+def process_alive(pid: int) -> bool:
+    """False once `pid` has exited (including an exited child not yet reaped)"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except (OSError, IndexError):
+        return True
+
+
+class SharedSlots:
+    """
+    Cross-process cap on in-flight calls that survives dead worker processes.
+
+    Each slot records the pid of the process holding it. A worker that is killed
+    while holding slots never releases them, so when no slot is free, slots of
+    processes that are no longer alive are reclaimed. `acquire` never blocks;
+    callers poll it.
+
+    Args:
+        slots (int): Maximum calls in flight across all processes
+        context: multiprocessing context the worker processes are started with
+    """
+
+    def __init__(self, slots: int, context=multiprocessing):
+        self.owners = context.Array("i", slots)
+
+    def acquire(self) -> bool:
+        with self.owners.get_lock():
+            for index, owner in enumerate(self.owners):
+                if owner == 0:
+                    self.owners[index] = os.getpid()
+                    return True
+            for index, owner in enumerate(self.owners):
+                if not process_alive(owner):
+                    print(f"Reclaiming an API slot held by exited process {owner}")
+                    self.owners[index] = os.getpid()
+                    return True
+        return False
+
+    def release(self):
+        pid = os.getpid()
+        with self.owners.get_lock():
+            for index, owner in enumerate(self.owners):
+                if owner == pid:
+                    self.owners[index] = 0
+                    return
+
+    def in_use(self) -> int:
+        with self.owners.get_lock():
+            return sum(1 for owner in self.owners if owner)
+
+
+# Optional cross-process cap on in-flight calls (a SharedSlots installed by the
+# batch runner in every worker process)
+_shared_slots = None
+
+
+def set_shared_slots(slots: SharedSlots):
+    """Make every limiter in this process also hold one of `slots` per in-flight call"""
+    global _shared_slots
+    _shared_slots = slots
+
+
+def is_transient_error(error: Exception) -> bool:
+    """429s, timeouts, connection drops and 5xx responses are worth retrying"""
+    return isinstance(error, (RateLimitError, APIConnectionError, InternalServerError))
+
+
+class AdaptiveRateLimiter:
+    """
+    Shared limiter for OpenAI calls across all concurrent frame tasks.
+
+    Requests are admitted against three limits: a concurrency window, a
+    requests-per-minute bucket and a tokens-per-minute bucket. The buckets are
+    corrected from the `x-ratelimit-*` headers of every response. The window
+    grows additively on success and halves on a 429 (AIMD). Transient failures
+    are retried with jittered exponential backoff, honouring `retry-after`.
+
+    Args:
+        max_concurrency (int): Upper bound on in-flight requests
+        requests_per_minute (int): Request budget per minute
+        tokens_per_minute (int): Token budget per minute
+        max_retries (int): Retries per call for transient failures
+        base_delay (float): First backoff delay in seconds
+        max_delay (float): Cap on a single backoff delay in seconds
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        requests_per_minute: int = 5000,
+        tokens_per_minute: int = 800000,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0
+    ):
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max_concurrency)
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.request_budget = float(requests_per_minute)
+        self.token_budget = float(tokens_per_minute)
+        self.last_refill = time.monotonic()
+        self.paused_until = 0.0
+        self.in_flight = 0
+        self.slot_released = trio.Event()
+
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def refill(self):
+        now = time.monotonic()
+        elapsed = now - self.last_refill
+        self.last_refill = now
+        self.request_budget = min(
+            self.requests_per_minute, self.request_budget + elapsed * self.requests_per_minute / 60
+        )
+        self.token_budget = min(
+            self.tokens_per_minute, self.token_budget + elapsed * self.tokens_per_minute / 60
+        )
+
+    def wait_time(self, estimated_tokens: int) -> float:
+        """Seconds until the budgets allow a request of `estimated_tokens`"""
+        self.refill()
+        waits = [self.paused_until - time.monotonic()]
+        if self.request_budget < 1:
+            waits.append((1 - self.request_budget) * 60 / self.requests_per_minute)
+        tokens = min(estimated_tokens, self.tokens_per_minute)
+        if self.token_budget < tokens:
+            waits.append((tokens - self.token_budget) * 60 / self.tokens_per_minute)
+        return max(0.0, *waits)
+
+    async def acquire(self, estimated_tokens: int):
+        while True:
+            if self.in_flight >= max(1, int(self.concurrency)):
+                await self.slot_released.wait()
+                continue
+            wait = self.wait_time(estimated_tokens)
+            if wait > 0:
+                await trio.sleep(wait)
+                continue
+            # Poll rather than block a thread, so a cancelled wait holds no slot
+            if _shared_slots is not None and not _shared_slots.acquire():
+                await trio.sleep(0.05)
+                continue
+            break
+
+        self.in_flight += 1
+        self.request_budget -= 1
+        self.token_budget -= estimated_tokens
+
+    def release(self):
+        self.in_flight -= 1
+        if _shared_slots is not None:
+            _shared_slots.release()
+        self.slot_released.set()
+        self.slot_released = trio.Event()
+
+    def update_from_headers(self, headers):
+        """Trust the server's view of the remaining budget over our own estimate"""
+        if headers is None:
+            return
+        remaining_requests = headers.get("x-ratelimit-remaining-requests")
+        remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+        if remaining_requests is not None:
+            self.request_budget = min(self.request_budget, float(remaining_requests))
+            if float(remaining_requests) < 1:
+                self.pause(parse_reset_duration(headers.get("x-ratelimit-reset-requests")))
+        if remaining_tokens is not None:
+            self.token_budget = min(self.token_budget, float(remaining_tokens))
+            if float(remaining_tokens) < 1:
+                self.pause(parse_reset_duration(headers.get("x-ratelimit-reset-tokens")))
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def on_success(self):
+        # Additive increase: roughly +1 slot per window's worth of successes
+        self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+
+    def on_throttle(self):
+        # Multiplicative decrease
+        self.throttled += 1
+        self.concurrency = max(1.0, self.concurrency / 2)
+
+    def backoff_delay(self, attempt: int, error: Exception) -> float:
+        """Full-jitter exponential backoff, stretched to any retry-after the server sent"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        retry_after = headers.get("retry-after-ms")
+        if retry_after is not None:
+            delay = max(delay, float(retry_after) / 1000)
+        elif headers.get("retry-after") is not None:
+            try:
+                delay = max(delay, float(headers.get("retry-after")))
+            except ValueError:
+                pass
+        return min(delay, self.max_delay)
+
+    async def call(self, request: Callable[[], Awaitable], estimated_tokens: int = 1000):
+        """
+        Run `request` under the limiter and return the parsed response.
+
+        `request` must return a raw response, e.g. from
+        `client.chat.completions.with_raw_response.create`, so the rate limit
+        headers can be read. Non-transient errors and the last transient error
+        are raised to the caller.
+        """
+        for attempt in range(self.max_retries + 1):
+            queued_at = time.monotonic()
+            await self.acquire(estimated_tokens)
+            sent_at = time.monotonic()
+            # The slot is released however the request ends, including trio.Cancelled
+            error = None
+            try:
+                raw_response = await request()
+            except Exception as e:
+                error = e
+            finally:
+                self.release()
+
+            if error is not None:
+                if not is_transient_error(error) or attempt == self.max_retries:
+                    self.failures += 1
+                    raise error
+                if isinstance(error, RateLimitError):
+                    self.on_throttle()
+                delay = self.backoff_delay(attempt, error)
+                self.pause(delay if isinstance(error, RateLimitError) else 0)
+                self.retries += 1
+                record_openai_retry(error)
+                print(f"Retrying after {type(error).__name__} in {delay:.2f} seconds (attempt {attempt + 1})")
+                await trio.sleep(delay)
+                continue
+
+            api_seconds = time.monotonic() - sent_at
+            self.calls += 1
+            self.update_from_headers(raw_response.headers)
+            response = raw_response.parse()
+
+            # Charge the budget with what the call actually used
+            usage = getattr(response, "usage", None)
+            if usage is not None and getattr(usage, "total_tokens", None) is not None:
+                self.token_budget -= usage.total_tokens - estimated_tokens
+                self.prompt_tokens += usage.prompt_tokens or 0
+                self.cached_prompt_tokens += cached_prompt_tokens(usage)
+                self.completion_tokens += usage.completion_tokens or 0
+            record_openai_call(getattr(response, "model", "unknown"), usage, sent_at - queued_at, api_seconds)
+
+            self.on_success()
+            return response
+
+    def stats(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "failures": self.failures,
+            "concurrency": round(self.concurrency, 2),
+            "prompt_tokens": self.prompt_tokens,
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+            "cached_prompt_share": round(self.cached_prompt_tokens / self.prompt_tokens, 3) if self.prompt_tokens else None,
+            "completion_tokens": self.completion_tokens,
+        }
@@ -0,0 +1,46 @@
+import os
+import threading
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_s3_client(max_pool_connections: int = 32):
+    """
+    Return a process-wide S3 client, created on first use.
+
+    boto3 clients are thread-safe, so one client (and its connection pool) is
+    shared by every download and upload worker instead of building a new client
+    per call. Clients are keyed by pool size so a caller that needs more
+    connections gets a pool large enough for its workers.
+
+    Credentials and region come from the standard AWS environment variables.
+    Set S3_ENDPOINT_URL to point at a local S3 stand-in (MinIO, moto server).
+
+    Args:
+        max_pool_connections (int): Size of the urllib3 connection pool
+    """
+    # boto3 takes a noticeable share of cold-start time; import it on first use
+    import boto3
+    from botocore.config import Config
+
+    endpoint_url = os.getenv("S3_ENDPOINT_URL") or None
+    with _clients_lock:
+        client = _clients.get(max_pool_connections)
+        if client is None:
+            client = boto3.client(
+                's3',
+                aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+                aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+                region_name=os.getenv("AWS_REGION"),
+                endpoint_url=endpoint_url,
+                config=Config(
+                    max_pool_connections=max_pool_connections,
+                    retries={"max_attempts": 5, "mode": "adaptive"},
+                    # Local stand-ins serve buckets by path, not by subdomain
+                    s3={"addressing_style": "path"} if endpoint_url else None
+                )
+            )
+            _clients[max_pool_connections] = client
+        return client
@@ -0,0 +1,118 @@
+import time
+import inspect
+import trio
+from typing import Callable, Dict, List, Optional
+from helper.telemetry import span
+
+
+class StageGraph:
+    """
+    Small dependency-graph executor for pipeline stages.
+
+    Each stage is a function whose positional arguments are the outputs of the
+    stages (or initial values) named in `inputs`, and whose return value becomes
+    its own output under `name`. A stage starts as soon as all of its inputs are
+    ready, so independent stages run concurrently. Async stages run on the trio
+    loop; plain functions run inline. If a stage fails, the stages that depend on
+    it are skipped, the others keep running, and the first error is raised once
+    the graph settles.
+
+    Args:
+        name (str): Label used in log lines
+    """
+
+    def __init__(self, name: str = "pipeline"):
+        self.name = name
+        self.stages = {}
+        self.order = []
+        self.timings = {}
+        self.status = {}
+
+    def add(self, name: str, func: Callable, inputs: Optional[List[str]] = None):
+        """Declare stage `name` computing func(*inputs)"""
+        if name in self.stages:
+            raise ValueError(f"Stage already declared: {name}")
+        self.stages[name] = (func, list(inputs or []))
+        self.order.append(name)
+
+    def validate(self, initial: Dict):
+        for name, (_, inputs) in self.stages.items():
+            for dependency in inputs:
+                if dependency not in self.stages and dependency not in initial:
+                    raise ValueError(f"Stage {name} depends on unknown input: {dependency}")
+
+        # Depth-first search for cycles
+        visiting, done = set(), set()
+
+        def visit(name):
+            if name in done or name not in self.stages:
+                return
+            if name in visiting:
+                raise ValueError(f"Cycle in stage graph at: {name}")
+            visiting.add(name)
+            for dependency in self.stages[name][1]:
+                visit(dependency)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.order:
+            visit(name)
+
+    async def run(self, initial: Optional[Dict] = None) -> Dict:
+        """
+        Run every stage and return all outputs (initial values included).
+
+        Args:
+            initial (dict): Values available to stages before anything runs
+        """
+        initial = dict(initial or {})
+        self.validate(initial)
+
+        outputs = dict(initial)
+        finished = {name: trio.Event() for name in self.stages}
+        errors = []
+        graph_start = time.time()
+
+        async def run_stage(name):
+            func, inputs = self.stages[name]
+            for dependency in inputs:
+                if dependency in finished:
+                    await finished[dependency].wait()
+
+            try:
+                if any(self.status.get(dependency) in ("failed", "skipped") for dependency in inputs):
+                    self.status[name] = "skipped"
+                    print(f"[{self.name}] Skipping stage {name}: an input failed")
+                    return
+
+                start_time = time.time()
+                self.status[name] = "running"
+                try:
+                    with span(f"stage:{name}", graph=self.name):
+                        result = func(*(outputs[dependency] for dependency in inputs))
+                        if inspect.isawaitable(result):
+                            result = await result
+                except Exception as e:
+                    self.status[name] = "failed"
+                    errors.append(e)
+                    print(f"[{self.name}] Stage {name} failed: {str(e)}")
+                    return
+                finally:
+                    self.timings[name] = round(time.time() - start_time, 3)
+
+                outputs[name] = result
+                self.status[name] = "done"
+            finally:
+                finished[name].set()
+
+        async with trio.open_nursery() as nursery:
+            for name in self.order:
+                nursery.start_soon(run_stage, name)
+
+        total = round(time.time() - graph_start, 3)
+        print(f"[{self.name}] Stage timings (seconds): {self.timings}, total {total}")
+        self.timings["total"] = total
+
+        if errors:
+            raise errors[0]
+        return outputs
@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+class Metrics:
+    """
+    Process-wide counters and latency histograms, rendered in the Prometheus
+    text exposition format. Safe to update from any thread.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    @staticmethod
+    def key(name: str, labels: Dict) -> tuple:
+        return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self.key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = self.key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {"buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    histogram["buckets"][index] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    def render(self) -> str:
+        def format_labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{label}="{value}"' for label, value in pairs) + "}"
+
+        lines = []
+        with self.lock:
+            typed = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} counter")
+                    typed.add(name)
+                lines.append(f"{name}{format_labels(labels)} {value}")
+
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} histogram")
+                    typed.add(name)
+                for bound, count in zip(LATENCY_BUCKETS, histogram["buckets"]):
+                    lines.append(f"{name}_bucket{format_labels(labels, [('le', bound)])} {count}")
+                lines.append(f"{name}_bucket{format_labels(labels, [('le', '+Inf')])} {histogram['count']}")
+                lines.append(f"{name}_sum{format_labels(labels)} {round(histogram['sum'], 6)}")
+                lines.append(f"{name}_count{format_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+class Trace:
+    """
+    Spans and totals for one submission's pipeline run.
+
+    Spans are (name, start, duration, attributes); totals accumulate token
+    usage per model, retries, queue/API time and bytes transferred.
+
+    Args:
+        submission_id (str): Submission the trace belongs to
+    """
+
+    def __init__(self, submission_id: str):
+        self.submission_id = submission_id
+        self.started_at = time.time()
+        self.lock = threading.Lock()
+        self.spans = []
+        self.tokens = {}
+        self.totals = {
+            "openai_calls": 0,
+            "retries": 0,
+            "queue_wait_seconds": 0.0,
+            "api_seconds": 0.0,
+            "bytes_downloaded": 0,
+            "bytes_uploaded": 0,
+        }
+
+    def add_span(self, name: str, start: float, duration: float, attributes: Dict):
+        with self.lock:
+            self.spans.append({
+                "name": name,
+                "start": round(start - self.started_at, 4),
+                "duration": round(duration, 4),
+                **attributes,
+            })
+
+    def add(self, total: str, value: float):
+        with self.lock:
+            self.totals[total] += value
+
+    def add_tokens(self, model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0):
+        with self.lock:
+            usage = self.tokens.setdefault(model, {
+                "prompt_tokens": 0, "cached_prompt_tokens": 0, "completion_tokens": 0, "calls": 0, "cached_calls": 0
+            })
+            usage["prompt_tokens"] += prompt_tokens
+            usage["cached_prompt_tokens"] += cached_tokens
+            usage["completion_tokens"] += completion_tokens
+            usage["calls"] += 1
+            usage["cached_calls"] += 1 if cached_tokens else 0
+
+    def span_summary(self) -> Dict:
+        """Count and total/max duration per span name"""
+        summary = {}
+        with self.lock:
+            for span_record in self.spans:
+                entry = summary.setdefault(span_record["name"], {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+                entry["count"] += 1
+                entry["total_seconds"] = round(entry["total_seconds"] + span_record["duration"], 4)
+                entry["max_seconds"] = max(entry["max_seconds"], span_record["duration"])
+        return summary
+
+    def to_dict(self) -> Dict:
+        with self.lock:
+            totals = dict(self.totals)
+            totals["queue_wait_seconds"] = round(totals["queue_wait_seconds"], 3)
+            totals["api_seconds"] = round(totals["api_seconds"], 3)
+            data = {
+                "submission_id": self.submission_id,
+                "wall_clock_seconds": round(time.time() - self.started_at, 3),
+                "tokens": {model: dict(usage) for model, usage in self.tokens.items()},
+                "totals": totals,
+            }
+            spans = list(self.spans)
+        data["span_summary"] = self.span_summary()
+        data["spans"] = spans
+        return data
+
+    def save(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        print(f"Trace saved to {path}")
+
+
+# The trace of the submission the current trio task (and its children) works on
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+def start_trace(submission_id: str) -> Trace:
+    """Begin a trace for this task and the tasks/threads it starts"""
+    trace = Trace(submission_id)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time a block as a span of the current trace and in the `pipeline_span_seconds`
+    histogram. Extra attributes can be added to the yielded dict.
+    """
+    start = time.time()
+    try:
+        yield attributes
+    except BaseException as e:
+        attributes["error"] = type(e).__name__
+        raise
+    finally:
+        duration = time.time() - start
+        METRICS.observe("pipeline_span_seconds", duration, span=name)
+        trace = current_trace()
+        if trace is not None:
+            trace.add_span(name, start, duration, attributes)
+
+
+def cached_prompt_tokens(usage) -> int:
+    """Prompt tokens served from the provider's prompt cache (`usage.prompt_tokens_details.cached_tokens`)"""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", 0) or 0
+
+
+def record_openai_call(model: str, usage, queue_wait: float, api_seconds: float):
+    """Account one successful OpenAI response: tokens from `response.usage` and timings"""
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    cached_tokens = cached_prompt_tokens(usage)
+    METRICS.inc("openai_requests_total", model=model)
+    METRICS.inc("openai_tokens_total", prompt_tokens, model=model, kind="prompt")
+    # The part of the prompt tokens served from the provider's prompt cache
+    METRICS.inc("openai_tokens_total", cached_tokens, model=model, kind="cached_prompt")
+    METRICS.inc("openai_tokens_total", completion_tokens, model=model, kind="completion")
+    METRICS.observe("openai_queue_wait_seconds", queue_wait)
+    # Split by prompt cache hit, to compare latency with and without a cached prefix
+    METRICS.observe("openai_api_seconds", api_seconds, model=model, prompt_cache="hit" if cached_tokens else "miss")
+
+    trace = current_trace()
+    if trace is not None:
+        trace.add_tokens(model, prompt_tokens, completion_tokens, cached_tokens)
+        trace.add("openai_calls", 1)
+        trace.add("queue_wait_seconds", queue_wait)
+        trace.add("api_seconds", api_seconds)
+
+
+def record_openai_retry(error: Exception):
+    METRICS.inc("openai_retries_total", reason=type(error).__name__)
+    trace = current_trace()
+    if trace is not None:
+        trace.add("retries", 1)
+
+
+def record_bytes(direction: str, count: int):
+    """direction is "download" or "upload" (S3)"""
+    METRICS.inc("s3_bytes_total", count, direction=direction)
+    trace = current_trace()
+    if trace is not None:
+        trace.add("bytes_downloaded" if direction == "download" else "bytes_uploaded", count)
+
@@ -1,77 +1,38 @@
 import os
 import json
-from collections import Counter
-import asyncio
+import time
+import trio
 from openai import AsyncOpenAI
+from helper.openai_client import get_openai_client
 
 
 from helper.upload_to_S3 import main as upload_to_S3_main  # Import the function from upload.py
+from helper.timeline_table import build_frame_table, parse_clock
+from helper.artifact_format import find_artifact, read_timeline
+from helper.workspace import LOCAL_WORKSPACE
+from helper.stage_graph import StageGraph
+from helper.telemetry import span, record_openai_call
 
 
-def clean_json_string(json_str):
-    # Remove the ```json prefix and ``` suffix if present
-    if json_str.startswith("```json\n"):
-        json_str = json_str[8:]
-    if (json_str.endswith("\n```")):
-        json_str = json_str[:-4]
-    return json_str
-
-
-def analyze_timeline_file(file_path):
-    # Read the JSON file
-    with open(file_path, 'r') as file:
-        data = json.load(file)
-        timeline_data = data.get("timeline", [])  # Get timeline as list, empty list if not found
-
-    # Calculate time interval from first two entries
-    time_interval = 5  # default fallback value
-    if len(timeline_data) >= 2:
-        try:
-            time1 = int(timeline_data[0]["time_from_start"][-2:])
-            time2 = int(timeline_data[1]["time_from_start"][-2:])
-            time_interval = time2 - time1
-            print(f"Detected time interval between entries: {time_interval} seconds")
-        except (KeyError, TypeError) as e:
-            print(f"Warning: Could not calculate time interval, using default - {str(e)}")
-
-    # Initialize counters and lists
-    activities = []
-    prompts_with_time = []
-
-    # Process each timeline entry
-    for entry in timeline_data:
-        try:
-            # Clean and parse the analysis JSON string
-            analysis_str = clean_json_string(entry["analysis"])
-            analysis = json.loads(analysis_str)
-
-            # Extract activity for counting
-            activity = analysis["activity"]
-            activities.append(activity)
-
-            # Extract prompts with timestamps
-            time_from_start = entry["time_from_start"]
-            windows = analysis["open_windows"]
-
-            for window in windows:
-                if "prompt" in window and window["prompt"]:  # Only include non-empty prompts
-                    prompts_with_time.append({
-                        "time_from_start": time_from_start,
-                        "prompt": window["prompt"]
-                    })
-        except Exception as e:
-            print(f"Warning: Error processing entry - {str(e)}")
-            continue
-
-    # Count activities and multiply by dynamic time interval
-    activity_durations = {
-        activity: count * time_interval for activity, count in Counter(activities).items()
-    }
+def analyze_timeline_file(file_path, workspace=None):
+    # Read the analysis file; JSON or compressed JSON Lines, detected from its contents
+    data = read_timeline(file_path, workspace)
+    timeline_data = data.get("timeline", [])  # Get timeline as list, empty list if not found
+
+    # Parse every entry once into columns; everything below is derived from the table
+    table = build_frame_table(timeline_data)
+
+    # Each frame counts for the gap to the next frame's timestamp
+    intervals, time_interval = table.intervals()
+    print(f"Detected time interval between entries: {time_interval} seconds")
+
+    activity_durations = table.activity_durations(intervals)
 
     # Create final output
     output = {
         "activity_durations": activity_durations,
-        "prompts_timeline": prompts_with_time,
+        "prompts_timeline": table.prompts_timeline(),
+        "app_actions_timeline": table.app_actions_timeline(),
         "metadata": {
             "total_screenshots": data.get("total_screenshots"),
             "processing_time": data.get("processing_time"),
@@ -83,7 +44,7 @@ def analyze_timeline_file(file_path):
     return output
 
 
-def save_prompts_timeline(file_path, output):
+def save_prompts_timeline(file_path, output, workspace=None):
     """Save prompts timeline to a separate file with _prompts suffix"""
     # Get the file name without extension
     base_name = file_path.rsplit('.', 1)[0]
@@ -96,13 +57,13 @@ def save_prompts_timeline(file_path, output):
     }
     
     # Save to file
-    with open(prompts_file, 'w') as f:
+    with (workspace or LOCAL_WORKSPACE).open(prompts_file, 'w') as f:
         json.dump(prompts_data, f, indent=2)
     
     print(f"Prompts timeline saved to {prompts_file}")
 
 
-def save_activity_durations(file_path, output, assignment_id, user_id, submission_id):
+def save_activity_durations(file_path, output, assignment_id, user_id, submission_id, indent=2, workspace=None):
     """Save activity durations to a separate file with _activities suffix"""
     # Print raw data in seconds
     print("\nRaw activity durations (in seconds):")
@@ -132,22 +93,23 @@ def save_activity_durations(file_path, output, assignment_id, user_id, submissio
     if other_duration > 0:
         top_activities["Other"] = round(other_duration, 2)
     
+    # Copy the metadata: the other stages share `output` and may be running concurrently
     activity_data = {
         "activity_durations": top_activities,
-        "metadata": output["metadata"]
+        "metadata": dict(output["metadata"])
     }
     
     # Add unit information to metadata
     activity_data["metadata"]["duration_unit"] = "minutes"
     
     # Save to file
-    with open(activities_file, 'w') as f:
-        json.dump(activity_data, f, indent=2)
+    with (workspace or LOCAL_WORKSPACE).open(activities_file, 'w') as f:
+        json.dump(activity_data, f, indent=indent)
     
     print(f"Activity durations saved to {activities_file}")
 
 
-def save_raw_prompts(file_path, output, assignment_id, user_id, submission_id):
+def save_raw_prompts(file_path, output, assignment_id, user_id, submission_id, indent=2, workspace=None):
     """Save raw prompts timeline without any processing"""
     base_name = file_path.rsplit('.', 1)[0]
     raw_prompts_file = f"timeline_analysis/{submission_id}/{assignment_id}_{user_id}_raw_prompts.json"
@@ -159,50 +121,18 @@ def save_raw_prompts(file_path, output, assignment_id, user_id, submission_id):
     }
     
     # Save to file
-    with open(raw_prompts_file, 'w') as f:
-        json.dump(raw_prompts_data, f, indent=2)
+    with (workspace or LOCAL_WORKSPACE).open(raw_prompts_file, 'w') as f:
+        json.dump(raw_prompts_data, f, indent=indent)
     
     print(f"Raw prompts timeline saved to {raw_prompts_file}")
 
 
-def save_app_actions(file_path, output, assignment_id, user_id, submission_id):
+def save_app_actions(file_path, output, assignment_id, user_id, submission_id, indent=2, workspace=None):
     """Save app and action timeline without consecutive duplicates"""
     base_name = file_path.rsplit('.', 1)[0]
     app_actions_file = f"timeline_analysis/{submission_id}/{assignment_id}_{user_id}_app_actions.json"
     
-    app_actions_timeline = []
-    previous_entry = None
-    
-    # Read the original timeline data again
-    with open(file_path, 'r') as file:
-        data = json.load(file)
-        timeline_data = data.get("timeline", [])
-    
-    # Process through the timeline data
-    for entry in timeline_data:
-        try:
-            time = entry["time_from_start"]
-            analysis_str = clean_json_string(entry["analysis"])
-            analysis = json.loads(analysis_str)
-            windows = analysis["open_windows"]
-            
-            for window in windows:
-                current_entry = {
-                    "time": time,
-                    "app": window.get("app", ""),
-                    "action": window.get("action", "")
-                }
-                
-                # Only add if different from previous entry
-                if previous_entry is None or (
-                    previous_entry["app"] != current_entry["app"] or 
-                    previous_entry["action"] != current_entry["action"]
-                ):
-                    app_actions_timeline.append(current_entry)
-                    previous_entry = current_entry
-        except Exception as e:
-            print(f"Warning: Error processing entry for app actions - {str(e)}")
-            continue
+    app_actions_timeline = output["app_actions_timeline"]
     
     # Prepare output data
     app_actions_data = {
@@ -211,18 +141,31 @@ def save_app_actions(file_path, output, assignment_id, user_id, submission_id):
     }
     
     # Save to file
-    with open(app_actions_file, 'w') as f:
-        json.dump(app_actions_data, f, indent=2)
+    with (workspace or LOCAL_WORKSPACE).open(app_actions_file, 'w') as f:
+        json.dump(app_actions_data, f, indent=indent)
     
     print(f"App actions timeline saved to {app_actions_file}")
+    return app_actions_data
+
 
+async def create_completion(client: AsyncOpenAI, span_name: str, **kwargs):
+    """chat.completions.create traced as a span, with its token usage accounted"""
+    with span(span_name, model=kwargs.get("model")):
+        start_time = time.time()
+        response = await client.chat.completions.create(**kwargs)
+        record_openai_call(kwargs.get("model"), getattr(response, "usage", None), 0.0, time.time() - start_time)
+    return response
 
-async def merge_prompts_with_gpt4(prompts_data: dict, api_key: str) -> dict:
+
+async def merge_prompts_with_gpt4(prompts_data: dict, api_key: str, client: AsyncOpenAI = None) -> dict:
     """Merge similar prompts using GPT-4V API"""
-    client = AsyncOpenAI(api_key=api_key)
+    if client is None:
+        client = get_openai_client(api_key)
     
     try:
-        response = await client.chat.completions.create(
+        response = await create_completion(
+            client,
+            "merge_prompts",
             model="gpt-4o",
             response_format={"type": "json_object"},
             messages=[
@@ -250,12 +193,15 @@ async def merge_prompts_with_gpt4(prompts_data: dict, api_key: str) -> dict:
         return prompts_data
 
 
-async def analyze_app_actions_with_o1(app_actions_data: dict, api_key: str) -> dict:
+async def analyze_app_actions_with_o1(app_actions_data: dict, api_key: str, client: AsyncOpenAI = None) -> dict:
     """Analyze app actions timeline using GPT-4 to merge similar activities"""
-    client = AsyncOpenAI(api_key=api_key)
+    if client is None:
+        client = get_openai_client(api_key)
     
     try:
-        response = await client.chat.completions.create(
+        response = await create_completion(
+            client,
+            "summarize_app_actions",
             model="o1-preview",
             messages=[
                 {
@@ -285,61 +231,299 @@ Input:
         return app_actions_data
 
 
-async def main(submission_id, assignment_id, user_id):
+def split_into_windows(entries: list, time_key: str, window_seconds: int, overlap_seconds: int) -> list:
+    """
+    Split a time-ordered timeline into consecutive time windows
+
+    Each window starts with the entries from the last `overlap_seconds` of the
+    previous window, so text or activities cut by a boundary are seen whole by
+    at least one window. Entries without a parseable time stay in the current
+    window.
+
+    Returns:
+        List of {"start": seconds, "entries": [...]} windows
+    """
+    windows = []
+    for entry in entries:
+        seconds = parse_clock(entry.get(time_key))
+        if not windows or (seconds >= 0 and seconds >= windows[-1]["start"] + window_seconds):
+            start = seconds if seconds >= 0 else (windows[-1]["start"] + window_seconds if windows else 0)
+            overlap = []
+            if windows:
+                overlap = [
+                    previous for previous in windows[-1]["entries"]
+                    if 0 <= start - parse_clock(previous.get(time_key)) <= overlap_seconds
+                ]
+            windows.append({"start": start, "entries": overlap})
+        windows[-1]["entries"].append(entry)
+    return windows
+
+
+async def map_windows(windows: list, summarize, max_concurrent: int) -> list:
+    """Run `summarize(window)` for every window concurrently, returning results in order"""
+    results = [None] * len(windows)
+    limiter = trio.CapacityLimiter(max_concurrent)
+
+    async def run(index, window):
+        async with limiter:
+            results[index] = await summarize(window)
+
+    async with trio.open_nursery() as nursery:
+        for index, window in enumerate(windows):
+            nursery.start_soon(run, index, window)
+    return results
+
+
+def stitch_prompt_windows(window_prompts: list) -> list:
+    """
+    Concatenate per-window merged prompts, removing repeats from the overlaps
+
+    A prompt from a later window is dropped when it repeats, or is a prefix of, a
+    prompt already kept from the preceding window; a longer version replaces a
+    shorter prefix kept earlier.
+    """
+    stitched = []
+    for prompts in window_prompts:
+        previous_tail = list(stitched[-len(prompts) - 10:]) if stitched else []
+        for prompt in prompts:
+            text = str(prompt.get("prompt", "")).strip()
+            duplicate = None
+            for kept in previous_tail:
+                kept_text = str(kept.get("prompt", "")).strip()
+                if text and (kept_text.startswith(text) or text.startswith(kept_text)):
+                    duplicate = kept
+                    break
+            if duplicate is None:
+                stitched.append(prompt)
+            elif len(text) > len(str(duplicate.get("prompt", "")).strip()):
+                duplicate["prompt"] = prompt.get("prompt")
+    return stitched
+
+
+async def merge_prompts_map_reduce(
+    prompts_data: dict,
+    api_key: str,
+    window_seconds: int = 600,
+    overlap_seconds: int = 60,
+    max_concurrent: int = 4,
+    client: AsyncOpenAI = None
+) -> dict:
+    """
+    Merge prompts window by window instead of in one whole-session call
+
+    Windows are merged concurrently with `merge_prompts_with_gpt4`. The overlaps
+    between neighbouring windows are then stitched, so latency grows with window
+    size rather than session length. A window whose call fails keeps its raw
+    prompts and is counted in metadata["map_reduce"]["failed_windows"]. A short
+    session is a single window, so the result always has the same shape.
+    """
+    if client is None:
+        client = get_openai_client(api_key)
+
+    windows = split_into_windows(
+        prompts_data["prompts_timeline"], "time_from_start", window_seconds, overlap_seconds
+    )
+    failed = []
+
+    async def summarize(window):
+        window_data = {"prompts_timeline": window["entries"], "metadata": prompts_data["metadata"]}
+        merged = await merge_prompts_with_gpt4(window_data, api_key, client)
+        if merged is window_data or not isinstance(merged.get("prompts_timeline"), list):
+            failed.append(window["start"])
+            return window["entries"]
+        return merged["prompts_timeline"]
+
+    window_prompts = await map_windows(windows, summarize, max_concurrent)
+    print(f"Merged prompts in {len(windows)} windows ({len(failed)} failed)")
+
+    metadata = dict(prompts_data["metadata"])
+    metadata["map_reduce"] = {"windows": len(windows), "failed_windows": len(failed)}
+    return {"prompts_timeline": stitch_prompt_windows(window_prompts), "metadata": metadata}
+
+
+async def stitch_activity_boundary(client: AsyncOpenAI, before: dict, after: dict):
+    """Ask the model whether two activities meeting at a window boundary are one; returns the merged one or None"""
+    try:
+        response = await create_completion(
+            client,
+            "stitch_activities",
+            model="gpt-4o",
+            response_format={"type": "json_object"},
+            messages=[
+                {
+                    "role": "user",
+                    "content": f"""These two activity summaries come from consecutive, slightly overlapping parts of one candidate's activity log. If they describe the same activity (e.g. work on the same bug or issue), merge them into one summary with the earlier start time and combined details, and return {{"merged": true, "activity": {{"activity": ..., "time": ..., "details": [...]}}}}. Otherwise return {{"merged": false}}.
+
+First:
+{json.dumps(before, indent=2)}
+
+Second:
+{json.dumps(after, indent=2)}"""
+                }
+            ],
+            max_tokens=2000,
+            temperature=0
+        )
+        decision = json.loads(response.choices[0].message.content)
+        return decision.get("activity") if decision.get("merged") else None
+    except Exception as e:
+        print(f"Error in stitching activities: {str(e)}")
+        return None
+
+
+def raw_activities(app_actions: list) -> list:
+    """App actions in the summarized activity format, for windows whose summary failed"""
+    return [
+        {
+            "activity": f"{entry.get('app')}: {entry.get('action')}",
+            "time": entry.get("time"),
+            "details": [entry.get("action")],
+        }
+        for entry in app_actions
+    ]
+
+
+async def analyze_app_actions_map_reduce(
+    app_actions_data: dict,
+    api_key: str,
+    window_seconds: int = 900,
+    overlap_seconds: int = 60,
+    max_concurrent: int = 4,
+    client: AsyncOpenAI = None
+) -> list:
+    """
+    Summarize the app actions timeline window by window, then stitch boundaries
+
+    Windows are summarized concurrently with `analyze_app_actions_with_o1`. The
+    reduce pass then asks, for every boundary at once, whether the last activity
+    of one window and the first of the next are the same and merges them if so.
+    A window whose call fails contributes its raw app actions, converted to the
+    same {"activity", "time", "details"} entries, so the result is always a list
+    of activities, including for a short session that is a single window.
+    """
+    if client is None:
+        client = get_openai_client(api_key)
+
+    windows = split_into_windows(
+        app_actions_data["app_actions_timeline"], "time", window_seconds, overlap_seconds
+    )
+    failed = []
+
+    async def summarize(window):
+        window_data = {"app_actions_timeline": window["entries"], "metadata": app_actions_data["metadata"]}
+        analyzed = await analyze_app_actions_with_o1(window_data, api_key, client)
+        if analyzed is window_data or not isinstance(analyzed, list):
+            failed.append(window["start"])
+            return raw_activities(window["entries"])
+        return analyzed
+
+    window_activities = await map_windows(windows, summarize, max_concurrent)
+    print(f"Analyzed app actions in {len(windows)} windows ({len(failed)} failed)")
+
+    # Reduce: decide every boundary concurrently, then apply merges in order
+    boundaries = [
+        index for index in range(1, len(window_activities))
+        if window_activities[index - 1] and window_activities[index]
+    ]
+    merges = {}
+
+    async def decide(index):
+        merges[index] = await stitch_activity_boundary(
+            client, window_activities[index - 1][-1], window_activities[index][0]
+        )
+
+    async with trio.open_nursery() as nursery:
+        for index in boundaries:
+            nursery.start_soon(decide, index)
+
+    stitched = []
+    for index, activities in enumerate(window_activities):
+        activities = list(activities)
+        if merges.get(index) and stitched:
+            stitched[-1] = merges[index]
+            activities = activities[1:]
+        stitched.extend(activities)
+    return stitched
+
+
+async def main(submission_id, assignment_id, user_id, progress=None, workspace=None, file_path=None):
     # Configuration
-    file_path = f"analysis/{submission_id}.json"
+    if workspace is None:
+        workspace = LOCAL_WORKSPACE
+    if file_path is None:
+        # Standalone runs look the analysis up; the pipeline passes the file it just wrote
+        file_path = find_artifact(f"analysis/{submission_id}", workspace)
     base_name = f"{submission_id}.json"
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-
-    # Create a new folder for the `submission_id`
-    submission_folder = f"timeline_analysis/{submission_id}"
-    os.makedirs(submission_folder, exist_ok=True)  # Create folder if it doesn't already exist
-    print(f"Folder created: {submission_folder}")
-
-    try:
-        # Analyze timeline
-        result = analyze_timeline_file(file_path)
-        
-        # Save activity durations
-        save_activity_durations(base_name, result, assignment_id, user_id, submission_id)
-        
-        # Save raw prompts timeline
-        save_raw_prompts(base_name, result, assignment_id, user_id, submission_id)
-        
-        # Save app actions timeline
-        save_app_actions(file_path, result, assignment_id, user_id, submission_id)
-        
-        # Save prompts timeline
+    # Outputs stay .json for the dashboard; with a compact ARTIFACT_FORMAT they are not indented
+    INDENT = 2 if os.getenv("ARTIFACT_FORMAT", "json") == "json" else None
+    # Sessions longer than one window are summarized map-reduce style (0 disables)
+    PROMPT_WINDOW_SECONDS = int(os.getenv("PROMPT_WINDOW_SECONDS", "600"))
+    ACTION_WINDOW_SECONDS = int(os.getenv("ACTION_WINDOW_SECONDS", "900"))
+    WINDOW_OVERLAP_SECONDS = 60
+    MAX_CONCURRENT_WINDOWS = 4
+
+    merged_file = f"timeline_analysis/{submission_id}/{assignment_id}_{user_id}_ai_prompt.json"
+    analyzed_file = f"timeline_analysis/{submission_id}/{assignment_id}_{user_id}_timeline_summary.json"
+
+    async def merge_prompts(result):
         prompts_data = {
             "prompts_timeline": result["prompts_timeline"],
             "metadata": result["metadata"]
         }
-        
+
         # Merge prompts using GPT-4o
-        merged_prompts = await merge_prompts_with_gpt4(prompts_data, OPENAI_API_KEY)
-        
-        # Save merged prompts
-        merged_file = f"timeline_analysis/{submission_id}/{assignment_id}_{user_id}_ai_prompt.json"
-        with open(merged_file, 'w') as f:
-            json.dump(merged_prompts, f, indent=2)
-        
+        if PROMPT_WINDOW_SECONDS > 0:
+            merged_prompts = await merge_prompts_map_reduce(
+                prompts_data, OPENAI_API_KEY, PROMPT_WINDOW_SECONDS, WINDOW_OVERLAP_SECONDS, MAX_CONCURRENT_WINDOWS
+            )
+        else:
+            merged_prompts = await merge_prompts_with_gpt4(prompts_data, OPENAI_API_KEY)
+
+        with workspace.open(merged_file, 'w') as f:
+            json.dump(merged_prompts, f, indent=INDENT)
         print(f"Merged prompts saved to {merged_file}")
-
-        # Read and analyze app actions with GPT-o1
-        app_actions_file = f"timeline_analysis/{submission_id}/{assignment_id}_{user_id}_app_actions.json"
-        with open(app_actions_file, 'r') as f:
-            app_actions_data = json.load(f)
-            
-        analyzed_actions = await analyze_app_actions_with_o1(app_actions_data, OPENAI_API_KEY)
-        
-        # Save analyzed app actions
-        analyzed_file = f"timeline_analysis/{submission_id}/{assignment_id}_{user_id}_timeline_summary.json"
-        with open(analyzed_file, 'w') as f:
-            json.dump(analyzed_actions, f, indent=2)
-            
+        return merged_prompts
+
+    async def summarize_app_actions(app_actions_data):
+        if ACTION_WINDOW_SECONDS > 0:
+            analyzed_actions = await analyze_app_actions_map_reduce(
+                app_actions_data, OPENAI_API_KEY, ACTION_WINDOW_SECONDS, WINDOW_OVERLAP_SECONDS, MAX_CONCURRENT_WINDOWS
+            )
+        else:
+            analyzed_actions = await analyze_app_actions_with_o1(app_actions_data, OPENAI_API_KEY)
+
+        with workspace.open(analyzed_file, 'w') as f:
+            json.dump(analyzed_actions, f, indent=INDENT)
         print(f"Analyzed app actions saved to {analyzed_file}")
-        await upload_to_S3_main(submission_id)
+        return analyzed_actions
+
+    async def upload(*_):
+        if progress is not None:
+            progress.set_stage("upload")
+        await upload_to_S3_main(submission_id, workspace)
+
+    # Stages only wait for the outputs they use; the prompt merge and the app
+    # actions summary run concurrently
+    graph = StageGraph(f"timeline {submission_id}")
+    # Outputs go to the job's workspace; writing a file there creates its folder
+    graph.add("result", lambda path: analyze_timeline_file(path, workspace), ["file_path"])
+    graph.add("activity_durations", lambda result: save_activity_durations(
+        base_name, result, assignment_id, user_id, submission_id, INDENT, workspace), ["result"])
+    graph.add("raw_prompts", lambda result: save_raw_prompts(
+        base_name, result, assignment_id, user_id, submission_id, INDENT, workspace), ["result"])
+    graph.add("app_actions", lambda result: save_app_actions(
+        file_path, result, assignment_id, user_id, submission_id, INDENT, workspace), ["result"])
+    graph.add("merged_prompts", merge_prompts, ["result"])
+    graph.add("timeline_summary", summarize_app_actions, ["app_actions"])
+    graph.add("upload", upload, ["activity_durations", "raw_prompts", "merged_prompts", "timeline_summary"])
+
+    try:
+        if progress is not None:
+            progress.set_stage("timeline_analysis")
+        await graph.run({"file_path": file_path})
     except Exception as e:
+        # Re-raised so a queued job or batch run records the submission as failed
         print(f"Error: An unexpected error occurred - {str(e)}")
-
-
+        raise
+    return graph.timings
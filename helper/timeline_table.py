@@ -0,0 +1,161 @@
+import json
+from array import array
+from statistics import median
+from typing import Dict, List
+
+
+def clean_json_string(json_str):
+    # Remove the ```json prefix and ``` suffix if present
+    if json_str.startswith("```json\n"):
+        json_str = json_str[8:]
+    if (json_str.endswith("\n```")):
+        json_str = json_str[:-4]
+    return json_str
+
+
+def parse_clock(time_str: str) -> int:
+    """Convert "HH:MM:SS" into seconds since midnight (-1 if missing/invalid)"""
+    try:
+        hours, minutes, seconds = map(int, time_str.split(":"))
+        return hours * 3600 + minutes * 60 + seconds
+    except (AttributeError, ValueError):
+        return -1
+
+
+class StringTable:
+    """Interns strings to small integer codes"""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+
+class FrameTable:
+    """
+    Columnar view of an analysis timeline, built in a single parsing pass.
+
+    Frame columns (one row per successfully parsed frame, in timeline order):
+        times: original "HH:MM:SS" strings
+        timestamps: seconds since midnight
+        activity_codes: codes into `activities`
+
+    Window columns (one row per open window):
+        window_frames: row of the owning frame
+        window_apps / window_actions: codes into `apps` / `actions`
+        window_prompts: prompt text ("" when none)
+    """
+
+    def __init__(self):
+        self.times = []
+        self.timestamps = array("l")
+        self.activity_codes = array("l")
+        self.activities = StringTable()
+
+        self.window_frames = array("l")
+        self.window_apps = array("l")
+        self.window_actions = array("l")
+        self.window_prompts = []
+        self.apps = StringTable()
+        self.actions = StringTable()
+
+        self.skipped = 0
+
+    def add_entry(self, entry: Dict):
+        """Parse one timeline entry into the columns; unparseable entries are skipped"""
+        try:
+            analysis = entry["analysis"]
+            if isinstance(analysis, str):
+                analysis = json.loads(clean_json_string(analysis))
+            activity = analysis["activity"]
+            windows = analysis["open_windows"]
+        except Exception as e:
+            print(f"Warning: Error processing entry - {str(e)}")
+            self.skipped += 1
+            return
+
+        row = len(self.times)
+        self.times.append(entry["time_from_start"])
+        self.timestamps.append(parse_clock(entry["time_from_start"]))
+        self.activity_codes.append(self.activities.code(activity))
+
+        for window in windows:
+            self.window_frames.append(row)
+            self.window_apps.append(self.apps.code(window.get("app", "")))
+            self.window_actions.append(self.actions.code(window.get("action", "")))
+            self.window_prompts.append(window.get("prompt") or "")
+
+    def intervals(self, default_interval: int = 5, max_gap_factor: float = 3.0):
+        """
+        Seconds each frame stands for: the gap to the next frame's timestamp.
+
+        The last frame, frames without a timestamp, and gaps longer than
+        `max_gap_factor` times the typical interval (recording pauses) fall back to
+        the typical (median) interval. A negative gap means the session crossed
+        midnight.
+
+        Returns:
+            (intervals array, typical interval)
+        """
+        timestamps = self.timestamps
+        gaps = [
+            (later - earlier) % 86400
+            for earlier, later in zip(timestamps, timestamps[1:])
+            if earlier >= 0 and later >= 0
+        ]
+        positive = [gap for gap in gaps if gap > 0]
+        typical = int(median(positive)) if positive else default_interval
+        max_gap = typical * max_gap_factor
+
+        intervals = array("l", [typical]) * len(timestamps)
+        for row, (earlier, later) in enumerate(zip(timestamps, timestamps[1:])):
+            if earlier < 0 or later < 0:
+                continue
+            gap = (later - earlier) % 86400
+            if gap <= max_gap:
+                intervals[row] = gap
+        return intervals, typical
+
+    def activity_durations(self, intervals) -> Dict[str, int]:
+        """Total seconds per activity"""
+        totals = [0] * len(self.activities.values)
+        for code, interval in zip(self.activity_codes, intervals):
+            totals[code] += interval
+        return {activity: totals[code] for code, activity in enumerate(self.activities.values)}
+
+    def prompts_timeline(self) -> List[Dict]:
+        """Non-empty prompts with their frame time"""
+        return [
+            {"time_from_start": self.times[row], "prompt": prompt}
+            for row, prompt in zip(self.window_frames, self.window_prompts)
+            if prompt
+        ]
+
+    def app_actions_timeline(self) -> List[Dict]:
+        """App/action timeline with consecutive duplicates removed"""
+        timeline = []
+        previous = None
+        for row, app, action in zip(self.window_frames, self.window_apps, self.window_actions):
+            if previous != (app, action):
+                timeline.append({
+                    "time": self.times[row],
+                    "app": self.apps.values[app],
+                    "action": self.actions.values[action],
+                })
+                previous = (app, action)
+        return timeline
+
+
+def build_frame_table(timeline_data: List[Dict]) -> FrameTable:
+    """Parse every timeline entry exactly once into a FrameTable"""
+    table = FrameTable()
+    for entry in timeline_data:
+        table.add_entry(entry)
+    return table
@@ -1,41 +1,157 @@
+import io
 import os
-import boto3
-import shutil
-from botocore.exceptions import NoCredentialsError, ClientError
+import time
+import trio
+from statistics import median
+from typing import Dict, List
+from helper.s3_client import get_s3_client
+from helper.telemetry import span, record_bytes
+from helper.artifact_format import ARTIFACT_FORMATS
+from helper.workspace import Workspace, LOCAL_WORKSPACE
 
 
 # AWS S3 Configuration
-AWS_ACCESS_KEY = os.getenv("AWS_ACCESS_KEY_ID")
-AWS_SECRET_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
-AWS_REGION = os.getenv("AWS_REGION")
 BUCKET_NAME = "authcast-assignments"  # Correct bucket name
 FOLDER_NAME = "analysis"
 LOCAL_FOLDER = "timeline_analysis"
 
-# Initialize S3 client with credentials
-s3 = boto3.client(
-    's3',
-    aws_access_key_id=AWS_ACCESS_KEY,
-    aws_secret_access_key=AWS_SECRET_KEY,
-    region_name=AWS_REGION
-)
+# Uploads in flight at once, and the connection pool they share
+MAX_UPLOAD_WORKERS = int(os.getenv("S3_UPLOAD_WORKERS", "8"))
+# Artifacts above this size are sent as parallel multipart uploads
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+
+
+def list_upload_files(submission_id, workspace: Workspace = None) -> List[str]:
+    """JSON artifacts of a submission in its workspace, in a stable order"""
+    workspace = workspace or LOCAL_WORKSPACE
+    return [name for name in workspace.walk(f"{LOCAL_FOLDER}/{submission_id}") if name.endswith(".json")]
+
+
+def upload_one(
+    s3_client, local_file_path: str, bucket_name: str, s3_key: str, transfer_config, workspace: Workspace = None
+) -> Dict:
+    """Upload a single workspace file (multipart above the threshold) and time it"""
+    workspace = workspace or LOCAL_WORKSPACE
+    size = workspace.size(local_file_path)
+    start_time = time.time()
+    path = workspace.local_path(local_file_path)
+    if path is not None:
+        s3_client.upload_file(path, bucket_name, s3_key, Config=transfer_config)
+    else:
+        data = io.BytesIO(workspace.read_bytes(local_file_path))
+        s3_client.upload_fileobj(data, bucket_name, s3_key, Config=transfer_config)
+    return {
+        "file": local_file_path,
+        "key": s3_key,
+        "bytes": size,
+        "seconds": round(time.time() - start_time, 3),
+    }
+
+
+def summarize_uploads(uploads: List[Dict], failures: List[Dict], elapsed: float) -> Dict:
+    total_bytes = sum(upload["bytes"] for upload in uploads)
+    latencies = [upload["seconds"] for upload in uploads]
+    return {
+        "files": len(uploads),
+        "failed": len(failures),
+        "bytes": total_bytes,
+        "seconds": round(elapsed, 3),
+        "throughput_mb_per_second": round(total_bytes / elapsed / 1024 / 1024, 3) if elapsed else None,
+        "median_file_seconds": round(median(latencies), 3) if latencies else None,
+        "max_file_seconds": max(latencies) if latencies else None,
+        "uploads": uploads,
+        "failures": failures,
+    }
+
+
+async def upload_files_concurrently(
+    submission_id,
+    s3_client=None,
+    bucket_name: str = BUCKET_NAME,
+    max_workers: int = MAX_UPLOAD_WORKERS,
+    multipart_threshold: int = MULTIPART_THRESHOLD,
+    workspace: Workspace = None
+) -> Dict:
+    """
+    Upload a submission's JSON artifacts to S3 without blocking the event loop.
+
+    Each upload runs in a worker thread, at most `max_workers` at a time, all
+    sharing one pooled client. Files above `multipart_threshold` are split into
+    parts that are uploaded in parallel.
+
+    Args:
+        submission_id (str): Submission whose timeline_analysis folder is uploaded
+        s3_client: boto3 S3 client (defaults to the shared client)
+        bucket_name (str): Destination bucket
+        max_workers (int): Maximum concurrent file uploads
+        multipart_threshold (int): Size in bytes above which multipart is used
+        workspace (Workspace): Where the artifacts live (defaults to the working directory)
+
+    Returns:
+        Summary with per-file latency, total bytes and throughput
+    """
+    from boto3.exceptions import S3UploadFailedError
+    from boto3.s3.transfer import TransferConfig
+    from botocore.exceptions import BotoCoreError, ClientError
+
+    if s3_client is None:
+        s3_client = get_s3_client(max_pool_connections=max_workers * 2)
+    transfer_config = TransferConfig(
+        multipart_threshold=multipart_threshold,
+        multipart_chunksize=MULTIPART_CHUNKSIZE,
+        max_concurrency=4,
+        use_threads=True
+    )
+    limiter = trio.CapacityLimiter(max_workers)
+    uploads = []
+    failures = []
+    start_time = time.time()
+
+    async def upload(local_file_path):
+        s3_key = f"{FOLDER_NAME}/{os.path.basename(local_file_path)}"
+        try:
+            with span("s3_upload", file=os.path.basename(local_file_path)):
+                result = await trio.to_thread.run_sync(
+                    upload_one, s3_client, local_file_path, bucket_name, s3_key, transfer_config, workspace,
+                    limiter=limiter
+                )
+        # upload_file wraps ClientError in S3UploadFailedError; NoCredentialsError is a BotoCoreError
+        except (S3UploadFailedError, ClientError, BotoCoreError, OSError) as e:
+            print(f"Failed to upload {local_file_path} to s3://{bucket_name}/{s3_key}: {e}")
+            failures.append({"file": local_file_path, "key": s3_key, "error": str(e)})
+            return
+        uploads.append(result)
+        record_bytes("upload", result["bytes"])
+        print(f"Uploaded: {local_file_path} -> s3://{bucket_name}/{s3_key} ({result['seconds']}s)")
+
+    async with trio.open_nursery() as nursery:
+        for local_file_path in list_upload_files(submission_id, workspace):
+            nursery.start_soon(upload, local_file_path)
+
+    summary = summarize_uploads(uploads, failures, time.time() - start_time)
+    print(
+        f"Uploaded {summary['files']} files ({summary['bytes']} bytes) in {summary['seconds']}s, "
+        f"{summary['throughput_mb_per_second']} MB/s, {summary['failed']} failed"
+    )
+    return summary
+
 
 def upload_files_to_s3(submission_id):
-    LOCAL_FOLDER = f"timeline_analysis/{submission_id}"
-    try:
-        # Iterate through all files in the specified local folder
-        for root, dirs, files in os.walk(LOCAL_FOLDER):
-            for file in files:
-                if file.endswith(".json"):
-                    local_file_path = os.path.join(root, file)
-                    s3_key = f"{FOLDER_NAME}/{file}"
+    """Synchronous, one-file-at-a-time upload kept for scripts outside the event loop"""
+    from boto3.exceptions import S3UploadFailedError
+    from botocore.exceptions import NoCredentialsError, ClientError
 
-                    try:
-                        # Upload the file to S3
-                        s3.upload_file(local_file_path, BUCKET_NAME, s3_key)
-                        print(f"Uploaded: {local_file_path} -> s3://{BUCKET_NAME}/{s3_key}")
-                    except ClientError as e:
-                        print(f"Failed to upload {local_file_path} to s3://{BUCKET_NAME}/{s3_key}: {e}")
+    s3 = get_s3_client()
+    try:
+        for local_file_path in list_upload_files(submission_id):
+            s3_key = f"{FOLDER_NAME}/{os.path.basename(local_file_path)}"
+            try:
+                # Upload the file to S3
+                s3.upload_file(local_file_path, BUCKET_NAME, s3_key)
+                print(f"Uploaded: {local_file_path} -> s3://{BUCKET_NAME}/{s3_key}")
+            except (S3UploadFailedError, ClientError) as e:
+                print(f"Failed to upload {local_file_path} to s3://{BUCKET_NAME}/{s3_key}: {e}")
 
         # After uploading all files, delete local JSON files
         delete_local_json_files(submission_id)
@@ -45,40 +161,57 @@ def upload_files_to_s3(submission_id):
     except Exception as e:
         print(f"An error occurred: {e}")
 
-def delete_local_json_files(submission_id):
+def delete_local_json_files(submission_id, workspace: Workspace = None):
+    workspace = workspace or LOCAL_WORKSPACE
     # Paths of the directories and file to delete
     dirs_to_delete = [
         f"screenshots/{submission_id}",
         f"timeline_analysis/{submission_id}",
     ]
-    file_to_delete = f"analysis/{submission_id}.json"
+    files_to_delete = [f"analysis/{submission_id}{suffix}" for suffix in ARTIFACT_FORMATS.values()]
+    checkpoint_to_delete = f"analysis/{submission_id}.checkpoint.jsonl"
 
     # Delete JSON files in the directories
     for dir_path in dirs_to_delete:
-        if os.path.exists(dir_path):
-            for root, dirs, files in os.walk(dir_path):
-                for file in files:
-                    if file.endswith(".json"):
-                        file_path = os.path.join(root, file)
-                        try:
-                            os.remove(file_path)
-                            print(f"Deleted: {file_path}")
-                        except Exception as e:
-                            print(f"Failed to delete {file_path}: {e}")
+        if workspace.exists(dir_path):
+            for file_path in workspace.walk(dir_path):
+                if file_path.endswith(".json"):
+                    try:
+                        workspace.remove(file_path)
+                        print(f"Deleted: {file_path}")
+                    except Exception as e:
+                        print(f"Failed to delete {file_path}: {e}")
             # Remove the directory itself if it's empty
             try:
-                shutil.rmtree(dir_path)
+                workspace.remove_tree(dir_path)
                 print(f"Removed directory: {dir_path}")
             except Exception as e:
                 print(f"Failed to remove directory {dir_path}: {e}")
 
-    # Delete the single JSON file
-    if os.path.exists(file_to_delete):
+    # Delete the frame analysis file, in whichever format it was written
+    for file_to_delete in files_to_delete:
+        if workspace.exists(file_to_delete):
+            try:
+                workspace.remove(file_to_delete)
+                print(f"Deleted: {file_to_delete}")
+            except Exception as e:
+                print(f"Failed to delete {file_to_delete}: {e}")
+
+    # Delete the frame checkpoint log now that the results are safely uploaded
+    if workspace.exists(checkpoint_to_delete):
         try:
-            os.remove(file_to_delete)
-            print(f"Deleted: {file_to_delete}")
+            workspace.remove(checkpoint_to_delete)
+            print(f"Deleted: {checkpoint_to_delete}")
         except Exception as e:
-            print(f"Failed to delete {file_to_delete}: {e}")
+            print(f"Failed to delete {checkpoint_to_delete}: {e}")
 
-async def main(submission_id): 
-    upload_files_to_s3(submission_id)
\ No newline at end of file
+async def main(submission_id, workspace: Workspace = None):
+    summary = await upload_files_concurrently(submission_id, workspace=workspace)
+    # Keep the local artifacts (and the frame checkpoint) if anything failed to upload,
+    # and fail the run so the job is not reported as done
+    if summary["failed"]:
+        print(f"{summary['failed']} uploads failed; keeping local files for {submission_id}")
+        failed = ", ".join(failure["key"] for failure in summary["failures"])
+        raise RuntimeError(f"{summary['failed']} of {summary['failed'] + summary['files']} uploads failed: {failed}")
+    delete_local_json_files(submission_id, workspace)
+    return summary
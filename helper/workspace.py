@@ -0,0 +1,258 @@
+import io
+import os
+import shutil
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from typing import List
+
+# Memory-backed filesystem used for the "tmpfs" backend when present (Linux)
+TMPFS_DIR = "/dev/shm"
+WORKSPACE_BACKENDS = ("local", "disk", "tmpfs", "memory")
+
+
+class Workspace(ABC):
+    """
+    Storage for one job's intermediate artifacts.
+
+    Artifacts are addressed by the same relative names the pipeline has always
+    used ("screenshots/<id>/...", "analysis/<id>.json", "timeline_analysis/<id>/...").
+    Each job gets its own workspace, so concurrent jobs in one process cannot
+    see each other's files even when their names collide. Using a workspace as
+    a context manager removes everything it holds on exit.
+    """
+
+    @abstractmethod
+    def open(self, name: str, mode: str = "r"):
+        raise NotImplementedError
+
+    @abstractmethod
+    def exists(self, name: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def size(self, name: str) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def listdir(self, name: str) -> List[str]:
+        """File names directly inside folder `name` (empty if it does not exist)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def walk(self, name: str) -> List[str]:
+        """Names of every file below folder `name`, sorted"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def remove(self, name: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def remove_tree(self, name: str):
+        raise NotImplementedError
+
+    def local_path(self, name: str):
+        """A real filesystem path for `name`, or None when the backend has none"""
+        return None
+
+    @abstractmethod
+    def cleanup(self):
+        raise NotImplementedError
+
+    def read_bytes(self, name: str) -> bytes:
+        with self.open(name, "rb") as f:
+            return f.read()
+
+    def write_bytes(self, name: str, data: bytes):
+        with self.open(name, "wb") as f:
+            f.write(data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cleanup()
+
+
+class DiskWorkspace(Workspace):
+    """
+    Workspace in a directory on disk (or on tmpfs such as /dev/shm).
+
+    With root=None names are resolved against the working directory, which is
+    the layout the pipeline used before workspaces; that workspace is not
+    owned, so `cleanup` leaves it alone and callers delete individual files.
+
+    Args:
+        root (str): Directory holding the artifacts (None for the working directory)
+        owned (bool): Remove `root` and everything in it on cleanup
+    """
+
+    def __init__(self, root: str = None, owned: bool = True):
+        self.root = root
+        self.owned = owned and root is not None
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.root, name) if self.root else name
+
+    def open(self, name: str, mode: str = "r"):
+        path = self.path(name)
+        if any(flag in mode for flag in "wax"):
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        return open(path, mode)
+
+    def exists(self, name: str) -> bool:
+        return os.path.exists(self.path(name))
+
+    def size(self, name: str) -> int:
+        return os.path.getsize(self.path(name))
+
+    def listdir(self, name: str) -> List[str]:
+        path = self.path(name)
+        if not os.path.isdir(path):
+            return []
+        return [entry for entry in os.listdir(path) if os.path.isfile(os.path.join(path, entry))]
+
+    def walk(self, name: str) -> List[str]:
+        names = []
+        for root, dirs, files in os.walk(self.path(name)):
+            for file in files:
+                full_path = os.path.join(root, file)
+                names.append(os.path.relpath(full_path, self.root) if self.root else full_path)
+        return sorted(names)
+
+    def remove(self, name: str):
+        os.remove(self.path(name))
+
+    def remove_tree(self, name: str):
+        shutil.rmtree(self.path(name))
+
+    def local_path(self, name: str) -> str:
+        return self.path(name)
+
+    def cleanup(self):
+        if self.owned:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+
+class _MemoryFile(io.BytesIO):
+    """Writable buffer that stores its contents in a MemoryWorkspace on flush and close"""
+
+    def __init__(self, workspace, name: str, initial: bytes = b""):
+        super().__init__(initial)
+        self.seek(0, io.SEEK_END)
+        self.workspace = workspace
+        self.name = name
+
+    def flush(self):
+        super().flush()
+        if not self.closed:
+            self.workspace.store(self.name, self.getvalue())
+
+    def close(self):
+        if not self.closed:
+            self.workspace.store(self.name, self.getvalue())
+        super().close()
+
+
+class MemoryWorkspace(Workspace):
+    """
+    Workspace kept entirely in memory: no disk I/O for intermediate artifacts.
+
+    Suited to the S3 streaming analysis path, where frames never enter the
+    workspace and the remaining artifacts are small. Frames downloaded for the
+    local-folder paths are held here too, so prefer tmpfs/disk for those.
+    Files are visible to readers once the writer flushes or closes them.
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        name = os.path.normpath(name).replace(os.sep, "/")
+        return "" if name == "." else name
+
+    def store(self, name: str, data: bytes):
+        with self.lock:
+            self.files[name] = data
+
+    def open(self, name: str, mode: str = "r"):
+        name = self.normalize(name)
+        binary = "b" in mode
+        if "r" in mode and "+" not in mode:
+            with self.lock:
+                if name not in self.files:
+                    raise FileNotFoundError(f"No such file in memory workspace: {name}")
+                buffer = io.BytesIO(self.files[name])
+        else:
+            with self.lock:
+                initial = self.files.get(name, b"") if "a" in mode else b""
+            buffer = _MemoryFile(self, name, initial)
+            self.store(name, initial)
+        return buffer if binary else io.TextIOWrapper(buffer, encoding="utf-8")
+
+    def exists(self, name: str) -> bool:
+        name = self.normalize(name)
+        with self.lock:
+            return name in self.files or any(key.startswith(name + "/") for key in self.files)
+
+    def size(self, name: str) -> int:
+        name = self.normalize(name)
+        with self.lock:
+            if name not in self.files:
+                raise FileNotFoundError(f"No such file in memory workspace: {name}")
+            return len(self.files[name])
+
+    def listdir(self, name: str) -> List[str]:
+        prefix = self.normalize(name) + "/"
+        with self.lock:
+            return [key[len(prefix):] for key in self.files if key.startswith(prefix) and "/" not in key[len(prefix):]]
+
+    def walk(self, name: str) -> List[str]:
+        prefix = self.normalize(name) + "/"
+        with self.lock:
+            return sorted(key for key in self.files if key.startswith(prefix))
+
+    def remove(self, name: str):
+        name = self.normalize(name)
+        with self.lock:
+            if self.files.pop(name, None) is None:
+                raise FileNotFoundError(f"No such file in memory workspace: {name}")
+
+    def remove_tree(self, name: str):
+        prefix = self.normalize(name) + "/"
+        with self.lock:
+            for key in [key for key in self.files if key.startswith(prefix)]:
+                del self.files[key]
+
+    def cleanup(self):
+        with self.lock:
+            self.files.clear()
+
+
+# The working-directory layout, used when no workspace is passed
+LOCAL_WORKSPACE = DiskWorkspace()
+
+
+def create_workspace(backend: str, job_id: str) -> Workspace:
+    """
+    Workspace for one job.
+
+    Args:
+        backend (str): "local" (shared working directory, as before), "disk" (a
+            private temporary directory), "tmpfs" (the same under /dev/shm when
+            available) or "memory"
+        job_id (str): Used in the temporary directory name, for debugging
+    """
+    if backend == "local":
+        return LOCAL_WORKSPACE
+    if backend == "memory":
+        return MemoryWorkspace()
+    if backend in ("disk", "tmpfs"):
+        base_dir = TMPFS_DIR if backend == "tmpfs" and os.path.isdir(TMPFS_DIR) else None
+        return DiskWorkspace(tempfile.mkdtemp(prefix=f"job-{job_id}-", dir=base_dir))
+    raise ValueError(f"Unknown workspace backend {backend!r}; use one of {', '.join(WORKSPACE_BACKENDS)}")
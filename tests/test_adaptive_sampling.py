@@ -0,0 +1,48 @@
+import json
+
+from helper.adaptive_sampling import AdaptiveSampler, frame_seconds
+
+
+def result(activity):
+    return {"analysis": json.dumps({"activity": activity, "open_windows": [{"app": "VS Code"}]})}
+
+
+def test_frame_seconds_handles_midnight_and_missing_times():
+    assert frame_seconds(["23:59:50", "23:59:55", None, "00:00:05"]) == [0, 5, 10, 15]
+
+
+def test_refinement_finds_the_change_within_the_resolution():
+    seconds = list(range(0, 305, 5))
+    change_at = 31
+    truth = ["Coding" if index < change_at else "Testing" for index in range(len(seconds))]
+    sampler = AdaptiveSampler(seconds, sample_seconds=60, resolution_seconds=10)
+
+    indices = sampler.initial()
+    assert indices == [0, 12, 24, 36, 48, 60]
+    while indices:
+        for index in indices:
+            sampler.record(index, result(truth[index]))
+        indices = sampler.refine()
+
+    assigned = {}
+    for group in sampler.groups():
+        for member in group["members"]:
+            assigned[member] = truth[group["representative"]]
+    assert sorted(assigned) == list(range(len(seconds)))
+    wrong = [index for index in assigned if assigned[index] != truth[index]]
+    assert len(wrong) * 5 <= 10
+
+    stats = sampler.stats()
+    assert stats["segments"] == 2
+    assert stats["analyzed"] < len(seconds) // 3
+
+
+def test_failed_frames_are_refined_and_claim_no_neighbours():
+    sampler = AdaptiveSampler([0, 5, 10, 15, 20], sample_seconds=20, resolution_seconds=5)
+    assert sampler.initial() == [0, 4]
+    sampler.record(0, result("Coding"))
+    sampler.record(4, {"error": "timeout"})
+
+    assert sampler.refine() == [2]
+    groups = sampler.groups()
+    assert groups == [{"representative": 0, "members": [0, 1, 2, 3]}, {"representative": 4, "members": [4]}]
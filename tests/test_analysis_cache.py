@@ -0,0 +1,43 @@
+import time
+
+from helper.analysis_cache import AnalysisCache, content_key
+
+
+def test_key_covers_content_model_and_prompt_version():
+    key = content_key(b"frame", "gpt-4o", "1")
+    assert key == content_key(b"frame", "gpt-4o", "1")
+    assert key != content_key(b"frame!", "gpt-4o", "1")
+    assert key != content_key(b"frame", "gpt-4o-mini", "1")
+    assert key != content_key(b"frame", "gpt-4o", "2")
+
+
+def test_hits_persist_across_instances(tmp_path):
+    path = str(tmp_path / "cache" / "frames.db")
+    cache = AnalysisCache(path)
+    assert cache.get("k") is None
+    cache.put("k", '{"activity": "Coding"}')
+    cache.close()
+
+    reopened = AnalysisCache(path)
+    assert reopened.get("k") == '{"activity": "Coding"}'
+    assert reopened.stats()["hit_rate"] == 1.0
+    reopened.close()
+
+
+def test_expired_and_least_recently_used_entries_are_evicted(tmp_path):
+    cache = AnalysisCache(str(tmp_path / "frames.db"), max_entries=2, max_age_seconds=60)
+    cache.put("old", "a")
+    cache.conn.execute("UPDATE frame_analysis SET created_at = ? WHERE key = 'old'", (time.time() - 120,))
+    assert cache.get("old") is None
+
+    for key in ("first", "second", "third"):
+        cache.put(key, key)
+        time.sleep(0.01)
+    cache.get("first")
+    cache.evict()
+
+    assert cache.get("first") == "first"
+    assert cache.get("second") is None
+    assert cache.get("third") == "third"
+    assert cache.stats()["evictions"] == 2
+    cache.close()
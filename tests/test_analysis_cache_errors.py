@@ -0,0 +1,48 @@
+import sqlite3
+
+import pytest
+import trio
+
+pytest.importorskip("openai")
+pytest.importorskip("PIL")
+
+from helper.entry import analyze_frame_group, analyze_single_image, get_openai_client
+from helper.rate_limiter import AdaptiveRateLimiter
+from benchmarks.e2e_benchmark import synthetic_frame
+from benchmarks.fake_openai import FakeOpenAIState, start_fake_openai
+
+
+class ReadOnlyCache:
+    """Misses every lookup and fails every write, like a locked SQLite file"""
+
+    def get(self, key):
+        return None
+
+    def put(self, key, analysis):
+        raise sqlite3.OperationalError("database is locked")
+
+
+@pytest.fixture
+def client():
+    server = start_fake_openai(FakeOpenAIState(latency=0))
+    yield get_openai_client("test-key", base_url=f"http://127.0.0.1:{server.server_port}/v1")
+    server.shutdown()
+
+
+def test_single_image_survives_cache_write_error(client):
+    result = trio.run(lambda: analyze_single_image(
+        client, None, "20250106090000000.jpg", AdaptiveRateLimiter(1),
+        cache=ReadOnlyCache(), image_bytes=synthetic_frame(1, 0, 320, 200)
+    ))
+
+    assert "analysis" in result
+    assert "error" not in result
+
+
+def test_frame_group_survives_cache_write_error(client):
+    frames = [(None, f"2025010609000{index}000.jpg", synthetic_frame(index, 0, 320, 200)) for index in range(2)]
+
+    results = trio.run(lambda: analyze_frame_group(client, frames, AdaptiveRateLimiter(1), cache=ReadOnlyCache()))
+
+    assert len(results) == 2
+    assert all("analysis" in result for result in results)
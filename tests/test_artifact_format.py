@@ -0,0 +1,58 @@
+import json
+import importlib.util
+
+import pytest
+
+from helper.artifact_format import ARTIFACT_FORMATS, artifact_path, find_artifact, read_timeline, write_timeline
+from helper.workspace import DiskWorkspace, MemoryWorkspace
+
+DOCUMENT = {
+    "timeline": [
+        {"time_from_start": "10:00:00", "analysis": json.dumps({"activity": "Coding", "open_windows": []})},
+        {"time_from_start": "10:00:05", "filename": "b.jpg", "error": "timeout"},
+    ],
+    "total_screenshots": 2,
+}
+
+
+def formats():
+    available = ["json", "jsonl.gz"]
+    if importlib.util.find_spec("zstandard") is not None:
+        available.append("jsonl.zst")
+    return available
+
+
+@pytest.mark.parametrize("artifact_format", formats())
+@pytest.mark.parametrize("backend", ["disk", "memory"])
+def test_round_trip(tmp_path, artifact_format, backend):
+    with (DiskWorkspace(str(tmp_path)) if backend == "disk" else MemoryWorkspace()) as workspace:
+        path = artifact_path("analysis/s1", artifact_format)
+        write_timeline(path, DOCUMENT, workspace)
+
+        document = read_timeline(path, workspace)
+
+    assert document["total_screenshots"] == 2
+    assert document["timeline"][1] == DOCUMENT["timeline"][1]
+    analysis = document["timeline"][0]["analysis"]
+    if artifact_format != "json":
+        analysis = json.dumps(analysis)
+    assert json.loads(analysis) == {"activity": "Coding", "open_windows": []}
+
+
+def test_format_is_detected_from_contents():
+    workspace = MemoryWorkspace()
+    write_timeline("analysis/s1.jsonl.gz", DOCUMENT, workspace)
+    workspace.write_bytes("analysis/renamed.json", workspace.read_bytes("analysis/s1.jsonl.gz"))
+
+    assert read_timeline("analysis/renamed.json", workspace)["total_screenshots"] == 2
+
+
+def test_find_artifact_and_unknown_formats():
+    workspace = MemoryWorkspace()
+    assert find_artifact("analysis/s1", workspace) == "analysis/s1.json"
+    write_timeline("analysis/s1.jsonl.gz", DOCUMENT, workspace)
+    assert find_artifact("analysis/s1", workspace) == "analysis/s1.jsonl.gz"
+
+    with pytest.raises(ValueError):
+        artifact_path("analysis/s1", "parquet")
+    assert set(ARTIFACT_FORMATS) >= set(formats())
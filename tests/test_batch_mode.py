@@ -0,0 +1,73 @@
+import os
+import json
+
+import pytest
+import trio
+
+pytest.importorskip("openai")
+pytest.importorskip("PIL")
+
+from helper import batch_mode
+from helper.batch_mode import BatchInputWriter, run_batch
+from helper.entry import analyze_screenshots_batch, build_frame_request, get_openai_client
+from benchmarks.e2e_benchmark import synthetic_frame
+from benchmarks.fake_openai import FakeOpenAIState, start_fake_openai
+
+
+@pytest.fixture
+def openai_server():
+    state = FakeOpenAIState(latency=0)
+    server = start_fake_openai(state)
+    yield state, f"http://127.0.0.1:{server.server_port}/v1"
+    server.shutdown()
+
+
+def test_writer_rolls_over_and_removes_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_mode, "MAX_REQUESTS_PER_FILE", 2)
+    writer = BatchInputWriter(str(tmp_path / "batches"), "job")
+    for index in range(5):
+        writer.add(str(index), {"model": "gpt-4o", "messages": []})
+    paths = writer.close()
+
+    assert [os.path.basename(path) for path in paths] == ["job_0.jsonl", "job_1.jsonl", "job_2.jsonl"]
+    with open(paths[0]) as f:
+        assert [json.loads(line)["custom_id"] for line in f] == ["0", "1"]
+
+    writer.remove()
+    assert os.listdir(tmp_path / "batches") == []
+
+
+def test_run_batch_maps_results_and_deletes_input(tmp_path, openai_server, monkeypatch):
+    state, base_url = openai_server
+    monkeypatch.setattr(batch_mode, "MAX_REQUESTS_PER_FILE", 2)
+    writer = BatchInputWriter(str(tmp_path), "job")
+    for index in range(3):
+        writer.add(str(index), build_frame_request("aGVsbG8=", "low"))
+
+    results = trio.run(run_batch, get_openai_client("test-key", base_url=base_url), writer, 0)
+
+    assert sorted(results) == ["0", "1", "2"]
+    assert all("frames" not in json.loads(result["content"]) for result in results.values())
+    assert len(state.batches) == 2
+    assert os.listdir(tmp_path) == []
+
+
+def test_analyze_screenshots_batch_end_to_end(tmp_path, openai_server):
+    state, base_url = openai_server
+    frames_dir = tmp_path / "frames"
+    frames_dir.mkdir()
+    for index in range(4):
+        (frames_dir / f"2025010609000{index}000.jpg").write_bytes(synthetic_frame(index, 0, 320, 200))
+    batch_dir = tmp_path / "batches"
+
+    trio.run(lambda: analyze_screenshots_batch(
+        str(frames_dir), "test-key", str(tmp_path / "results.json"),
+        batch_dir=str(batch_dir), poll_interval=0, base_url=base_url
+    ))
+
+    with open(tmp_path / "results.json") as f:
+        timeline = json.load(f)
+    assert len(timeline["timeline"]) == 4
+    assert all("analysis" in result for result in timeline["timeline"])
+    assert len(state.batches) == 1
+    assert os.listdir(batch_dir) == []
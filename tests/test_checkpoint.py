@@ -0,0 +1,29 @@
+from helper.checkpoint import CheckpointLog
+from helper.workspace import MemoryWorkspace
+
+
+def test_resume_only_matching_model_and_prompt_version():
+    workspace = MemoryWorkspace()
+    log = CheckpointLog("run.checkpoint.jsonl", resume=False, workspace=workspace, model="gpt-4o", prompt_version="1")
+    log.append("a.jpg", {"analysis": "v1"}, 7)
+    log.append("b.jpg", {"error": "failed"})
+    log.close()
+
+    resumed = CheckpointLog("run.checkpoint.jsonl", workspace=workspace, model="gpt-4o", prompt_version="1")
+    assert resumed.get("a.jpg") == {"analysis": "v1"}
+    assert resumed.get_hash("a.jpg") == 7
+    assert resumed.get("b.jpg") is None
+    resumed.close()
+
+    other_prompt = CheckpointLog("run.checkpoint.jsonl", workspace=workspace, model="gpt-4o", prompt_version="2")
+    assert other_prompt.get("a.jpg") is None
+    other_prompt.append("a.jpg", {"analysis": "v2"})
+    other_prompt.close()
+
+    other_model = CheckpointLog("run.checkpoint.jsonl", workspace=workspace, model="gpt-4o-mini", prompt_version="1")
+    assert other_model.resumed == 0
+    other_model.close()
+
+    again = CheckpointLog("run.checkpoint.jsonl", workspace=workspace, model="gpt-4o", prompt_version="2")
+    assert again.get("a.jpg") == {"analysis": "v2"}
+    again.close()
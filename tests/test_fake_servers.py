@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+pytest.importorskip("boto3")
+pytest.importorskip("openai")
+import boto3
+from botocore.config import Config
+from boto3.s3.transfer import TransferConfig
+from openai import OpenAI, RateLimitError
+
+from benchmarks.fake_openai import FakeOpenAIState, start_fake_openai
+from benchmarks.fake_s3 import FakeS3State, start_fake_s3
+
+
+@pytest.fixture
+def s3(tmp_path):
+    state = FakeS3State(str(tmp_path))
+    server = start_fake_s3(state)
+    client = boto3.client(
+        "s3",
+        endpoint_url=f"http://127.0.0.1:{server.server_port}",
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+        region_name="us-east-1",
+        config=Config(s3={"addressing_style": "path"}),
+    )
+    yield state, client
+    server.shutdown()
+
+
+def test_fake_s3_round_trips_objects_through_boto3(s3):
+    state, client = s3
+    client.put_object(Bucket="bucket", Key="screenshots/s1/a.jpg", Body=b"frame-a")
+    client.put_object(Bucket="bucket", Key="screenshots/s1/b.jpg", Body=b"frame-b")
+    client.put_object(Bucket="bucket", Key="other/c.jpg", Body=b"frame-c")
+
+    pages = client.get_paginator("list_objects_v2").paginate(Bucket="bucket", Prefix="screenshots/s1/")
+    keys = [item["Key"] for page in pages for item in page.get("Contents", [])]
+
+    assert keys == ["screenshots/s1/a.jpg", "screenshots/s1/b.jpg"]
+    assert client.get_object(Bucket="bucket", Key="screenshots/s1/b.jpg")["Body"].read() == b"frame-b"
+    assert state.stats()["gets"] >= 1
+
+
+def test_fake_s3_assembles_multipart_uploads(s3, tmp_path):
+    state, client = s3
+    data = bytes(range(256)) * 48 * 1024
+    path = tmp_path / "big.json"
+    path.write_bytes(data)
+    config = TransferConfig(multipart_threshold=5 * 1024 * 1024, multipart_chunksize=5 * 1024 * 1024)
+
+    client.upload_file(str(path), "bucket", "analysis/big.json", Config=config)
+
+    assert client.get_object(Bucket="bucket", Key="analysis/big.json")["Body"].read() == data
+    assert state.uploads == {}
+
+
+def test_fake_openai_answers_frame_requests_and_injects_rate_limits():
+    state = FakeOpenAIState(latency=0)
+    server = start_fake_openai(state)
+    client = OpenAI(api_key="test", base_url=f"http://127.0.0.1:{server.server_port}/v1", max_retries=0)
+    request = {
+        "model": "gpt-4o",
+        "response_format": {"type": "json_object"},
+        "messages": [
+            {"role": "system", "content": "Describe the screenshot"},
+            {"role": "user", "content": [{"type": "image_url", "image_url": {"url": "data:image/jpeg;base64,AAAA"}}]},
+        ],
+    }
+    try:
+        response = client.chat.completions.create(**request)
+        assert "activity" in json.loads(response.choices[0].message.content)
+        assert response.usage.prompt_tokens > 0
+
+        state.rate_limit_rate = 1.0
+        with pytest.raises(RateLimitError):
+            client.chat.completions.create(**request)
+    finally:
+        server.shutdown()
@@ -0,0 +1,53 @@
+from io import BytesIO
+
+import pytest
+
+pytest.importorskip("PIL")
+from PIL import Image, ImageDraw
+
+from helper.frame_dedup import FrameGrouper, frame_hash, group_near_duplicates
+
+
+def screenshot(lines):
+    image = Image.new("RGB", (640, 400), (30, 30, 30))
+    draw = ImageDraw.Draw(image)
+    for number, text in enumerate(lines):
+        draw.text((20, 20 + number * 20), text, fill=(220, 220, 220))
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def write_frames(folder, frames):
+    paths = []
+    for index, data in enumerate(frames):
+        path = folder / f"{index:03d}.jpg"
+        path.write_bytes(data)
+        paths.append(str(path))
+    return paths
+
+
+def test_default_threshold_keeps_frames_with_a_typed_line(tmp_path):
+    before = screenshot(["def main():", "    pass"])
+    after = screenshot(["def main():", "    pass", "    return 1"])
+    paths = write_frames(tmp_path, [before, before, after])
+
+    groups = group_near_duplicates(paths, 0)
+
+    assert groups == [{"representative": 0, "members": [0, 1]}, {"representative": 2, "members": [2]}]
+
+
+def test_threshold_zero_hashes_content_not_pixels():
+    frame = screenshot(["hello"])
+    assert frame_hash(frame, 0) == frame_hash(bytes(frame), 0)
+    assert frame_hash(frame, 0) != frame_hash(screenshot(["hello!"]), 0)
+
+
+def test_grouper_compares_against_the_representative():
+    grouper = FrameGrouper(threshold=1)
+    # Each hash is one bit from the previous one but drifts away from the first
+    assert [grouper.add(index, value) for index, value in enumerate([0b000, 0b001, 0b011, 0b111])] == [
+        True, False, True, False
+    ]
+    assert grouper.add(4, None)
+    assert [group["members"] for group in grouper.groups] == [[0, 1], [2, 3], [4]]
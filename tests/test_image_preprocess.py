@@ -0,0 +1,67 @@
+from io import BytesIO
+
+import pytest
+
+pytest.importorskip("PIL")
+from PIL import Image, ImageDraw
+
+from helper.image_preprocess import FramePreprocessor, estimate_image_tokens, fit_for_high_detail
+
+
+def screenshot(size=(1920, 1080), lines=40):
+    image = Image.new("RGB", size, (255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    for number in range(lines):
+        draw.text((20, 10 + number * 25), f"def handler_{number}(request): return respond(request)", fill=(0, 0, 0))
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_token_estimate_matches_the_documented_tiling():
+    assert estimate_image_tokens(1920, 1080, "low") == 85
+    # 1920x1080 scales to 1365x768: 3x2 tiles
+    assert fit_for_high_detail(1920, 1080) == (1365, 768)
+    assert estimate_image_tokens(1920, 1080) == 85 + 170 * 6
+    assert estimate_image_tokens(512, 512) == 85 + 170
+
+
+def test_frames_are_shrunk_to_the_tile_budget():
+    preprocessor = FramePreprocessor(max_tiles=2, detail="high")
+    processed, detail = preprocessor.process(screenshot())
+
+    assert detail == "high"
+    with Image.open(BytesIO(processed)) as image:
+        assert image.format == "JPEG"
+        width, height = image.size
+    assert -(-width // 512) * -(-height // 512) <= 2
+    stats = preprocessor.stats()
+    assert stats["frames"] == 1
+    assert stats["bytes_out"] < stats["bytes_in"]
+
+
+def test_auto_detail_sends_blank_frames_at_low_detail():
+    preprocessor = FramePreprocessor(detail="auto")
+    blank = Image.new("RGB", (1920, 1080), (40, 40, 40))
+    buffer = BytesIO()
+    blank.save(buffer, format="PNG")
+
+    assert preprocessor.process(buffer.getvalue())[1] == "low"
+    assert preprocessor.process(screenshot())[1] == "high"
+    assert preprocessor.low_detail_frames == 1
+
+
+def test_webcam_region_is_masked():
+    preprocessor = FramePreprocessor(detail="high", webcam_region=(0.75, 0.75, 1.0, 1.0))
+    processed, _ = preprocessor.process(screenshot(lines=0))
+
+    with Image.open(BytesIO(processed)) as image:
+        width, height = image.size
+        corner = image.convert("L").getpixel((width - 5, height - 5))
+        centre = image.convert("L").getpixel((width // 2, height // 2))
+    assert corner < 20
+    assert centre > 235
+
+
+def test_signature_changes_with_settings():
+    assert FramePreprocessor(quality=75).signature() != FramePreprocessor(quality=60).signature()
@@ -0,0 +1,76 @@
+import time
+
+import pytest
+import trio
+
+from helper.job_queue import JobQueue
+
+
+def wait_until_finished(job, timeout=5):
+    deadline = time.time() + timeout
+    while job.active and time.time() < deadline:
+        time.sleep(0.01)
+    assert not job.active
+
+
+def test_failed_runner_marks_job_failed():
+    async def runner(submission_id, assignment_id, user_id, progress=None):
+        progress.set_stage("timeline_analysis")
+        await trio.sleep(0)
+        raise RuntimeError("stage failed")
+
+    queue = JobQueue(runner)
+    job, created = queue.enqueue("s1", "a1", "u1")
+    wait_until_finished(job)
+
+    data = job.to_dict()
+    assert created
+    assert data["status"] == "failed"
+    assert data["error"] == "stage failed"
+    assert data["stages"]["timeline_analysis"]["finished_at"] is not None
+
+
+def test_finished_jobs_are_pruned():
+    async def runner(submission_id, assignment_id, user_id, progress=None):
+        await trio.sleep(0)
+
+    queue = JobQueue(runner, finished_ttl=3600, max_finished=2)
+    jobs = []
+    for index in range(3):
+        job, _ = queue.enqueue(f"s{index}", "a", "u")
+        wait_until_finished(job)
+        jobs.append(job)
+
+    queue.enqueue("s3", "a", "u")
+    assert queue.get(jobs[0].id) is None
+    assert queue.get(jobs[2].id) is jobs[2]
+
+    queue.finished_ttl = 0
+    queue.enqueue("s4", "a", "u")
+    assert all(queue.get(job.id) is None for job in jobs)
+    assert "s0" not in queue.active_by_submission
+
+
+def test_api_jobs_share_one_rate_limiter(monkeypatch):
+    pytest.importorskip("openai")
+    pytest.importorskip("PIL")
+    import api.index
+    import helper.entry
+
+    limiters = []
+
+    async def main(submission_id, assignment_id, user_id, progress=None, rate_limiter=None):
+        limiters.append(rate_limiter)
+
+    monkeypatch.setattr(helper.entry, "main", main)
+    monkeypatch.setattr(api.index, "_rate_limiter", None)
+
+    async def run_two():
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(api.index.run_pipeline, "s1", "a", "u")
+            nursery.start_soon(api.index.run_pipeline, "s2", "a", "u")
+
+    trio.run(run_two)
+
+    assert len(limiters) == 2
+    assert limiters[0] is not None and limiters[0] is limiters[1]
@@ -0,0 +1,57 @@
+import json
+import random
+import threading
+
+from helper.live_report import LiveReport
+from helper.timeline_table import build_frame_table
+
+
+def entry(seconds, activity, prompt=""):
+    minutes, seconds = divmod(seconds, 60)
+    return {
+        "time_from_start": f"10:{minutes:02d}:{seconds:02d}",
+        "analysis": json.dumps({
+            "activity": activity,
+            "open_windows": [{"app": "ChatGPT" if prompt else "VS Code", "action": activity, "prompt": prompt}],
+        }),
+    }
+
+
+def test_out_of_order_results_match_the_final_report():
+    activities = ["Coding"] * 10 + ["Interacting with AI Chatbot"] * 4 + ["Testing"] * 6
+    timeline = [entry(index * 5, activity, "why" if index == 12 else "") for index, activity in enumerate(activities)]
+    shuffled = list(timeline)
+    random.Random(7).shuffle(shuffled)
+
+    report = LiveReport()
+    for result in shuffled:
+        report.add(result)
+    report.add({"time_from_start": "10:02:00", "error": "timeout"})
+    snapshot = report.snapshot()
+
+    table = build_frame_table(timeline)
+    intervals, _ = table.intervals()
+    assert snapshot["activity_durations"] == table.activity_durations(intervals)
+    assert snapshot["prompts_timeline"] == table.prompts_timeline()
+    assert snapshot["app_actions_timeline"] == table.app_actions_timeline()
+    assert snapshot["errors"] == 1
+
+
+def test_wait_wakes_on_new_results_and_finish():
+    report = LiveReport()
+    versions = []
+
+    def stream():
+        version = -1
+        while not report.snapshot()["finished"]:
+            version = report.wait(version, 5)
+            versions.append(version)
+
+    reader = threading.Thread(target=stream)
+    reader.start()
+    report.add(entry(0, "Coding"))
+    report.finish()
+    reader.join(5)
+
+    assert not reader.is_alive()
+    assert versions[-1] == report.version
@@ -0,0 +1,101 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+import trio
+
+pytest.importorskip("openai")
+pytest.importorskip("boto3")
+
+from helper import timeline_analysis
+from helper.timeline_analysis import (
+    analyze_app_actions_map_reduce, merge_prompts_map_reduce, split_into_windows, stitch_prompt_windows
+)
+
+METADATA = {"total_screenshots": 3}
+
+
+def app_actions(minutes):
+    return {
+        "app_actions_timeline": [
+            {"time": f"10:{minute:02d}:00", "app": "VS Code", "action": f"Editing file {minute}"} for minute in minutes
+        ],
+        "metadata": METADATA,
+    }
+
+
+def prompts(minutes):
+    return {
+        "prompts_timeline": [
+            {"time_from_start": f"10:{minute:02d}:00", "app": "ChatGPT", "prompt": f"question {minute}"} for minute in minutes
+        ],
+        "metadata": METADATA,
+    }
+
+
+def respond_with(content):
+    async def create_completion(client, span_name, **kwargs):
+        if isinstance(content, Exception):
+            raise content
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content(span_name, kwargs)))])
+    return create_completion
+
+
+def summary(span_name, kwargs):
+    if span_name == "summarize_app_actions":
+        return "```json\n" + json.dumps([{"activity": "Fixing a bug", "time": "10:00:00", "details": ["edit"]}]) + "\n```"
+    if span_name == "stitch_activities":
+        return json.dumps({"merged": False})
+    return json.dumps({"prompts_timeline": [{"time_from_start": "10:00:00", "prompt": "merged"}]})
+
+
+@pytest.mark.parametrize("content", [summary, RuntimeError("API down")])
+@pytest.mark.parametrize("minutes", [[0, 1], [0, 20, 40]])
+def test_app_actions_shape_does_not_depend_on_windows_or_failures(monkeypatch, content, minutes):
+    monkeypatch.setattr(timeline_analysis, "create_completion", respond_with(content))
+
+    activities = trio.run(lambda: analyze_app_actions_map_reduce(app_actions(minutes), "key", client=object()))
+
+    assert isinstance(activities, list) and activities
+    assert all(set(activity) == {"activity", "time", "details"} for activity in activities)
+
+
+@pytest.mark.parametrize("content", [summary, RuntimeError("API down")])
+@pytest.mark.parametrize("minutes", [[0, 1], [0, 20, 40]])
+def test_prompts_shape_does_not_depend_on_windows_or_failures(monkeypatch, content, minutes):
+    monkeypatch.setattr(timeline_analysis, "create_completion", respond_with(content))
+
+    merged = trio.run(lambda: merge_prompts_map_reduce(prompts(minutes), "key", client=object()))
+
+    assert set(merged) == {"prompts_timeline", "metadata"}
+    assert isinstance(merged["prompts_timeline"], list) and merged["prompts_timeline"]
+    assert merged["metadata"]["total_screenshots"] == 3
+    assert set(merged["metadata"]["map_reduce"]) == {"windows", "failed_windows"}
+
+
+def test_windows_start_with_the_overlap_of_the_previous_window():
+    entries = [{"time": f"10:{minute:02d}:00", "n": minute} for minute in [0, 5, 9, 10, 14, 21]]
+
+    windows = split_into_windows(entries, "time", window_seconds=600, overlap_seconds=60)
+
+    assert [window["start"] for window in windows] == [36000, 36600, 37260]
+    assert [[entry["n"] for entry in window["entries"]] for window in windows] == [[0, 5, 9], [9, 10, 14], [21]]
+
+
+def test_entries_without_a_time_stay_in_the_current_window():
+    entries = [{"time": "10:00:00"}, {"time": None}, {"time": "10:20:00"}]
+
+    windows = split_into_windows(entries, "time", window_seconds=600, overlap_seconds=60)
+
+    assert [len(window["entries"]) for window in windows] == [2, 1]
+
+
+def test_stitching_drops_repeats_and_keeps_the_longer_prompt():
+    first = [{"prompt": "fix the login bug"}, {"prompt": "add a test for"}]
+    second = [{"prompt": "add a test for the login form"}, {"prompt": "fix the login bug"}, {"prompt": "deploy it"}]
+
+    stitched = stitch_prompt_windows([first, second])
+
+    assert [prompt["prompt"] for prompt in stitched] == [
+        "fix the login bug", "add a test for the login form", "deploy it"
+    ]
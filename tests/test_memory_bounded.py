@@ -0,0 +1,31 @@
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("PIL")
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAX_GROWTH_MB = 30
+INFLIGHT_MB = 16
+
+
+def test_peak_rss_stays_bounded_as_frames_grow(tmp_path):
+    """Six times the frames must not grow peak RSS by more than a fixed margin"""
+    output = tmp_path / "memory.json"
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.memory_benchmark", "--sizes", "50", "300",
+         "--width", "1600", "--height", "1000", "--concurrency", "20", "--latency", "0.01",
+         "--inflight-mb", str(INFLIGHT_MB), "--max-growth-mb", str(MAX_GROWTH_MB), "--output", str(output)],
+        cwd=REPO_ROOT, capture_output=True, text=True, timeout=300
+    )
+    assert completed.returncode == 0, completed.stdout[-2000:] + completed.stderr[-2000:]
+
+    with open(output) as f:
+        runs = json.load(f)["runs"]
+    assert [run["errors"] for run in runs] == [0, 0]
+    assert all(run["budget_peak_mb"] <= INFLIGHT_MB for run in runs)
+    assert runs[-1]["peak_rss_mb"] - runs[0]["peak_rss_mb"] <= MAX_GROWTH_MB
@@ -0,0 +1,64 @@
+import trio
+from trio.testing import MockClock
+
+from helper.memory_budget import ByteBudget, frame_memory_cost
+
+
+def test_cost_counts_the_jpeg_and_two_base64_copies():
+    assert frame_memory_cost(300) == 300 + 2 * 400
+
+
+def test_waiters_are_admitted_in_order_within_the_budget():
+    budget = ByteBudget(100)
+    admitted = []
+
+    async def take(name, cost, hold_seconds):
+        async with budget.hold(cost):
+            admitted.append(name)
+            await trio.sleep(hold_seconds)
+
+    async def run():
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(take, "first", 60, 0.05)
+            await trio.sleep(0.01)
+            nursery.start_soon(take, "large", 95, 0.01)
+            await trio.sleep(0.01)
+            # Fits next to "first", but must not overtake "large" (nor share the budget with it,
+            # which would leave the order of the two wake-ups to the scheduler)
+            nursery.start_soon(take, "small", 10, 0.01)
+
+    # Virtual time, so the arrival order does not depend on scheduler timing
+    trio.run(run, clock=MockClock(autojump_threshold=0))
+
+    assert admitted == ["first", "large", "small"]
+    assert budget.in_flight == 0
+    assert budget.peak <= 100
+    assert budget.stats()["waits"] == 2
+
+
+def test_oversized_item_runs_alone_and_cancelled_waiters_leave_the_queue():
+    budget = ByteBudget(100)
+
+    async def run():
+        await budget.acquire(500)
+        with trio.move_on_after(0.01):
+            await budget.acquire(10)
+        assert not budget.waiters
+        budget.release(500)
+        await budget.acquire(10)
+
+    trio.run(run)
+    assert budget.in_flight == 10
+
+
+def test_cancelling_an_uncontended_acquire_keeps_no_bytes():
+    budget = ByteBudget(100)
+
+    async def run():
+        with trio.CancelScope() as scope:
+            scope.cancel()
+            await budget.acquire(40)
+        assert scope.cancelled_caught
+
+    trio.run(run)
+    assert budget.in_flight == 0
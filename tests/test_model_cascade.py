@@ -0,0 +1,46 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from helper.model_cascade import ModelCascade, token_cost
+
+
+def answer(confidence=0.9, contains_ai_prompt=False, activity="Coding"):
+    return json.dumps({
+        "activity": activity,
+        "open_windows": [{"app": "VS Code", "action": "Editing", "prompt": ""}],
+        "confidence": confidence,
+        "contains_ai_prompt": contains_ai_prompt,
+    })
+
+
+def test_confident_answers_are_kept_without_cascade_fields():
+    cascade = ModelCascade(confidence_threshold=0.8)
+    kept = cascade.accept(answer())
+    assert json.loads(kept) == {"activity": "Coding", "open_windows": [{"app": "VS Code", "action": "Editing", "prompt": ""}]}
+
+
+@pytest.mark.parametrize("content, reason", [
+    (answer(confidence=0.5), "low_confidence"),
+    (answer(contains_ai_prompt=True), "ai_prompt"),
+    (answer(activity="Interacting with AI Chatbot"), "activity"),
+    ("not json", "unparseable"),
+])
+def test_uncertain_answers_are_escalated(content, reason):
+    cascade = ModelCascade(confidence_threshold=0.8)
+    assert cascade.accept(content) is None
+    assert cascade.escalations == {reason: 1}
+
+
+def test_costs_are_tracked_per_tier_with_cached_tokens_discounted():
+    assert token_cost("gpt-4o", 1_000_000, 0) == pytest.approx(2.50)
+    assert token_cost("gpt-4o", 1_000_000, 0, cached_tokens=1_000_000) == pytest.approx(1.25)
+
+    cascade = ModelCascade()
+    usage = SimpleNamespace(prompt_tokens=1000, completion_tokens=100, prompt_tokens_details=None)
+    cascade.record(1, 0.2, usage)
+    cascade.record(2, 1.0, usage)
+    tiers = cascade.stats()["tiers"]
+    assert tiers["tier1"]["cost_usd"] == pytest.approx(token_cost("gpt-4o-mini", 1000, 100), abs=1e-6)
+    assert tiers["tier2"]["cost_usd"] == pytest.approx(token_cost("gpt-4o", 1000, 100), abs=1e-6)
@@ -0,0 +1,64 @@
+import pytest
+import trio
+
+pytest.importorskip("openai")
+pytest.importorskip("httpx")
+
+from helper import openai_client
+from helper.openai_client import get_openai_client, run_closing_clients
+
+
+def test_one_client_per_key_and_base_url_within_a_run():
+    async def clients():
+        first = get_openai_client("key", base_url="http://127.0.0.1:1/v1")
+        again = get_openai_client("key", base_url="http://127.0.0.1:1/v1")
+        other_key = get_openai_client("other", base_url="http://127.0.0.1:1/v1")
+        return first, again, other_key
+
+    first, again, other_key = trio.run(clients)
+
+    assert first is again
+    assert other_key is not first
+
+
+def test_retry_variants_share_the_connection_pool():
+    async def clients():
+        return get_openai_client("key", max_retries=2), get_openai_client("key", max_retries=0)
+
+    default, no_retries = trio.run(clients)
+
+    assert no_retries is not default
+    assert no_retries.max_retries == 0
+    assert no_retries._client is default._client
+
+
+def test_each_trio_run_gets_a_fresh_pool():
+    async def client():
+        return get_openai_client("key")
+
+    assert trio.run(client) is not trio.run(client)
+
+
+def test_run_closing_clients_closes_the_pool_when_the_run_ends():
+    async def use_client():
+        client = get_openai_client("key")
+        get_openai_client("key", max_retries=0)
+        return client
+
+    client = trio.run(run_closing_clients, use_client)
+
+    assert client.is_closed()
+    assert not openai_client._clients
+
+
+def test_pool_is_closed_when_the_run_fails():
+    clients = []
+
+    async def fail():
+        clients.append(get_openai_client("key"))
+        raise RuntimeError("stage failed")
+
+    with pytest.raises(RuntimeError):
+        trio.run(run_closing_clients, fail)
+
+    assert clients[0].is_closed()
@@ -0,0 +1,24 @@
+import pytest
+
+pytest.importorskip("openai")
+
+from helper.entry import build_frame_request, build_multi_frame_request
+from helper.prompt_templates import FRAME_PROMPTS, PROMPT_VERSION, frame_prompt
+
+
+def test_frame_requests_share_the_system_prefix():
+    single = build_frame_request("aGVsbG8=")
+    multi = build_multi_frame_request([("aGVsbG8=", "low"), ("aGVsbG8=", "low")])
+
+    assert single["messages"][0] == {"role": "system", "content": frame_prompt(PROMPT_VERSION)}
+    assert multi["messages"][0] == single["messages"][0]
+    assert '{"frames": [...]}' in multi["messages"][1]["content"][0]["text"]
+
+
+def test_prompt_version_can_be_chosen_per_request():
+    for version in FRAME_PROMPTS:
+        request = build_frame_request("aGVsbG8=", prompt_version=version)
+        assert request["messages"][0]["content"] == FRAME_PROMPTS[version]
+
+    with pytest.raises(ValueError):
+        frame_prompt("0")
@@ -0,0 +1,69 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+import trio
+
+openai = pytest.importorskip("openai")
+httpx = pytest.importorskip("httpx")
+
+from helper.rate_limiter import AdaptiveRateLimiter, parse_reset_duration
+
+
+def raw_response(headers=None):
+    usage = SimpleNamespace(prompt_tokens=100, completion_tokens=20, total_tokens=120, prompt_tokens_details=None)
+    return SimpleNamespace(headers=headers or {}, parse=lambda: SimpleNamespace(usage=usage, model="gpt-4o"))
+
+
+def failing_then_ok(errors):
+    errors = list(errors)
+
+    async def request():
+        if errors:
+            raise errors.pop(0)
+        return raw_response()
+    return request
+
+
+def connection_error():
+    return openai.APIConnectionError(request=httpx.Request("POST", "http://test/v1/chat/completions"))
+
+
+def test_parse_reset_duration():
+    assert parse_reset_duration("20ms") == pytest.approx(0.02)
+    assert parse_reset_duration("6m0s") == 360
+    assert parse_reset_duration("1h2m3.5s") == pytest.approx(3723.5)
+    assert parse_reset_duration(None) == 0
+
+
+def test_transient_errors_are_retried():
+    limiter = AdaptiveRateLimiter(2, base_delay=0.001)
+
+    response = trio.run(limiter.call, failing_then_ok([connection_error(), connection_error()]))
+
+    assert response.usage.total_tokens == 120
+    assert limiter.stats()["retries"] == 2
+    assert limiter.stats()["calls"] == 1
+    assert limiter.in_flight == 0
+
+
+def test_other_errors_are_raised_without_retry():
+    limiter = AdaptiveRateLimiter(2, base_delay=0.001)
+
+    with pytest.raises(ValueError):
+        trio.run(limiter.call, failing_then_ok([ValueError("bad request")]))
+
+    assert limiter.stats()["retries"] == 0
+    assert limiter.stats()["failures"] == 1
+
+
+def test_headers_and_throttling_adjust_the_budgets():
+    limiter = AdaptiveRateLimiter(8)
+    limiter.update_from_headers({"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "2s"})
+    assert limiter.request_budget == 0
+    assert limiter.paused_until - time.monotonic() > 1.5
+
+    limiter.on_throttle()
+    assert limiter.concurrency == 4
+    limiter.on_success()
+    assert 4 < limiter.concurrency < 5
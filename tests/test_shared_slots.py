@@ -0,0 +1,49 @@
+import os
+import multiprocessing
+
+import pytest
+import trio
+
+pytest.importorskip("openai")
+
+from helper import rate_limiter
+from helper.rate_limiter import AdaptiveRateLimiter, SharedSlots
+
+
+def hold_slot_and_exit(slots):
+    slots.acquire()
+    os._exit(0)
+
+
+def test_slots_of_exited_processes_are_reclaimed():
+    context = multiprocessing.get_context("fork")
+    slots = SharedSlots(2, context)
+    for _ in range(2):
+        worker = context.Process(target=hold_slot_and_exit, args=(slots,))
+        worker.start()
+        worker.join()
+    assert slots.in_use() == 2
+
+    assert slots.acquire()
+    assert slots.acquire()
+    assert not slots.acquire()
+    slots.release()
+    assert slots.in_use() == 1
+
+
+def test_cancelled_call_releases_its_slots(monkeypatch):
+    slots = SharedSlots(1)
+    monkeypatch.setattr(rate_limiter, "_shared_slots", slots)
+    limiter = AdaptiveRateLimiter(1)
+
+    async def hang():
+        await trio.sleep_forever()
+
+    async def cancel_mid_call():
+        with trio.move_on_after(0.05):
+            await limiter.call(hang)
+
+    trio.run(cancel_mid_call)
+
+    assert limiter.in_flight == 0
+    assert slots.in_use() == 0
@@ -0,0 +1,55 @@
+import pytest
+import trio
+
+from helper.stage_graph import StageGraph
+
+
+def test_independent_stages_run_concurrently():
+    graph = StageGraph("test")
+    started = []
+
+    async def slow(name, value):
+        started.append(name)
+        await trio.sleep(0.2)
+        return value + name
+
+    graph.add("left", lambda base: slow("l", base), ["base"])
+    graph.add("right", lambda base: slow("r", base), ["base"])
+    graph.add("joined", lambda left, right: left + right, ["left", "right"])
+
+    outputs = trio.run(graph.run, {"base": "x"})
+
+    assert outputs["joined"] == "xlxr"
+    assert sorted(started) == ["l", "r"]
+    assert graph.timings["total"] < 0.35
+
+
+def test_failure_skips_dependents_and_is_raised():
+    graph = StageGraph("test")
+    ran = []
+
+    def fail():
+        raise RuntimeError("boom")
+
+    graph.add("broken", fail)
+    graph.add("after_broken", lambda value: ran.append("after_broken"), ["broken"])
+    graph.add("independent", lambda: ran.append("independent"))
+
+    with pytest.raises(RuntimeError, match="boom"):
+        trio.run(graph.run)
+
+    assert ran == ["independent"]
+    assert graph.status == {"broken": "failed", "after_broken": "skipped", "independent": "done"}
+
+
+def test_unknown_inputs_and_cycles_are_rejected():
+    graph = StageGraph("test")
+    graph.add("a", lambda b: b, ["b"])
+    graph.add("b", lambda a: a, ["a"])
+    with pytest.raises(ValueError, match="Cycle"):
+        trio.run(graph.run)
+
+    graph = StageGraph("test")
+    graph.add("a", lambda missing: missing, ["missing"])
+    with pytest.raises(ValueError, match="unknown input"):
+        trio.run(graph.run)
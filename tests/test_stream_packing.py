@@ -0,0 +1,128 @@
+import io
+import os
+
+import pytest
+import trio
+
+pytest.importorskip("openai")
+pytest.importorskip("PIL")
+
+from helper.entry import cache_prompt_version, download_images_from_s3, stream_and_analyze_from_s3
+from helper.workspace import MemoryWorkspace
+from benchmarks.e2e_benchmark import synthetic_frame
+from benchmarks.fake_openai import FakeOpenAIState, start_fake_openai
+
+
+class InMemoryS3:
+    """The two S3 client calls the streaming path makes, over a dict of objects"""
+
+    def __init__(self, objects):
+        self.objects = objects
+
+    def get_paginator(self, operation):
+        return self
+
+    def paginate(self, Bucket, Prefix):
+        yield {"Contents": [{"Key": key, "Size": len(data)} for key, data in self.objects.items() if key.startswith(Prefix)]}
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+
+def test_streaming_packs_full_requests(monkeypatch):
+    state = FakeOpenAIState(latency=0)
+    server = start_fake_openai(state)
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+    objects = {
+        f"screenshots/s1/2025010609{index:02d}00000.jpg": synthetic_frame(index, 0, 320, 200)
+        for index in range(12)
+    }
+    try:
+        timeline = trio.run(lambda: stream_and_analyze_from_s3(
+            "bucket", "screenshots/s1", "test-key", "analysis/s1.json",
+            max_concurrent=8, frames_per_request=4, s3_client=InMemoryS3(objects), workspace=MemoryWorkspace()
+        ))
+    finally:
+        server.shutdown()
+
+    assert len(timeline) == 12
+    assert all("analysis" in row for row in timeline)
+    assert state.stats()["requests"] == 3
+
+
+def test_multi_frame_answers_are_cached_apart_from_single_frame_ones(monkeypatch, tmp_path):
+    from helper.analysis_cache import AnalysisCache
+
+    state = FakeOpenAIState(latency=0)
+    server = start_fake_openai(state)
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+    objects = {
+        f"screenshots/s1/2025010609{index:02d}00000.jpg": synthetic_frame(index, 0, 320, 200)
+        for index in range(4)
+    }
+
+    def run(frames_per_request):
+        cache = AnalysisCache(str(tmp_path / "cache.db"))
+        try:
+            return trio.run(lambda: stream_and_analyze_from_s3(
+                "bucket", "screenshots/s1", "test-key", "analysis/s1.json", max_concurrent=4,
+                frames_per_request=frames_per_request, cache=cache, s3_client=InMemoryS3(objects),
+                workspace=MemoryWorkspace()
+            ))
+        finally:
+            cache.close()
+
+    try:
+        run(4)
+        assert state.stats()["requests"] == 1
+        # Same frames one per request: the packed answers must not be reused
+        timeline = run(1)
+        assert state.stats()["requests"] == 5
+        assert not any(row.get("cached") for row in timeline)
+        assert all(row.get("cached") for row in run(4))
+    finally:
+        server.shutdown()
+
+    assert cache_prompt_version() != cache_prompt_version(frames_per_request=4)
+
+
+def test_streaming_one_frame_per_request_keeps_file_order(monkeypatch):
+    state = FakeOpenAIState(latency=0)
+    server = start_fake_openai(state)
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+    # Listed out of order, with keys the pipeline must skip
+    objects = {
+        f"screenshots/s1/2025010609{index:02d}00000.jpg": synthetic_frame(index, 0, 320, 200)
+        for index in [5, 1, 4, 0, 3, 2]
+    }
+    objects["screenshots/s1/notes.txt"] = b"not a frame"
+    objects["screenshots/s2/2025010609000000.jpg"] = synthetic_frame(9, 0, 320, 200)
+    workspace = MemoryWorkspace()
+    try:
+        timeline = trio.run(lambda: stream_and_analyze_from_s3(
+            "bucket", "screenshots/s1", "test-key", "analysis/s1.json",
+            max_concurrent=3, max_downloads=2, s3_client=InMemoryS3(objects), workspace=workspace
+        ))
+    finally:
+        server.shutdown()
+
+    times = [row["time_from_start"] for row in timeline]
+    assert len(times) == 6
+    assert times == sorted(set(times))
+    assert all("analysis" in row for row in timeline)
+    assert state.stats()["requests"] == 6
+    assert workspace.exists("analysis/s1.json")
+
+
+def test_download_first_path_fetches_every_frame_off_the_event_loop():
+    objects = {f"screenshots/s1/2025010609{index:02d}00000.jpg": bytes([index]) * 10 for index in range(5)}
+    objects["screenshots/s1/notes.txt"] = b"not a frame"
+    workspace = MemoryWorkspace()
+
+    trio.run(lambda: download_images_from_s3(
+        "bucket", "screenshots/s1", "screenshots/s1", s3_client=InMemoryS3(objects), workspace=workspace,
+        max_downloads=2
+    ))
+
+    assert sorted(workspace.listdir("screenshots/s1")) == sorted(os.path.basename(key) for key in objects if key.endswith(".jpg"))
+    assert workspace.read_bytes("screenshots/s1/20250106090300000.jpg") == bytes([3]) * 10
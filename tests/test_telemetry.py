@@ -0,0 +1,75 @@
+import contextvars
+from types import SimpleNamespace
+
+import pytest
+
+from helper.telemetry import Metrics, current_trace, record_bytes, record_openai_call, span, start_trace
+
+
+def usage(prompt, completion, cached=0):
+    return SimpleNamespace(
+        prompt_tokens=prompt,
+        completion_tokens=completion,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=cached),
+    )
+
+
+def test_metrics_render_counters_and_histograms():
+    metrics = Metrics()
+    metrics.inc("openai_requests_total", model="gpt-4o")
+    metrics.inc("openai_requests_total", 2, model="gpt-4o")
+    metrics.observe("openai_api_seconds", 0.3)
+    metrics.observe("openai_api_seconds", 7)
+    text = metrics.render()
+
+    assert "# TYPE openai_requests_total counter" in text
+    assert 'openai_requests_total{model="gpt-4o"} 3' in text
+    assert "# TYPE openai_api_seconds histogram" in text
+    assert 'openai_api_seconds_bucket{le="0.25"} 0' in text
+    assert 'openai_api_seconds_bucket{le="0.5"} 1' in text
+    assert 'openai_api_seconds_bucket{le="+Inf"} 2' in text
+    assert "openai_api_seconds_count 2" in text
+
+
+def run_traced(function):
+    return contextvars.copy_context().run(function)
+
+
+def test_trace_accumulates_tokens_bytes_and_spans():
+    def pipeline():
+        trace = start_trace("sub-1")
+        with span("download", frames=2):
+            record_bytes("download", 1000)
+        record_bytes("upload", 50)
+        record_openai_call("gpt-4o", usage(1200, 80, cached=1024), queue_wait=0.2, api_seconds=1.5)
+        record_openai_call("gpt-4o", usage(1200, 70), queue_wait=0.1, api_seconds=1.0)
+        return trace.to_dict()
+
+    data = run_traced(pipeline)
+
+    assert data["submission_id"] == "sub-1"
+    assert data["tokens"]["gpt-4o"] == {
+        "prompt_tokens": 2400, "cached_prompt_tokens": 1024, "completion_tokens": 150, "calls": 2, "cached_calls": 1
+    }
+    assert data["totals"]["openai_calls"] == 2
+    assert data["totals"]["bytes_downloaded"] == 1000
+    assert data["totals"]["bytes_uploaded"] == 50
+    assert data["totals"]["api_seconds"] == 2.5
+    assert data["span_summary"]["download"]["count"] == 1
+    assert data["spans"][0]["frames"] == 2
+
+
+def test_span_records_the_error_and_reraises():
+    def pipeline():
+        trace = start_trace("sub-2")
+        with pytest.raises(ValueError):
+            with span("analyze"):
+                raise ValueError("bad frame")
+        return trace.to_dict()
+
+    assert run_traced(pipeline)["spans"][0]["error"] == "ValueError"
+
+
+def test_calls_outside_a_trace_only_update_metrics():
+    assert run_traced(current_trace) is None
+    run_traced(lambda: record_openai_call("gpt-4o", usage(10, 5), queue_wait=0, api_seconds=0.1))
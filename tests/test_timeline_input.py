@@ -0,0 +1,27 @@
+import pytest
+import trio
+
+pytest.importorskip("openai")
+pytest.importorskip("boto3")
+
+from helper import timeline_analysis
+from helper.workspace import MemoryWorkspace
+
+
+def test_main_reads_the_given_analysis_file(monkeypatch):
+    workspace = MemoryWorkspace()
+    workspace.write_bytes("analysis/s1.json", b'{"timeline": []}')
+    workspace.write_bytes("analysis/s1.jsonl.gz", b"")
+    read = []
+
+    def analyze_timeline_file(file_path, workspace=None):
+        read.append(file_path)
+        raise RuntimeError("stop after reading")
+
+    monkeypatch.setattr(timeline_analysis, "analyze_timeline_file", analyze_timeline_file)
+    with pytest.raises(RuntimeError):
+        trio.run(lambda: timeline_analysis.main("s1", "a1", "u1", workspace=workspace, file_path="analysis/s1.jsonl.gz"))
+    with pytest.raises(RuntimeError):
+        trio.run(lambda: timeline_analysis.main("s1", "a1", "u1", workspace=workspace))
+
+    assert read == ["analysis/s1.jsonl.gz", "analysis/s1.json"]
@@ -0,0 +1,42 @@
+import json
+
+from helper.timeline_table import build_frame_table
+
+
+def entry(time_from_start, activity, windows):
+    return {"time_from_start": time_from_start, "analysis": json.dumps({"activity": activity, "open_windows": windows})}
+
+
+TIMELINE = [
+    entry("10:00:00", "Coding", [{"app": "VS Code", "action": "Editing main.py", "prompt": ""}]),
+    entry("10:00:05", "Coding", [{"app": "VS Code", "action": "Editing main.py"}]),
+    entry("10:00:10", "Interacting with AI Chatbot", [{"app": "ChatGPT", "action": "Asking", "prompt": "fix my loop"}]),
+    {"time_from_start": "10:00:15", "filename": "d.jpg", "error": "timeout"},
+    {"time_from_start": "10:00:20", "analysis": "```json\n" + json.dumps({"activity": "Testing", "open_windows": []}) + "\n```"},
+    # Recording paused for ten minutes
+    entry("10:10:20", "Coding", [{"app": "VS Code", "action": "Editing main.py"}]),
+    entry("10:10:25", "Coding", [{"app": "VS Code", "action": "Editing main.py"}]),
+    entry("10:10:30", "Coding", [{"app": "VS Code", "action": "Editing main.py"}]),
+]
+
+
+def test_single_pass_derives_every_view():
+    table = build_frame_table(TIMELINE)
+    intervals, typical = table.intervals()
+
+    assert table.skipped == 1
+    assert typical == 5
+    assert list(intervals) == [5, 5, 10, 5, 5, 5, 5]
+    assert table.activity_durations(intervals) == {"Coding": 25, "Interacting with AI Chatbot": 10, "Testing": 5}
+    assert table.prompts_timeline() == [{"time_from_start": "10:00:10", "prompt": "fix my loop"}]
+    assert table.app_actions_timeline() == [
+        {"time": "10:00:00", "app": "VS Code", "action": "Editing main.py"},
+        {"time": "10:00:10", "app": "ChatGPT", "action": "Asking"},
+        {"time": "10:10:20", "app": "VS Code", "action": "Editing main.py"},
+    ]
+
+
+def test_intervals_cross_midnight():
+    table = build_frame_table([entry("23:59:55", "Coding", []), entry("00:00:00", "Coding", [])])
+    intervals, typical = table.intervals()
+    assert list(intervals) == [5, 5]
@@ -0,0 +1,118 @@
+import threading
+
+import pytest
+import trio
+
+pytest.importorskip("boto3")
+from boto3.exceptions import S3UploadFailedError
+from botocore.exceptions import ClientError
+
+from helper import upload_to_S3
+from helper.upload_to_S3 import upload_files_concurrently
+from helper.workspace import DiskWorkspace, MemoryWorkspace
+
+
+class RecordingS3:
+    """
+    upload_file/upload_fileobj over a dict, failing keys listed in `fail` the
+    way boto3 does: upload_file wraps the ClientError in S3UploadFailedError
+    """
+
+    def __init__(self, fail=()):
+        self.objects = {}
+        self.fail = set(fail)
+        self.lock = threading.Lock()
+
+    def store(self, key, data):
+        if key in self.fail:
+            raise ClientError({"Error": {"Code": "403", "Message": "Forbidden"}}, "PutObject")
+        with self.lock:
+            self.objects[key] = data
+
+    def upload_file(self, path, bucket, key, Config=None):
+        with open(path, "rb") as f:
+            data = f.read()
+        try:
+            self.store(key, data)
+        except ClientError as e:
+            raise S3UploadFailedError(f"Failed to upload {path} to {bucket}/{key}: {e}")
+
+    def upload_fileobj(self, fileobj, bucket, key, Config=None):
+        self.store(key, fileobj.read())
+
+
+def add_artifacts(workspace, count):
+    for index in range(count):
+        workspace.write_bytes(f"timeline_analysis/s1/part_{index}.json", b"{}" * (index + 1))
+
+
+def test_uploads_every_artifact_from_a_memory_workspace():
+    workspace = MemoryWorkspace()
+    add_artifacts(workspace, 5)
+    workspace.write_bytes("timeline_analysis/s1/notes.txt", b"skip")
+    s3 = RecordingS3()
+
+    summary = trio.run(lambda: upload_files_concurrently("s1", s3_client=s3, max_workers=2, workspace=workspace))
+
+    assert sorted(s3.objects) == [f"analysis/part_{index}.json" for index in range(5)]
+    assert s3.objects["analysis/part_2.json"] == b"{}" * 3
+    assert summary["files"] == 5
+    assert summary["failed"] == 0
+    assert summary["bytes"] == sum(2 * (index + 1) for index in range(5))
+
+
+def test_disk_workspace_uploads_from_local_paths(tmp_path):
+    workspace = DiskWorkspace(str(tmp_path))
+    add_artifacts(workspace, 2)
+    s3 = RecordingS3()
+
+    summary = trio.run(lambda: upload_files_concurrently("s1", s3_client=s3, workspace=workspace))
+
+    assert summary["files"] == 2
+    assert s3.objects["analysis/part_1.json"] == b"{}{}"
+
+
+def test_failed_uploads_are_reported_without_stopping_the_rest():
+    workspace = MemoryWorkspace()
+    add_artifacts(workspace, 3)
+    s3 = RecordingS3(fail={"analysis/part_1.json"})
+
+    summary = trio.run(lambda: upload_files_concurrently("s1", s3_client=s3, workspace=workspace))
+
+    assert summary["files"] == 2
+    assert summary["failed"] == 1
+    assert summary["failures"][0]["key"] == "analysis/part_1.json"
+
+
+def test_disk_upload_failures_are_reported_too(tmp_path):
+    workspace = DiskWorkspace(str(tmp_path))
+    add_artifacts(workspace, 2)
+    s3 = RecordingS3(fail={"analysis/part_0.json"})
+
+    summary = trio.run(lambda: upload_files_concurrently("s1", s3_client=s3, workspace=workspace))
+
+    assert summary["files"] == 1
+    assert summary["failed"] == 1
+    assert "Forbidden" in summary["failures"][0]["error"]
+
+
+def test_main_fails_and_keeps_local_files_when_an_upload_fails(monkeypatch):
+    workspace = MemoryWorkspace()
+    add_artifacts(workspace, 2)
+    monkeypatch.setattr(upload_to_S3, "get_s3_client", lambda **kwargs: RecordingS3(fail={"analysis/part_1.json"}))
+
+    with pytest.raises(RuntimeError, match="1 of 2 uploads failed: analysis/part_1.json"):
+        trio.run(lambda: upload_to_S3.main("s1", workspace))
+
+    assert workspace.exists("timeline_analysis/s1/part_0.json")
+
+
+def test_main_removes_local_files_after_a_full_upload(monkeypatch):
+    workspace = MemoryWorkspace()
+    add_artifacts(workspace, 2)
+    monkeypatch.setattr(upload_to_S3, "get_s3_client", lambda **kwargs: RecordingS3())
+
+    summary = trio.run(lambda: upload_to_S3.main("s1", workspace))
+
+    assert summary["files"] == 2
+    assert not workspace.exists("timeline_analysis/s1/part_0.json")
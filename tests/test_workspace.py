@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+from helper.workspace import LOCAL_WORKSPACE, DiskWorkspace, MemoryWorkspace, Workspace, create_workspace
+
+
+@pytest.fixture(params=["disk", "memory"])
+def workspace(request, tmp_path):
+    if request.param == "disk":
+        workspace = DiskWorkspace(str(tmp_path / "job"))
+    else:
+        workspace = MemoryWorkspace()
+    yield workspace
+    workspace.cleanup()
+
+
+def test_files_and_folders(workspace):
+    with workspace.open("screenshots/s1/a.jpg", "wb") as f:
+        f.write(b"frame")
+    workspace.write_bytes("screenshots/s1/nested/b.jpg", b"frame two")
+    with workspace.open("analysis/s1.checkpoint.jsonl", "a") as f:
+        f.write("one\n")
+    with workspace.open("analysis/s1.checkpoint.jsonl", "a") as f:
+        f.write("two\n")
+
+    assert workspace.read_bytes("screenshots/s1/a.jpg") == b"frame"
+    assert workspace.size("screenshots/s1/nested/b.jpg") == 9
+    assert workspace.listdir("screenshots/s1") == ["a.jpg"]
+    assert workspace.listdir("missing") == []
+    assert workspace.walk("screenshots") == ["screenshots/s1/a.jpg", "screenshots/s1/nested/b.jpg"]
+    with workspace.open("analysis/s1.checkpoint.jsonl") as f:
+        assert f.read() == "one\ntwo\n"
+
+    workspace.remove("screenshots/s1/a.jpg")
+    assert not workspace.exists("screenshots/s1/a.jpg")
+    with pytest.raises(FileNotFoundError):
+        workspace.remove("screenshots/s1/a.jpg")
+    workspace.remove_tree("screenshots")
+    assert not workspace.exists("screenshots")
+
+
+def test_cleanup_removes_owned_workspaces_only(tmp_path):
+    disk = create_workspace("disk", "job1")
+    disk.write_bytes("analysis/s1.json", b"{}")
+    root = disk.root
+    with disk:
+        assert os.path.exists(os.path.join(root, "analysis", "s1.json"))
+    assert not os.path.exists(root)
+
+    memory = create_workspace("memory", "job2")
+    memory.write_bytes("analysis/s1.json", b"{}")
+    memory.cleanup()
+    assert not memory.exists("analysis/s1.json")
+
+    assert create_workspace("local", "job3") is LOCAL_WORKSPACE
+    assert not LOCAL_WORKSPACE.owned
+    unowned = DiskWorkspace(str(tmp_path), owned=False)
+    unowned.cleanup()
+    assert os.path.isdir(tmp_path)
+
+    with pytest.raises(ValueError):
+        create_workspace("s3", "job4")
+
+
+def test_incomplete_backend_fails_when_created():
+    class NoCleanup(Workspace):
+        def open(self, name, mode="r"):
+            return None
+
+    with pytest.raises(TypeError):
+        NoCleanup()